@@ -0,0 +1,296 @@
+"""
+A2DP loopback latency and throughput benchmark.
+
+Streams audio from :py:class:`.SBCAudioSource` endpoints to
+:py:class:`.SBCAudioSink` endpoints through their real
+`write_transport` and `read_transport` paths, with each
+endpoint's media transport replaced by a
+`socketpair(AF_UNIX, SOCK_SEQPACKET)` rather than a radio.  A
+relay between each pair drops and delays packets to mimic the
+air interface:
+
+    python benchmarks/a2dp_loopback.py [-s STREAMS] [-m MTU]
+                                       [--loss PERCENT] [--delay MS]
+                                       [--jitter MS] [-t SECONDS]
+                                       [--flood] [--json]
+
+Sources are paced in real time, one packet's worth of PCM per
+packet interval, unless `--flood` is given in which case they
+write as fast as the transports accept, to measure sustained
+throughput.  Latency is measured per packet from handing its PCM
+to `write_transport` until `read_transport` returns it decoded.
+Needs the codec library, but neither dbus nor Bluetooth hardware.
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import resource
+import select
+import socket
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # noqa
+
+import bt_manager                                       # noqa
+from bt_manager.codecs import SBCCodecConfig, SBCChannelMode, \
+    SBCSamplingFrequency, SBCAllocationMethod, SBCSubbands, \
+    SBCBlocks                                           # noqa
+
+
+RTP_SIZE = 13
+
+
+def _config(bitpool):
+    return SBCCodecConfig(SBCChannelMode.CHANNEL_MODE_JOINT_STEREO,
+                          SBCSamplingFrequency.FREQ_44_1KHZ,
+                          SBCAllocationMethod.LOUDNESS,
+                          SBCSubbands.SUBBANDS_8,
+                          SBCBlocks.BLOCKS_16,
+                          2,
+                          bitpool)
+
+
+def _endpoint(cls, config, fd, mtu, access_type):
+    """
+    Create an endpoint as if its transport had been acquired,
+    without registering it on the bus.
+    """
+    endpoint = cls.__new__(cls)
+    endpoint.codec = bt_manager.SBCCodec(config)
+    endpoint.fd = fd
+    endpoint.read_mtu = endpoint.write_mtu = mtu
+    endpoint.access_type = access_type
+    return endpoint
+
+
+def _pcm(length):
+    samples = bytearray()
+    for i in range(length // 4):
+        sample = int(8000 * math.sin(i * 0.05)) & 0xFFFF
+        samples.extend((sample & 0xFF, sample >> 8) * 2)
+    return bytes(samples)
+
+
+class _Stream(object):
+    """
+    A source and sink endpoint pair connected through a relay.
+    """
+    def __init__(self, config, mtu):
+        (self.tx, self.relay_rx) = socket.socketpair(socket.AF_UNIX,
+                                                     socket.SOCK_SEQPACKET)
+        (self.relay_tx, self.rx) = socket.socketpair(socket.AF_UNIX,
+                                                     socket.SOCK_SEQPACKET)
+        for s in (self.tx, self.relay_rx, self.relay_tx, self.rx):
+            s.setblocking(False)
+        self.source = _endpoint(bt_manager.SBCAudioSource, config,
+                                self.tx.fileno(), mtu, 'w')
+        self.sink = _endpoint(bt_manager.SBCAudioSink, config,
+                              self.rx.fileno(), mtu, 'r')
+        codec = self.source.codec
+        frames = min(15, (mtu - RTP_SIZE) // codec.frame_length)
+        self.pcm = _pcm(frames * codec.codesize)
+        self.interval = frames * codec.frame_duration / 1e6
+        self.next_send = 0.0
+        self.sent = {}
+        self.queue = []
+        self.packets_sent = 0
+        self.packets_received = 0
+        self.packets_dropped = 0
+        self.bytes_decoded = 0
+        self.encode_time = 0.0
+        self.decode_time = 0.0
+        self.latencies = []
+
+    def send(self, now):
+        ts = self.source.codec.ts[0]
+        self.source.write_transport(self.pcm)
+        self.encode_time += time.time() - now
+        self.sent[ts] = now
+        self.packets_sent += 1
+        self.next_send += self.interval
+
+    def relay(self, now, loss, delay, jitter):
+        while (True):
+            try:
+                packet = self.relay_rx.recv(65536)
+            except socket.error:
+                break
+            if (random.random() < loss):
+                self.packets_dropped += 1
+                continue
+            (seq, ts) = struct.unpack_from('>HI', packet, 2)
+            due = now + delay + random.uniform(0, jitter)
+            heapq.heappush(self.queue, (due, ts, packet))
+
+    def forward(self, now):
+        while (self.queue and self.queue[0][0] <= now):
+            self.relay_tx.send(heapq.heappop(self.queue)[2])
+
+    def receive(self):
+        while (True):
+            try:
+                header = self.rx.recv(RTP_SIZE, socket.MSG_PEEK)
+            except socket.error:
+                break
+            ts = struct.unpack_from('>I', header, 4)[0]
+            start = time.time()
+            pcm = self.sink.read_transport()
+            now = time.time()
+            self.decode_time += now - start
+            self.bytes_decoded += len(pcm)
+            self.packets_received += 1
+            sent = self.sent.pop(ts, None)
+            if (sent is not None):
+                self.latencies.append(now - sent)
+
+    def close(self):
+        for s in (self.tx, self.relay_rx, self.relay_tx, self.rx):
+            s.close()
+
+
+def _percentile(values, percent):
+    if (not values):
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def _cpu():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run(streams, mtu, bitpool, loss, delay, jitter, seconds, flood):
+    """
+    Run the loopback and return a dictionary of results.
+    """
+    streams = [_Stream(_config(bitpool), mtu) for _ in range(streams)]
+    relays = dict((s.relay_rx.fileno(), s) for s in streams)
+    sinks = dict((s.rx.fileno(), s) for s in streams)
+    sources = dict((s.tx.fileno(), s) for s in streams)
+    cpu = _cpu()
+    start = time.time()
+    for (i, stream) in enumerate(streams):
+        # Spread the streams' packets over the interval
+        stream.next_send = start + i * stream.interval / len(streams)
+    end = start + seconds
+    # Packets still in flight when sending stops are not lost
+    drained = end + delay + jitter + 0.05
+    try:
+        while (True):
+            now = time.time()
+            if (now >= drained):
+                break
+            sending = now < end
+            timeout = drained - now
+            writable = []
+            if (sending and flood):
+                writable = list(sources)
+            elif (sending):
+                timeout = min([timeout] +
+                              [s.next_send - now for s in streams])
+            timeout = min([timeout] + [s.queue[0][0] - now
+                                       for s in streams if s.queue])
+            (r, w, x) = select.select(list(relays) + list(sinks), writable,
+                                      [], max(0, timeout))
+            now = time.time()
+            for fd in r:
+                if (fd in relays):
+                    relays[fd].relay(now, loss, delay, jitter)
+                else:
+                    sinks[fd].receive()
+            for stream in streams:
+                stream.forward(time.time())
+                if (not sending):
+                    continue
+                elif (flood):
+                    if (stream.tx.fileno() in w):
+                        stream.send(time.time())
+                elif (stream.next_send <= now):
+                    stream.send(time.time())
+        elapsed = seconds
+        cpu = _cpu() - cpu
+    finally:
+        for stream in streams:
+            stream.close()
+
+    codec = streams[0].source.codec
+    latencies = [l for s in streams for l in s.latencies]
+    sent = sum(s.packets_sent for s in streams)
+    received = sum(s.packets_received for s in streams)
+    audio = sum(s.bytes_decoded for s in streams) / (44100.0 * 4)
+    # As counted by the codec library on receipt
+    received_stats = [s.sink.get_transport_stats() for s in streams]
+    return {
+        'streams': len(streams),
+        'mtu': mtu,
+        'bitpool': bitpool,
+        'frame_length': codec.frame_length,
+        'frames_per_packet': len(streams[0].pcm) // codec.codesize,
+        'seconds': elapsed,
+        'packets_sent': sent,
+        'packets_received': received,
+        'packet_loss': 1 - float(received) / sent if sent else 0.0,
+        'sequence_gaps': sum(r['sequence_gaps'] for r in received_stats),
+        'jitter': max(r['jitter'] for r in received_stats),
+        'latency_p50': _percentile(latencies, 50),
+        'latency_p90': _percentile(latencies, 90),
+        'latency_p99': _percentile(latencies, 99),
+        'latency_max': max(latencies) if latencies else None,
+        'audio_per_sec': audio / elapsed,
+        'cpu_per_stream': cpu / elapsed / len(streams),
+        'encode_cpu_per_stream': sum(s.encode_time for s in streams) /
+        elapsed / len(streams),
+        'decode_cpu_per_stream': sum(s.decode_time for s in streams) /
+        elapsed / len(streams),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-s', '--streams', type=int, default=1,
+                        help='number of streams')
+    parser.add_argument('-m', '--mtu', type=int, default=895,
+                        help='media transport MTU')
+    parser.add_argument('-b', '--bitpool', type=int, default=53,
+                        help='SBC bitpool')
+    parser.add_argument('--loss', type=float, default=0.0,
+                        help='percentage of packets dropped')
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help='delay added to each packet in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='maximum random delay added on top of '
+                        '--delay in milliseconds')
+    parser.add_argument('-t', '--seconds', type=float, default=5.0,
+                        help='time to stream for in seconds')
+    parser.add_argument('--flood', action='store_true',
+                        help='send as fast as possible')
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args(argv)
+    results = run(args.streams, args.mtu, args.bitpool, args.loss / 100.0,
+                  args.delay / 1000.0, args.jitter / 1000.0, args.seconds,
+                  args.flood)
+    if (args.json):
+        print(json.dumps(results, sort_keys=True))
+        return
+    for key in sorted(results):
+        value = results[key]
+        if ((key.startswith('latency') or key == 'jitter') and
+                value is not None):
+            print('%-24s %10.3f ms' % (key, value * 1000))
+        elif (isinstance(value, float)):
+            print('%-24s %10.4f' % (key, value))
+        else:
+            print('%-24s %10s' % (key, value))
+
+
+if __name__ == '__main__':
+    main()
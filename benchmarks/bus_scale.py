@@ -0,0 +1,153 @@
+"""
+D-Bus scale benchmark.
+
+Runs bt_manager against the fake bluez service of
+`benchmarks/fakebluez.py`, with any number of devices and streams
+and an optional latency added to every bluez reply:
+
+    python benchmarks/bus_scale.py [-d DEVICES] [-s STREAMS]
+                                   [-l LATENCY] [-t SECONDS]
+
+Needs dbus-python, gobject and `dbus-daemon`, but no Bluetooth
+hardware.
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import os
+import sys
+import time
+
+import dbus
+import dbus.mainloop.glib
+import gobject
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # noqa
+
+from fakebluez import FakeBluez     # noqa
+import bt_manager                   # noqa
+
+
+def _wait(condition, timeout=60.0):
+    """Iterate the main loop until `condition()` is true"""
+    context = gobject.main_context_default()
+    deadline = time.time() + timeout
+    # Wakes the loop up to check the deadline
+    tick = gobject.timeout_add(100, lambda: True)
+    try:
+        while (not condition()):
+            if (time.time() > deadline):
+                raise RuntimeError('timed out')
+            context.iteration(True)
+    finally:
+        gobject.source_remove(tick)
+
+
+def _report(name, seconds, count, unit):
+    print('%-24s %10.1f %12.0f %s/s' % (name, seconds * 1000,
+                                        count / seconds, unit))
+
+
+def bench_properties():
+    start = time.time()
+    adapter = bt_manager.BTAdapter()
+    _report('adapter', time.time() - start, 1, 'adapter')
+
+    start = time.time()
+    paths = adapter.list_devices()
+    _report('list devices', time.time() - start, len(paths), 'device')
+
+    start = time.time()
+    for path in paths:
+        bt_manager.BTDevice(dev_path=path).Name
+    _report('device name', time.time() - start, len(paths), 'device')
+
+    names = ('Alias', 'Pairable', 'PairableTimeout', 'DiscoverableTimeout')
+    values = ('bench', True, 0, 180)
+    start = time.time()
+    for (name, value) in zip(names, values):
+        adapter.set_property(name, value)
+    _report('set property', time.time() - start, len(names), 'write')
+    start = time.time()
+    adapter.set_properties(zip(names, values))
+    _report('set properties', time.time() - start, len(names), 'write')
+    return adapter
+
+
+def bench_discovery(adapter, devices):
+    seen = []
+
+    def found(event, user_arg, device):
+        if (event == bt_manager.BTDiscoverySession.EVENT_DEVICE_NEW):
+            seen.append(device)
+
+    session = bt_manager.BTDiscoverySession(adapter, found, interval=0.5)
+    start = time.time()
+    session.start()
+    _wait(lambda: len(seen) >= devices)
+    _report('discovery', time.time() - start, devices, 'device')
+    session.stop()
+
+
+def bench_streams(adapter, streams, seconds):
+    media = bt_manager.BTMedia()
+    manager = dbus.SystemBus().get_object('org.bluez', '/')
+    fake = dbus.Interface(manager, 'org.bluez.Fake')
+    endpoints = []
+    errors = []
+    start = time.time()
+    for (i, path) in enumerate(adapter.list_devices()[:streams]):
+        endpoint_path = '/bench/source%d' % i
+        endpoint = bt_manager.SBCAudioSource(endpoint_path)
+        media.register_endpoint(endpoint_path, endpoint.get_properties())
+        # Not blocking, since bluez calls the endpoint back
+        fake.StartStream(path, endpoint_path,
+                         reply_handler=lambda path: None,
+                         error_handler=errors.append)
+        endpoints.append((endpoint_path, endpoint))
+    _wait(lambda: errors or all(e.path for (p, e) in endpoints))
+    if (errors):
+        raise errors[0]
+    _report('stream setup', time.time() - start, len(endpoints), 'stream')
+
+    pcm = os.urandom(endpoints[0][1].codec.codesize * 16)
+    encoded = 0
+    start = time.time()
+    while (time.time() - start < seconds):
+        for (path, endpoint) in endpoints:
+            encoded += endpoint.write_transport(pcm)
+    elapsed = time.time() - start
+    audio = encoded / (44100.0 * 4)
+    _report('stream encode', elapsed, audio, 'audio s')
+    stats = fake.TransportStats()
+    packets = sum(s[1] for s in stats.values())
+    _report('stream packets', elapsed, packets, 'packet')
+    for (path, endpoint) in endpoints:
+        endpoint.close_transport()
+        media.unregister_endpoint(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-d', '--devices', type=int, default=1000,
+                        help='number of devices')
+    parser.add_argument('-s', '--streams', type=int, default=100,
+                        help='number of streams')
+    parser.add_argument('-l', '--latency', type=float, default=0.0,
+                        help='delay before each bluez reply in seconds')
+    parser.add_argument('-t', '--seconds', type=float, default=5.0,
+                        help='time to stream for in seconds')
+    args = parser.parse_args(argv)
+    dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+    with FakeBluez(devices=max(args.devices, args.streams),
+                   latency=args.latency):
+        print('%-24s %10s %12s' % ('case', 'time (ms)', 'rate'))
+        adapter = bench_properties()
+        bench_discovery(adapter, args.devices)
+        if (args.streams):
+            bench_streams(adapter, args.streams, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""
+SBC codec benchmark.
+
+Encodes and decodes PCM with every combination of the SBC codec
+configuration (frequency, blocks, subbands, channel mode,
+allocation and bitpool), both through the :py:class:`.SBCCodec`
+wrapper and by calling the C API's `sbc_encode` and `sbc_decode`
+directly, one frame at a time.  For each configuration and layer
+it measures frames per second, CPU time per second of audio and
+cffi allocations per call, and writes a JSON object per line:
+
+    python benchmarks/codec.py [-t SECONDS] [-b BITPOOLS] [-o FILE]
+                               [--frequency HZ] [--subbands N] ...
+
+The first line describes the run, including the SBC primitives
+selected by `sbc_init_primitives` e.g., 'Generic C' or 'MMX', so
+that results of libraries built for different `PLATFORM`s can be
+compared:
+
+    python benchmarks/codec.py --compare BASELINE [-o FILE]
+
+reports the configurations whose frame rate differs from a
+previous run's by more than `--threshold` percent.
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # noqa
+
+import bt_manager                                   # noqa
+from bt_manager import codecs                       # noqa
+from bt_manager.codecs import SBCCodec, SBCCodecConfig, \
+    SBCSamplingFrequency, SBCBlocks, SBCSubbands, SBCChannelMode, \
+    SBCAllocationMethod                             # noqa
+
+
+FREQUENCIES = [(16000, SBCSamplingFrequency.FREQ_16KHZ),
+               (32000, SBCSamplingFrequency.FREQ_32KHZ),
+               (44100, SBCSamplingFrequency.FREQ_44_1KHZ),
+               (48000, SBCSamplingFrequency.FREQ_48KHZ)]
+BLOCKS = [(4, SBCBlocks.BLOCKS_4),
+          (8, SBCBlocks.BLOCKS_8),
+          (12, SBCBlocks.BLOCKS_12),
+          (16, SBCBlocks.BLOCKS_16)]
+SUBBANDS = [(4, SBCSubbands.SUBBANDS_4),
+            (8, SBCSubbands.SUBBANDS_8)]
+CHANNEL_MODES = [('mono', SBCChannelMode.CHANNEL_MODE_MONO),
+                 ('dual', SBCChannelMode.CHANNEL_MODE_DUAL),
+                 ('stereo', SBCChannelMode.CHANNEL_MODE_STEREO),
+                 ('joint', SBCChannelMode.CHANNEL_MODE_JOINT_STEREO)]
+ALLOCATIONS = [('loudness', SBCAllocationMethod.LOUDNESS),
+               ('snr', SBCAllocationMethod.SNR)]
+
+# Frames encoded or decoded per call through the wrapper
+BATCH = 32
+
+
+class _CountingFFI(object):
+    """Counts the buffers the codec wrapper allocates with ffi.new"""
+    def __init__(self, ffi):
+        self._ffi = ffi
+        self.allocations = 0
+
+    def new(self, *args):
+        self.allocations += 1
+        return self._ffi.new(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._ffi, name)
+
+
+def _max_bitpool(subbands, mode):
+    if (mode in ('mono', 'dual')):
+        return min(16 * subbands, 250)
+    return min(32 * subbands, 250)
+
+
+def _cpu():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _measure(function, seconds):
+    """
+    Call `function` repeatedly for about `seconds`.  Returns the
+    number of calls, the wall and CPU time taken and the cffi
+    allocations made.
+    """
+    counting = _CountingFFI(codecs.ffi)
+    codecs.ffi = counting
+    try:
+        calls = 0
+        start = time.time()
+        cpu = _cpu()
+        while (True):
+            function()
+            calls += 1
+            elapsed = time.time() - start
+            if (elapsed >= seconds):
+                break
+        return (calls, elapsed, _cpu() - cpu, counting.allocations)
+    finally:
+        codecs.ffi = counting._ffi
+
+
+def _result(config, layer, operation, frames_per_call, frame_duration,
+            measurement):
+    (calls, elapsed, cpu, allocations) = measurement
+    frames = calls * frames_per_call
+    audio = frames * frame_duration / 1e6
+    result = dict(config)
+    result.update({'layer': layer,
+                   'operation': operation,
+                   'frames_per_sec': frames / elapsed,
+                   'cpu_per_audio_sec': cpu / audio,
+                   'allocations_per_call': float(allocations) / calls})
+    return result
+
+
+def bench_config(config, codec_config, seconds):
+    """
+    Benchmark one configuration through both layers.  Returns a
+    list of result dictionaries.
+    """
+    encoder = SBCCodec(codec_config)
+    decoder = SBCCodec(codec_config)
+    codesize = encoder.codesize
+    frame_length = encoder.frame_length
+    frame_duration = encoder.frame_duration
+    pcm = os.urandom(codesize * BATCH)
+    sbc = encoder.encode_frames(pcm)
+    encoder.reset()
+    results = [
+        _result(config, 'cffi', 'encode', BATCH, frame_duration,
+                _measure(lambda: encoder.encode_frames(pcm), seconds)),
+        _result(config, 'cffi', 'decode', BATCH, frame_duration,
+                _measure(lambda: decoder.decode_frames(sbc), seconds)),
+    ]
+
+    ffi = codecs.ffi
+    lib = encoder.codec
+    pcm_buffer = ffi.new('char[]', pcm[:codesize])
+    sbc_buffer = ffi.new('char[]', frame_length)
+    pcm_output = ffi.new('char[]', codesize)
+    sbc_written = ffi.new('ssize_t *', 0)
+    pcm_written = ffi.new('size_t *', 0)
+    raw_encoder = ffi.new('sbc_t *')
+    raw_decoder = ffi.new('sbc_t *')
+    for raw in (raw_encoder, raw_decoder):
+        lib.sbc_init(raw, 0)
+        for field in ('frequency', 'blocks', 'subbands', 'mode',
+                      'allocation', 'bitpool', 'endian'):
+            setattr(raw, field, getattr(encoder.config, field))
+    lib.sbc_encode(raw_encoder, pcm_buffer, codesize, sbc_buffer,
+                   frame_length, sbc_written)
+    try:
+        results += [
+            _result(config, 'raw', 'encode', 1, frame_duration,
+                    _measure(lambda: lib.sbc_encode(raw_encoder, pcm_buffer,
+                                                    codesize, sbc_buffer,
+                                                    frame_length,
+                                                    sbc_written),
+                             seconds)),
+            _result(config, 'raw', 'decode', 1, frame_duration,
+                    _measure(lambda: lib.sbc_decode(raw_decoder, sbc_buffer,
+                                                    frame_length, pcm_output,
+                                                    codesize, pcm_written),
+                             seconds)),
+        ]
+        implementation = ffi.string(
+            lib.sbc_get_implementation_info(raw_encoder))
+    finally:
+        lib.sbc_finish(raw_encoder)
+        lib.sbc_finish(raw_decoder)
+    for result in results:
+        result['implementation'] = implementation.decode()
+    return results
+
+
+def configurations(args):
+    """Yield (description, SBCCodecConfig) for each configuration"""
+    for (frequency, blocks, subbands, mode, allocation) in itertools.product(
+            FREQUENCIES, BLOCKS, SUBBANDS, CHANNEL_MODES, ALLOCATIONS):
+        if (args.frequency and frequency[0] not in args.frequency or
+                args.blocks and blocks[0] not in args.blocks or
+                args.subbands and subbands[0] not in args.subbands or
+                args.mode and mode[0] not in args.mode or
+                args.allocation and allocation[0] not in args.allocation):
+            continue
+        limit = _max_bitpool(subbands[0], mode[0])
+        for bitpool in sorted(set(min(b, limit) for b in args.bitpools)):
+            description = {'frequency': frequency[0],
+                           'blocks': blocks[0],
+                           'subbands': subbands[0],
+                           'mode': mode[0],
+                           'allocation': allocation[0],
+                           'bitpool': bitpool}
+            yield (description,
+                   SBCCodecConfig(mode[1], frequency[1], allocation[1],
+                                  subbands[1], blocks[1], bitpool, bitpool))
+
+
+def _key(result):
+    return tuple(result[k] for k in ('frequency', 'blocks', 'subbands',
+                                     'mode', 'allocation', 'bitpool',
+                                     'layer', 'operation'))
+
+
+def compare(baseline, results, threshold):
+    """
+    Print the results whose frame rate differs from the baseline's
+    by more than `threshold` percent.  Returns the number printed.
+    """
+    previous = dict((_key(r), r) for r in baseline if 'layer' in r)
+    changed = 0
+    for result in results:
+        old = previous.get(_key(result))
+        if (old is None):
+            continue
+        change = 100.0 * (result['frames_per_sec'] /
+                          old['frames_per_sec'] - 1)
+        if (abs(change) > threshold):
+            changed += 1
+            print('%+7.1f%% %s' % (change, ' '.join(str(k) for k in
+                                                    _key(result))),
+                  file=sys.stderr)
+    return changed
+
+
+def _load(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-t', '--seconds', type=float, default=0.05,
+                        help='time to measure each case for in seconds')
+    parser.add_argument('-b', '--bitpools', default='2,32,53,250',
+                        help='comma separated bitpools, each limited to '
+                        'the maximum of the configuration')
+    parser.add_argument('--frequency', type=int, action='append',
+                        help='only this frequency in Hz')
+    parser.add_argument('--blocks', type=int, action='append',
+                        help='only this number of blocks')
+    parser.add_argument('--subbands', type=int, action='append',
+                        help='only this number of subbands')
+    parser.add_argument('--mode', action='append',
+                        choices=[m for (m, v) in CHANNEL_MODES],
+                        help='only this channel mode')
+    parser.add_argument('--allocation', action='append',
+                        choices=[a for (a, v) in ALLOCATIONS],
+                        help='only this allocation method')
+    parser.add_argument('-o', '--output', help='output file, or stdout')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='results of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='change in percent reported by --compare')
+    args = parser.parse_args(argv)
+    args.bitpools = [int(b) for b in args.bitpools.split(',')]
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    results = []
+    try:
+        output.write(json.dumps({'python': platform.python_version(),
+                                 'machine': platform.machine(),
+                                 'seconds': args.seconds,
+                                 'time': time.time()}) + '\n')
+        for (config, codec_config) in configurations(args):
+            for result in bench_config(config, codec_config, args.seconds):
+                output.write(json.dumps(result, sort_keys=True) + '\n')
+                results.append(result)
+            output.flush()
+    finally:
+        if (args.output):
+            output.close()
+    if (args.compare):
+        compare(_load(args.compare), results, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
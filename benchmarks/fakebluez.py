@@ -0,0 +1,756 @@
+"""
+Fake bluez service for benchmarking without Bluetooth hardware.
+
+Serves the bluez 4 Manager, Adapter, Media, Device, Audio,
+AudioSink, AudioSource and MediaTransport interfaces as
+`org.bluez` on a private dbus-daemon, with any number of adapters
+and devices and an optional latency added to every method reply.
+Media transports are backed by `socketpair(AF_UNIX, SOCK_SEQPACKET)`
+so that acquired file descriptors can be written to and read from.
+
+The service always runs in its own process.  A blocking call made
+on the connection that also serves the call would never be
+answered, and bt_manager's calls are blocking.  Benchmarks start
+it with :py:class:`FakeBluez`, which also points the system bus
+at the private daemon:
+
+    with FakeBluez(devices=1000, latency=0.002) as bluez:
+        adapter = bt_manager.BTAdapter()
+        ...
+
+or it may be run standalone, printing the bus address to use as
+`DBUS_SYSTEM_BUS_ADDRESS`:
+
+    python benchmarks/fakebluez.py [-a ADAPTERS] [-d DEVICES]
+                                   [-l LATENCY] [-m MTU]
+
+Besides the bluez interfaces, a `org.bluez.Fake` interface on
+the manager object drives the remote side of a stream:
+
+* `StartStream(device, endpoint)`: configures a media transport
+  between a device and an endpoint registered with
+  `RegisterEndpoint`, as bluez does when a device connects, and
+  returns its path.  Audio then moves to 'connected' for a source
+  endpoint and to 'playing' for a sink endpoint.
+* `StopStream(transport)`: disconnects the stream again.
+* `TransportStats()`: bytes and packets received by, and sent
+  to, each transport.
+* `Send(transport, data)`: sends a packet to an acquired transport.
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+
+import dbus
+import dbus.bus
+import dbus.mainloop.glib
+import dbus.service
+import gobject
+
+
+SBC_CAPABILITIES = dbus.Array([dbus.Byte(0xFF), dbus.Byte(0xFF),
+                               dbus.Byte(2), dbus.Byte(64)],
+                              signature='y')
+AUDIO_SOURCE_UUID = '0000110a-0000-1000-8000-00805f9b34fb'
+AUDIO_SINK_UUID = '0000110b-0000-1000-8000-00805f9b34fb'
+
+
+def _error(name, message=''):
+    e = dbus.DBusException(message)
+    e._dbus_error_name = 'org.bluez.Error.' + name
+    return e
+
+
+class _Properties(object):
+    """
+    Property store of an object serving several interfaces, each
+    with its own `PropertyChanged` signal.
+    """
+    def _init_properties(self, service):
+        self.service = service
+        self.properties = {}
+        self.writable = {}
+
+    def _get(self, interface, ok):
+        self.service.reply(ok, dbus.Dictionary(self.properties[interface],
+                                               signature='sv'))
+
+    def _set(self, interface, name, value, ok, err):
+        if (name not in self.writable.get(interface, ())):
+            self.service.reply(err, _error('InvalidArguments', name))
+            return
+        self.service.reply(ok)
+        self.change(interface, name, value)
+
+    def change(self, interface, name, value):
+        self.properties[interface][name] = value
+        self._SIGNALS[interface](self, name, value)
+
+
+class _ManagerInterface(dbus.service.Object):
+
+    @dbus.service.method('org.bluez.Manager', in_signature='',
+                         out_signature='a{sv}', async_callbacks=('ok', 'err'))  # noqa
+    def GetProperties(self, ok, err):
+        self._get('org.bluez.Manager', ok)
+
+    @dbus.service.method('org.bluez.Manager', in_signature='',
+                         out_signature='o', async_callbacks=('ok', 'err'))
+    def DefaultAdapter(self, ok, err):
+        self.service.reply(ok, self.service.adapters[0].path)
+
+    @dbus.service.method('org.bluez.Manager', in_signature='s',
+                         out_signature='o', async_callbacks=('ok', 'err'))
+    def FindAdapter(self, pattern, ok, err):
+        for adapter in self.service.adapters:
+            if (pattern in (adapter.address, adapter.path.split('/')[-1])):
+                self.service.reply(ok, adapter.path)
+                return
+        self.service.reply(err, _error('NoSuchAdapter'))
+
+    @dbus.service.method('org.bluez.Manager', in_signature='',
+                         out_signature='ao', async_callbacks=('ok', 'err'))
+    def ListAdapters(self, ok, err):
+        self.service.reply(ok, [a.path for a in self.service.adapters])
+
+    @dbus.service.signal('org.bluez.Manager', signature='o')
+    def AdapterAdded(self, path):
+        pass
+
+    @dbus.service.signal('org.bluez.Manager', signature='o')
+    def AdapterRemoved(self, path):
+        pass
+
+    @dbus.service.signal('org.bluez.Manager', signature='sv')
+    def PropertyChanged(self, name, value):
+        pass
+
+
+class _FakeInterface(dbus.service.Object):
+
+    @dbus.service.method('org.bluez.Fake', in_signature='oo',
+                         out_signature='o', sender_keyword='sender',
+                         async_callbacks=('ok', 'err'))
+    def StartStream(self, device, endpoint, sender, ok, err):
+        self.service.start_stream(device, endpoint, sender, ok, err)
+
+    @dbus.service.method('org.bluez.Fake', in_signature='o',
+                         out_signature='')
+    def StopStream(self, transport):
+        self.service.stop_stream(transport)
+
+    @dbus.service.method('org.bluez.Fake', in_signature='',
+                         out_signature='a{o(tttt)}')
+    def TransportStats(self):
+        return dict((t.path, (t.rx_bytes, t.rx_packets,
+                              t.tx_bytes, t.tx_packets))
+                    for t in self.service.transports.values())
+
+    @dbus.service.method('org.bluez.Fake', in_signature='oay',
+                         out_signature='', byte_arrays=True)
+    def Send(self, transport, data):
+        self.service.transports[transport].send(data)
+
+
+class _Manager(_Properties, _FakeInterface, _ManagerInterface):
+    _SIGNALS = {'org.bluez.Manager': _ManagerInterface.PropertyChanged}
+
+    def __init__(self, service):
+        _Properties._init_properties(self, service)
+        self.properties['org.bluez.Manager'] = {'Adapters': dbus.Array(
+            [a.path for a in service.adapters], signature='o')}
+        self.path = '/'
+        dbus.service.Object.__init__(self, service.bus_name, self.path)
+
+
+class _AdapterInterface(dbus.service.Object):
+
+    @dbus.service.method('org.bluez.Adapter', in_signature='',
+                         out_signature='a{sv}', async_callbacks=('ok', 'err'))  # noqa
+    def GetProperties(self, ok, err):
+        self._get('org.bluez.Adapter', ok)
+
+    @dbus.service.method('org.bluez.Adapter', in_signature='sv',
+                         out_signature='', async_callbacks=('ok', 'err'))
+    def SetProperty(self, name, value, ok, err):
+        self._set('org.bluez.Adapter', name, value, ok, err)
+
+    @dbus.service.method('org.bluez.Adapter', in_signature='s',
+                         out_signature='o', async_callbacks=('ok', 'err'))
+    def FindDevice(self, address, ok, err):
+        device = self.devices.get(address.upper())
+        if (device is None):
+            self.service.reply(err, _error('DoesNotExist', address))
+        else:
+            self.service.reply(ok, device.path)
+
+    @dbus.service.method('org.bluez.Adapter', in_signature='',
+                         out_signature='ao', async_callbacks=('ok', 'err'))
+    def ListDevices(self, ok, err):
+        self.service.reply(ok, [d.path for d in self.devices.values()])
+
+    @dbus.service.method('org.bluez.Adapter', in_signature='s',
+                         out_signature='o', async_callbacks=('ok', 'err'))
+    def CreateDevice(self, address, ok, err):
+        self.FindDevice(address, ok, err)
+
+    @dbus.service.method('org.bluez.Adapter', in_signature='sos',
+                         out_signature='o', async_callbacks=('ok', 'err'))
+    def CreatePairedDevice(self, address, agent, capability, ok, err):
+        device = self.devices.get(address.upper())
+        if (device is None):
+            self.service.reply(err, _error('ConnectionAttemptFailed'))
+            return
+        device.change('org.bluez.Device', 'Paired', dbus.Boolean(True))
+        self.service.reply(ok, device.path)
+
+    @dbus.service.method('org.bluez.Adapter', in_signature='o',
+                         out_signature='', async_callbacks=('ok', 'err'))
+    def RemoveDevice(self, path, ok, err):
+        self.service.reply(ok)
+
+    @dbus.service.method('org.bluez.Adapter', in_signature='',
+                         out_signature='', async_callbacks=('ok', 'err'))
+    def StartDiscovery(self, ok, err):
+        self.service.reply(ok)
+        if (not self.properties['org.bluez.Adapter']['Discovering']):
+            self.change('org.bluez.Adapter', 'Discovering',
+                        dbus.Boolean(True))
+            gobject.idle_add(self._inquiry, iter(list(self.devices.values())))
+
+    @dbus.service.method('org.bluez.Adapter', in_signature='',
+                         out_signature='', async_callbacks=('ok', 'err'))
+    def StopDiscovery(self, ok, err):
+        self.service.reply(ok)
+        if (self.properties['org.bluez.Adapter']['Discovering']):
+            self.change('org.bluez.Adapter', 'Discovering',
+                        dbus.Boolean(False))
+
+    @dbus.service.method('org.bluez.Adapter', in_signature='os',
+                         out_signature='', async_callbacks=('ok', 'err'))
+    def RegisterAgent(self, path, capability, ok, err):
+        self.service.reply(ok)
+
+    @dbus.service.method('org.bluez.Adapter', in_signature='o',
+                         out_signature='', async_callbacks=('ok', 'err'))
+    def UnregisterAgent(self, path, ok, err):
+        self.service.reply(ok)
+
+    @dbus.service.signal('org.bluez.Adapter', signature='sa{sv}')
+    def DeviceFound(self, address, properties):
+        pass
+
+    @dbus.service.signal('org.bluez.Adapter', signature='s')
+    def DeviceDisappeared(self, address):
+        pass
+
+    @dbus.service.signal('org.bluez.Adapter', signature='o')
+    def DeviceCreated(self, path):
+        pass
+
+    @dbus.service.signal('org.bluez.Adapter', signature='o')
+    def DeviceRemoved(self, path):
+        pass
+
+    @dbus.service.signal('org.bluez.Adapter', signature='sv')
+    def PropertyChanged(self, name, value):
+        pass
+
+
+class _MediaInterface(dbus.service.Object):
+
+    @dbus.service.method('org.bluez.Media', in_signature='oa{sv}',
+                         out_signature='', sender_keyword='sender',
+                         async_callbacks=('ok', 'err'))
+    def RegisterEndpoint(self, path, properties, sender, ok, err):
+        self.service.endpoints[(sender, path)] = properties
+        self.service.reply(ok)
+
+    @dbus.service.method('org.bluez.Media', in_signature='o',
+                         out_signature='', sender_keyword='sender',
+                         async_callbacks=('ok', 'err'))
+    def UnregisterEndpoint(self, path, sender, ok, err):
+        self.service.endpoints.pop((sender, path), None)
+        self.service.reply(ok)
+
+
+class _Adapter(_Properties, _MediaInterface, _AdapterInterface):
+    _SIGNALS = {'org.bluez.Adapter': _AdapterInterface.PropertyChanged}
+
+    def __init__(self, service, index, devices):
+        _Properties._init_properties(self, service)
+        self.path = path = '/org/bluez/%d/hci%d' % (os.getpid(), index)
+        self.address = 'AC:7B:A1:00:00:%02X' % index
+        self.devices = {}
+        for i in range(devices):
+            device = _Device(service, path, index * devices + i)
+            self.devices[device.address] = device
+        self.properties['org.bluez.Adapter'] = {
+            'Address': dbus.String(self.address),
+            'Name': dbus.String('fake-hci%d' % index),
+            'Alias': dbus.String('fake-hci%d' % index),
+            'Class': dbus.UInt32(0x6E0100),
+            'Powered': dbus.Boolean(True),
+            'Discoverable': dbus.Boolean(False),
+            'Pairable': dbus.Boolean(True),
+            'PairableTimeout': dbus.UInt32(0),
+            'DiscoverableTimeout': dbus.UInt32(180),
+            'Discovering': dbus.Boolean(False),
+            'Devices': dbus.Array([d.path for d in self.devices.values()],
+                                  signature='o'),
+            'UUIDs': dbus.Array([AUDIO_SOURCE_UUID, AUDIO_SINK_UUID],
+                                signature='s'),
+        }
+        self.writable['org.bluez.Adapter'] = (
+            'Name', 'Alias', 'Powered', 'Discoverable', 'Pairable',
+            'PairableTimeout', 'DiscoverableTimeout')
+        dbus.service.Object.__init__(self, service.bus_name, path)
+
+    def _inquiry(self, devices):
+        # One inquiry result per idle callback, so that calls are
+        # still served while a large inquiry is in progress
+        if (not self.properties['org.bluez.Adapter']['Discovering']):
+            return False
+        for device in devices:
+            self.DeviceFound(device.address, device.inquiry_result())
+            return True
+        self.change('org.bluez.Adapter', 'Discovering', dbus.Boolean(False))
+        return False
+
+
+def _interface_class(name, namespace):
+    # Created under their final name, since dbus-python keys its
+    # introspection data by class name
+    return dbus.service.InterfaceType(str(name), (dbus.service.Object,),
+                                      namespace)
+
+
+def _property_interface(interface):
+    """
+    Return a service object class serving GetProperties,
+    SetProperty and PropertyChanged on the given interface.
+    """
+    @dbus.service.method(interface, in_signature='', out_signature='a{sv}',
+                         async_callbacks=('ok', 'err'))
+    def GetProperties(self, ok, err):
+        self._get(interface, ok)
+
+    @dbus.service.method(interface, in_signature='sv', out_signature='',
+                         async_callbacks=('ok', 'err'))
+    def SetProperty(self, name, value, ok, err):
+        self._set(interface, name, value, ok, err)
+
+    @dbus.service.signal(interface, signature='sv')
+    def PropertyChanged(self, name, value):
+        pass
+
+    return _interface_class('_' + interface.split('.')[-1] + 'Properties',
+                            {'__module__': __name__,
+                             'GetProperties': GetProperties,
+                             'SetProperty': SetProperty,
+                             'PropertyChanged': PropertyChanged})
+
+
+def _connection_interface(interface):
+    """
+    Return a service object class serving Connect, Disconnect and
+    IsConnected on the given interface.
+    """
+    @dbus.service.method(interface, in_signature='', out_signature='',
+                         async_callbacks=('ok', 'err'))
+    def Connect(self, ok, err):
+        self.service.reply(ok)
+        self.connect(interface)
+
+    @dbus.service.method(interface, in_signature='', out_signature='',
+                         async_callbacks=('ok', 'err'))
+    def Disconnect(self, ok, err):
+        self.service.reply(ok)
+        self.disconnect(interface)
+
+    @dbus.service.method(interface, in_signature='', out_signature='b',
+                         async_callbacks=('ok', 'err'))
+    def IsConnected(self, ok, err):
+        self.service.reply(ok, self.properties[interface]['State'] in
+                           ('connected', 'playing'))
+
+    return _interface_class('_' + interface.split('.')[-1] + 'Connection',
+                            {'__module__': __name__,
+                             'Connect': Connect,
+                             'Disconnect': Disconnect,
+                             'IsConnected': IsConnected})
+
+
+_DeviceProperties = _property_interface('org.bluez.Device')
+_AudioProperties = _property_interface('org.bluez.Audio')
+_AudioSinkProperties = _property_interface('org.bluez.AudioSink')
+_AudioSourceProperties = _property_interface('org.bluez.AudioSource')
+_AudioConnection = _connection_interface('org.bluez.Audio')
+_AudioSinkConnection = _connection_interface('org.bluez.AudioSink')
+_AudioSourceConnection = _connection_interface('org.bluez.AudioSource')
+
+
+class _DeviceInterface(dbus.service.Object):
+
+    @dbus.service.method('org.bluez.Device', in_signature='s',
+                         out_signature='a{us}', async_callbacks=('ok', 'err'))  # noqa
+    def DiscoverServices(self, pattern, ok, err):
+        self.service.reply(ok, dbus.Dictionary({}, signature='us'))
+
+    @dbus.service.method('org.bluez.Device', in_signature='',
+                         out_signature='', async_callbacks=('ok', 'err'))
+    def CancelDiscovery(self, ok, err):
+        self.service.reply(ok)
+
+    @dbus.service.method('org.bluez.Device', in_signature='',
+                         out_signature='', async_callbacks=('ok', 'err'))
+    def Disconnect(self, ok, err):
+        self.service.reply(ok)
+        self.disconnect('org.bluez.Audio')
+
+    @dbus.service.signal('org.bluez.Device', signature='')
+    def DisconnectRequested(self):
+        pass
+
+
+class _Device(_Properties, _DeviceInterface, _DeviceProperties,
+              _AudioConnection, _AudioProperties,
+              _AudioSinkConnection, _AudioSinkProperties,
+              _AudioSourceConnection, _AudioSourceProperties):
+    _SIGNALS = {
+        'org.bluez.Device': _DeviceProperties.PropertyChanged,
+        'org.bluez.Audio': _AudioProperties.PropertyChanged,
+        'org.bluez.AudioSink': _AudioSinkProperties.PropertyChanged,
+        'org.bluez.AudioSource': _AudioSourceProperties.PropertyChanged,
+    }
+    _AUDIO = ('org.bluez.Audio', 'org.bluez.AudioSink',
+              'org.bluez.AudioSource')
+
+    def __init__(self, service, adapter_path, index):
+        _Properties._init_properties(self, service)
+        self.address = '00:00:00:%02X:%02X:%02X' % (
+            (index >> 16) & 0xFF, (index >> 8) & 0xFF, index & 0xFF)
+        self.path = path = adapter_path + '/dev_' + \
+            self.address.replace(':', '_')
+        self.rssi = -40 - index % 50
+        self.properties['org.bluez.Device'] = {
+            'Address': dbus.String(self.address),
+            'Name': dbus.String('fake-device-%d' % index),
+            'Alias': dbus.String('fake-device-%d' % index),
+            'Icon': dbus.String('audio-card'),
+            'Class': dbus.UInt32(0x240404),
+            'UUIDs': dbus.Array([AUDIO_SINK_UUID, AUDIO_SOURCE_UUID],
+                                signature='s'),
+            'Paired': dbus.Boolean(False),
+            'Connected': dbus.Boolean(False),
+            'Trusted': dbus.Boolean(False),
+            'Blocked': dbus.Boolean(False),
+            'Nodes': dbus.Array([], signature='o'),
+            'Adapter': dbus.ObjectPath(adapter_path),
+            'LegacyPairing': dbus.Boolean(False),
+        }
+        self.writable['org.bluez.Device'] = ('Trusted', 'Alias', 'Blocked')
+        for interface in _Device._AUDIO:
+            self.properties[interface] = {'State': dbus.String('disconnected')}
+        for interface in _Device._AUDIO[1:]:
+            self.properties[interface].update({
+                'Connected': dbus.Boolean(False),
+                'Playing': dbus.Boolean(False)})
+        dbus.service.Object.__init__(self, service.bus_name, path)
+
+    def inquiry_result(self):
+        device = self.properties['org.bluez.Device']
+        return dbus.Dictionary({'Address': device['Address'],
+                                'Name': device['Name'],
+                                'Class': device['Class'],
+                                'RSSI': dbus.Int16(self.rssi),
+                                'Paired': device['Paired']},
+                               signature='sv')
+
+    def state(self, interface, state):
+        """Move an audio interface, and so the device, to a new state"""
+        if (self.properties[interface]['State'] == state):
+            return
+        self.change(interface, 'State', dbus.String(state))
+        if (interface != 'org.bluez.Audio'):
+            connected = state in ('connected', 'playing')
+            self.change(interface, 'Connected', dbus.Boolean(connected))
+            self.change(interface, 'Playing',
+                        dbus.Boolean(state == 'playing'))
+        connected = any(self.properties[i]['State'] != 'disconnected'
+                        for i in _Device._AUDIO)
+        if (connected != self.properties['org.bluez.Device']['Connected']):
+            self.change('org.bluez.Device', 'Connected',
+                        dbus.Boolean(connected))
+
+    def connect(self, interface):
+        self.state(interface, 'connecting')
+        self.state(interface, 'connected')
+
+    def disconnect(self, interface):
+        for transport in list(self.service.transports.values()):
+            if (transport.device is self):
+                self.service.stop_stream(transport.path)
+        interfaces = _Device._AUDIO if interface == 'org.bluez.Audio' \
+            else (interface,)
+        for i in interfaces:
+            self.state(i, 'disconnected')
+
+
+class _TransportInterface(dbus.service.Object):
+
+    @dbus.service.method('org.bluez.MediaTransport', in_signature='',
+                         out_signature='a{sv}', async_callbacks=('ok', 'err'))  # noqa
+    def GetProperties(self, ok, err):
+        self._get('org.bluez.MediaTransport', ok)
+
+    @dbus.service.method('org.bluez.MediaTransport', in_signature='sv',
+                         out_signature='', async_callbacks=('ok', 'err'))
+    def SetProperty(self, name, value, ok, err):
+        self._set('org.bluez.MediaTransport', name, value, ok, err)
+
+    @dbus.service.method('org.bluez.MediaTransport', in_signature='s',
+                         out_signature='hqq', async_callbacks=('ok', 'err'))  # noqa
+    def Acquire(self, access_type, ok, err):
+        if (self.local is None):
+            self.service.reply(err, _error('NotAuthorized'))
+            return
+        fd = dbus.types.UnixFd(self.local)
+        self.local.close()
+        self.local = None
+        self.service.reply(ok, fd, self.service.mtu, self.service.mtu)
+
+    @dbus.service.method('org.bluez.MediaTransport', in_signature='s',
+                         out_signature='', async_callbacks=('ok', 'err'))
+    def Release(self, access_type, ok, err):
+        self.service.reply(ok)
+
+    @dbus.service.signal('org.bluez.MediaTransport', signature='sv')
+    def PropertyChanged(self, name, value):
+        pass
+
+
+class _Transport(_Properties, _TransportInterface):
+    _SIGNALS = {
+        'org.bluez.MediaTransport': _TransportInterface.PropertyChanged,
+    }
+
+    def __init__(self, service, device, index, uuid, configuration):
+        _Properties._init_properties(self, service)
+        self.device = device
+        self.rx_bytes = self.rx_packets = 0
+        self.tx_bytes = self.tx_packets = 0
+        (self.local, self.remote) = socket.socketpair(socket.AF_UNIX,
+                                                      socket.SOCK_SEQPACKET)
+        self.remote.setblocking(False)
+        self._watch = gobject.io_add_watch(self.remote.fileno(),
+                                           gobject.IO_IN, self._receive)
+        self.properties['org.bluez.MediaTransport'] = {
+            'Device': dbus.ObjectPath(device.path),
+            'UUID': dbus.String(uuid),
+            'Codec': dbus.Byte(0),
+            'Configuration': configuration,
+            'Delay': dbus.UInt16(0),
+        }
+        self.writable['org.bluez.MediaTransport'] = ('Delay',)
+        self.path = device.path + '/fd%d' % index
+        dbus.service.Object.__init__(self, service.bus_name, self.path)
+
+    def _receive(self, fd, condition):
+        try:
+            while (True):
+                n = len(self.remote.recv(65536))
+                if (not n):
+                    return False
+                self.rx_bytes += n
+                self.rx_packets += 1
+        except socket.error:
+            return True
+
+    def send(self, data):
+        try:
+            self.remote.send(data)
+        except socket.error:
+            return
+        self.tx_bytes += len(data)
+        self.tx_packets += 1
+
+    def close(self):
+        gobject.source_remove(self._watch)
+        for s in (self.local, self.remote):
+            if (s is not None):
+                s.close()
+        self.remove_from_connection()
+
+
+class FakeBluezService:
+    """
+    The fake bluez service objects, served on a bus connection
+    from the calling process' gobject main loop.
+
+    :param bus: Bus connection to serve `org.bluez` on.
+    :param int adapters: Number of adapters.
+    :param int devices: Number of devices per adapter.
+    :param float latency: Delay before each method reply in seconds.
+    :param int mtu: MTU of the media transports.
+    """
+    def __init__(self, bus, adapters=1, devices=10, latency=0.0, mtu=895):
+        self.latency = latency
+        self.mtu = mtu
+        self.endpoints = {}
+        self.transports = {}
+        self._transport_index = 0
+        self.bus_name = dbus.service.BusName('org.bluez', bus)
+        self.adapters = [_Adapter(self, i, devices) for i in range(adapters)]
+        self.manager = _Manager(self)
+        self._devices = dict((d.path, d) for a in self.adapters
+                             for d in a.devices.values())
+
+    def reply(self, callback, *args):
+        """Call a method's reply or error callback after the latency"""
+        if (not self.latency):
+            callback(*args)
+            return
+        gobject.timeout_add(max(1, int(round(self.latency * 1000))),
+                            lambda: callback(*args) and False)
+
+    def start_stream(self, device_path, endpoint_path, sender, ok, err):
+        device = self._devices.get(device_path)
+        properties = self.endpoints.get((sender, endpoint_path))
+        if (device is None or properties is None):
+            self.reply(err, _error('DoesNotExist'))
+            return
+        endpoint = dbus.Interface(
+            self.bus_name.get_bus().get_object(sender, endpoint_path),
+            'org.bluez.MediaEndpoint')
+        uuid = properties['UUID'].lower()
+        # The endpoint's role is the opposite of the device's
+        if (uuid == AUDIO_SOURCE_UUID):
+            interface = 'org.bluez.AudioSink'
+        else:
+            interface = 'org.bluez.AudioSource'
+
+        def configured():
+            device.connect(interface)
+            if (interface == 'org.bluez.AudioSource'):
+                device.state(interface, 'playing')
+
+        def selected(configuration):
+            self._transport_index += 1
+            transport = _Transport(self, device, self._transport_index,
+                                   uuid, configuration)
+            self.transports[transport.path] = transport
+            # Replies before the endpoint is configured, since the
+            # endpoint makes calls to this service while configuring
+            self.reply(ok, transport.path)
+            endpoint.SetConfiguration(
+                transport.path,
+                dbus.Dictionary({'Device': dbus.ObjectPath(device.path),
+                                 'UUID': dbus.String(uuid),
+                                 'Codec': dbus.Byte(0),
+                                 'Configuration': configuration},
+                                signature='sv'),
+                signature='oa{sv}',
+                reply_handler=configured,
+                error_handler=lambda e: self.stop_stream(transport.path))
+
+        endpoint.SelectConfiguration(SBC_CAPABILITIES,
+                                     reply_handler=selected,
+                                     error_handler=err)
+
+    def stop_stream(self, transport_path):
+        transport = self.transports.pop(transport_path, None)
+        if (transport is not None):
+            transport.close()
+
+
+class FakeBluez:
+    """
+    Run a :py:class:`FakeBluezService` in a child process on a
+    private dbus-daemon, and point this process' system bus at it.
+    Arguments are passed on to :py:class:`FakeBluezService`.
+
+    Use as a context manager or call :py:meth:`start` and
+    :py:meth:`stop`.  `dbus.SystemBus()` must not have been
+    connected to in this process before :py:meth:`start` is called.
+    """
+    def __init__(self, adapters=1, devices=10, latency=0.0, mtu=895):
+        self.args = ['-a', str(adapters), '-d', str(devices),
+                     '-l', str(latency), '-m', str(mtu)]
+        self.address = None
+        self._daemon = None
+        self._service = None
+
+    def start(self):
+        self._daemon = subprocess.Popen(['dbus-daemon', '--session',
+                                         '--nofork', '--print-address'],
+                                        stdout=subprocess.PIPE)
+        self.address = self._daemon.stdout.readline().strip().decode()
+        self._service = subprocess.Popen([sys.executable, __file__,
+                                          '--bus', self.address] +
+                                         self.args,
+                                         stdout=subprocess.PIPE)
+        if (self._service.stdout.readline().strip() != b'ready'):
+            self.stop()
+            raise RuntimeError('fake bluez service failed to start')
+        os.environ['DBUS_SYSTEM_BUS_ADDRESS'] = self.address
+        return self
+
+    def stop(self):
+        for process in (self._service, self._daemon):
+            if (process is not None and process.poll() is None):
+                process.terminate()
+                process.wait()
+        self._service = self._daemon = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-a', '--adapters', type=int, default=1,
+                        help='number of adapters')
+    parser.add_argument('-d', '--devices', type=int, default=10,
+                        help='number of devices per adapter')
+    parser.add_argument('-l', '--latency', type=float, default=0.0,
+                        help='delay before each method reply in seconds')
+    parser.add_argument('-m', '--mtu', type=int, default=895,
+                        help='media transport MTU')
+    parser.add_argument('--bus', help='address of the bus to serve on, '
+                        'otherwise a private dbus-daemon is started')
+    args = parser.parse_args(argv)
+    dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+    daemon = None
+    if (args.bus is None):
+        daemon = subprocess.Popen(['dbus-daemon', '--session', '--nofork',
+                                   '--print-address'],
+                                  stdout=subprocess.PIPE)
+        args.bus = daemon.stdout.readline().strip().decode()
+        print('DBUS_SYSTEM_BUS_ADDRESS=' + args.bus)
+    bus = dbus.bus.BusConnection(args.bus)
+    FakeBluezService(bus, args.adapters, args.devices, args.latency,
+                     args.mtu)
+    print('ready')
+    sys.stdout.flush()
+    signal.signal(signal.SIGTERM, lambda *args: loop.quit())
+    loop = gobject.MainLoop()
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if (daemon is not None):
+            daemon.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Import-time benchmark.
+
+Times, in fresh interpreters, importing the package alone and
+then the first use of each of its lazily loaded parts, reporting
+the median of several runs:
+
+    python benchmarks/import_time.py [-n RUNS]
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import subprocess
+import sys
+
+
+_SNIPPET = """
+import time
+t = time.time()
+%s
+print(time.time() - t)
+"""
+
+CASES = [
+    ('import bt_manager', 'import bt_manager', ''),
+    ('adapter only', 'import bt_manager', 'bt_manager.BTAdapter'),
+    ('SERVICES', 'import bt_manager', 'len(bt_manager.SERVICES)'),
+    ('VENDORS', 'import bt_manager', 'len(bt_manager.VENDORS)'),
+    ('ATTRIBUTES', 'import bt_manager', 'len(bt_manager.ATTRIBUTES)'),
+    ('ffi', 'import bt_manager', 'bt_manager.ffi.sizeof("sbc_t")'),
+    ('everything', 'from bt_manager import *', 'ffi.sizeof("sbc_t")'),
+]
+
+
+def _time(statement):
+    output = subprocess.check_output([sys.executable, '-c',
+                                      _SNIPPET % statement])
+    return float(output.split()[-1])
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', '--runs', type=int, default=11,
+                        help='number of runs per case')
+    args = parser.parse_args(argv)
+    print('%-20s %12s %12s' % ('case', 'import (ms)', 'access (ms)'))
+    for (name, setup, access) in CASES:
+        base = _median([_time(setup) for _ in range(args.runs)])
+        if (not access):
+            print('%-20s %12.1f %12s' % (name, base * 1000, '-'))
+            continue
+        total = _median([_time(setup + '\n' + access)
+                         for _ in range(args.runs)])
+        print('%-20s %12.1f %12.1f' % (name, base * 1000,
+                                       (total - base) * 1000))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
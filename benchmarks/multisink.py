@@ -0,0 +1,204 @@
+"""
+Synchronized multi-sink playback benchmark.
+
+Plays one stream to many :py:class:`.SBCAudioSource` endpoints
+through a :py:class:`.BTPlaybackClock`, with each endpoint's media
+transport replaced by a `socketpair(AF_UNIX, SOCK_SEQPACKET)`
+drained as soon as packets arrive:
+
+    python benchmarks/multisink.py [-s SINKS] [--delay MS]
+                                   [--drift PPM] [-t SECONDS] [--json]
+
+Each simulated sink reports a random delay of up to `--delay`
+milliseconds, which then drifts at a random rate of up to
+`--drift` parts per million, as a sink whose clock runs slow or
+fast would report.  Every tick, the spread between the times the
+sinks will hear the same sample is measured.  Needs the codec
+library, but neither dbus nor Bluetooth hardware.
+
+Drift is only simulated through the reported delay: nothing plays
+the packets received, which are discarded undecoded.  The spread
+is that of each endpoint's own estimate of when it is heard, from
+:py:meth:`.SBCAudioSource.presentation_time`, against the shared
+timeline.  It measures how closely the playback clock keeps the
+endpoints' estimates together, not the alignment of audio played
+by real sinks.
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # noqa
+
+import bt_manager                                       # noqa
+from bt_manager.codecs import SBCCodecConfig, SBCChannelMode, \
+    SBCSamplingFrequency, SBCAllocationMethod, SBCSubbands, \
+    SBCBlocks                                           # noqa
+
+
+def _config():
+    return SBCCodecConfig(SBCChannelMode.CHANNEL_MODE_JOINT_STEREO,
+                          SBCSamplingFrequency.FREQ_44_1KHZ,
+                          SBCAllocationMethod.LOUDNESS,
+                          SBCSubbands.SUBBANDS_8,
+                          SBCBlocks.BLOCKS_16,
+                          2,
+                          53)
+
+
+class _Sink(object):
+    """
+    A source endpoint whose transport is a socketpair, and the
+    simulated sink's delay
+    """
+    def __init__(self, delay, drift):
+        (self.tx, self.rx) = socket.socketpair(socket.AF_UNIX,
+                                               socket.SOCK_SEQPACKET)
+        self.tx.setblocking(False)
+        self.rx.setblocking(False)
+        endpoint = bt_manager.SBCAudioSource.__new__(bt_manager.SBCAudioSource)
+        endpoint.codec = bt_manager.SBCCodec(_config())
+        endpoint.fd = self.tx.fileno()
+        endpoint.read_mtu = endpoint.write_mtu = 895
+        endpoint.access_type = 'w'
+        endpoint.clock = bt_manager.BTPresentationClock()
+        self.endpoint = endpoint
+        self.delay = delay
+        self.drift = drift
+
+    def report(self, elapsed):
+        """Report the sink's delay, as drifted by `elapsed`"""
+        delay = self.delay + self.drift * elapsed
+        self.endpoint.clock.set_delay(int(delay * 10000))
+
+    def drain(self):
+        while (True):
+            try:
+                self.rx.recv(65536)
+            except socket.error:
+                break
+
+    def close(self):
+        self.tx.close()
+        self.rx.close()
+
+
+def _pcm(seconds):
+    samples = bytearray()
+    for i in range(int(seconds * 44100)):
+        sample = int(8000 * math.sin(i * 0.05)) & 0xFFFF
+        samples.extend((sample & 0xFF, sample >> 8) * 2)
+    return bytes(samples)
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def _cpu():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run(sinks, delay, drift, seconds, latency, tick, settle):
+    """
+    Run the playback and return a dictionary of results.
+    """
+    clock = bt_manager.BTPlaybackClock(latency=latency, tick=tick)
+    sinks = [_Sink(random.uniform(0, delay), random.uniform(-drift, drift))
+             for _ in range(sinks)]
+    for sink in sinks:
+        sink.report(0)
+        clock.add(sink.endpoint)
+    second = _pcm(1.0)
+    clock.write(second)
+    written = 1
+    spreads = []
+    errors = []
+    cpu = _cpu()
+    start = time.time()
+    try:
+        while (True):
+            now = time.time()
+            elapsed = now - start
+            if (elapsed >= seconds):
+                break
+            # Keep a second of audio ahead of the sinks
+            while (written < elapsed + latency + 1):
+                clock.write(second)
+                written += 1
+            for sink in sinks:
+                sink.report(elapsed)
+            clock.update()
+            for sink in sinks:
+                sink.drain()
+            if (elapsed >= settle):
+                measured = [clock.get_stats(s.endpoint)['error']
+                            for s in sinks]
+                spreads.append(max(measured) - min(measured))
+                errors.extend(abs(e) for e in measured)
+            time.sleep(max(0, now + tick - time.time()))
+        cpu = _cpu() - cpu
+        stats = [clock.get_stats(s.endpoint) for s in sinks]
+    finally:
+        for sink in sinks:
+            sink.close()
+    return {
+        'sinks': len(sinks),
+        'seconds': seconds,
+        'spread_p50': _percentile(spreads, 50),
+        'spread_p99': _percentile(spreads, 99),
+        'spread_max': max(spreads),
+        'error_p99': _percentile(errors, 99),
+        'samples_inserted': sum(s['inserted'] for s in stats),
+        'samples_dropped': sum(s['dropped'] for s in stats),
+        'cpu_per_sink': cpu / seconds / len(sinks),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-s', '--sinks', type=int, default=20,
+                        help='number of sinks')
+    parser.add_argument('--delay', type=float, default=150.0,
+                        help='maximum sink delay in milliseconds')
+    parser.add_argument('--drift', type=float, default=200.0,
+                        help='maximum sink clock drift in parts per million')
+    parser.add_argument('-t', '--seconds', type=float, default=10.0,
+                        help='time to play for in seconds')
+    parser.add_argument('-l', '--latency', type=float, default=250.0,
+                        help='playback latency in milliseconds')
+    parser.add_argument('--tick', type=float, default=10.0,
+                        help='interval between writes in milliseconds')
+    parser.add_argument('--settle', type=float, default=1.0,
+                        help='time before measuring in seconds')
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args(argv)
+    results = run(args.sinks, args.delay / 1000.0, args.drift / 1e6,
+                  args.seconds, args.latency / 1000.0, args.tick / 1000.0,
+                  args.settle)
+    if (args.json):
+        print(json.dumps(results, sort_keys=True))
+        return
+    for key in sorted(results):
+        value = results[key]
+        if (key.startswith('spread') or key.startswith('error')):
+            print('%-24s %10.3f ms' % (key, value * 1000))
+        elif (isinstance(value, float)):
+            print('%-24s %10.4f' % (key, value))
+        else:
+            print('%-24s %10s' % (key, value))
+
+
+if __name__ == '__main__':
+    main()
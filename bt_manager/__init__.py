@@ -1,42 +1,159 @@
 from __future__ import unicode_literals
-from distutils.version import StrictVersion
-import cffi
+import importlib
 import os
+import sys
+import types
 
 __version__ = '0.3.1'
 
-if StrictVersion(cffi.__version__) < StrictVersion('0.7'):
+cwd = os.path.dirname(__file__)
+header_file = os.path.join(cwd, 'rtpsbc.h')
+# Declarations shared with the library's sources, needed by header_file
+stats_header_file = os.path.join(cwd, 'rtpsbc_stats.h')
+
+
+def _load_ffi():
+    from distutils.version import StrictVersion
+    import cffi
+
+    if StrictVersion(cffi.__version__) < StrictVersion('0.7'):
         raise RuntimeError(
             'bt_manager requires cffi >= 0.7, but found %s' % cffi.__version__)
 
-ffi = cffi.FFI()
-cwd = os.path.dirname(__file__)
-header_file = os.path.join(cwd, 'rtpsbc.h')
-with open(header_file) as fh:
-    header = fh.read()
-    ffi.cdef(header)
-    fh.close()
-
-from bt_manager.adapter import BTAdapter                 # noqa
-from bt_manager.agent import BTAgent                     # noqa
-from bt_manager.attributes import ATTRIBUTES             # noqa
-from bt_manager.audio import BTAudio, BTAudioSource      # noqa
-from bt_manager.audio import BTAudioSink, SBCAudioCodec  # noqa
-from bt_manager.audio import SBCAudioSource, SBCAudioSink  # noqa
-from bt_manager.cod import BTCoD                         # noqa
-from bt_manager.codecs import *                          # noqa
-from bt_manager.control import BTControl                 # noqa
-from bt_manager.device import BTGenericDevice, BTDevice  # noqa
-from bt_manager.discovery import BTDiscoveryInfo         # noqa
+    ffi = cffi.FFI()
+    for path in (stats_header_file, header_file):
+        with open(path) as fh:
+            ffi.cdef(fh.read())
+    return ffi
+
+
+class _LazyFFI(object):
+    """
+    Stands in for the package's `cffi.FFI` instance so that cffi
+    is only imported, and the codec header only parsed, the first
+    time a codec is used.
+    """
+    _ffi = None
+
+    def __getattr__(self, name):
+        if (_LazyFFI._ffi is None):
+            _LazyFFI._ffi = _load_ffi()
+        value = getattr(_LazyFFI._ffi, name)
+        setattr(self, name, value)
+        return value
+
+
+ffi = _LazyFFI()
+
 from bt_manager.exceptions import *                      # noqa
-from bt_manager.headset import BTHeadset                 # noqa
-from bt_manager.headset import BTHeadsetGateway          # noqa
-from bt_manager.interface import BTSimpleInterface       # noqa
-from bt_manager.interface import BTInterface             # noqa
-from bt_manager.manager import BTManager                 # noqa
-from bt_manager.media import BTMedia, BTMediaTransport   # noqa
-from bt_manager.input import BTInput                     # noqa
-from bt_manager.serviceuuids import SERVICES             # noqa
-from bt_manager.uuid import BTUUID, BTUUID16, BTUUID32   # noqa
-from bt_manager.uuid import BASE_UUID                    # noqa
-from bt_manager.vendors import VENDORS                   # noqa
+
+# Public names and the modules providing them.  Modules are only
+# imported, and their tables built, when one of their names is
+# first accessed.
+_LAZY_ATTRIBUTES = {
+    'BTAdapter': 'adapter',
+    'BTAgent': 'agent',
+    'ATTRIBUTES': 'attributes',
+    'BTAudio': 'audio',
+    'BTAudioSource': 'audio',
+    'BTAudioSink': 'audio',
+    'SBCAudioCodec': 'audio',
+    'SBCAudioSource': 'audio',
+    'SBCAudioSink': 'audio',
+    'BTPresentationClock': 'clock',
+    'BTPlaybackClock': 'clock',
+    'SBCConfigPolicy': 'policy',
+    'SBC_POLICIES': 'policy',
+    'HIGH_QUALITY_BITPOOLS': 'policy',
+    'MIDDLE_QUALITY_BITPOOLS': 'policy',
+    'BTCoD': 'cod',
+    'A2DP_CODECS': 'codecs',
+    'SBCCodecConfig': 'codecs',
+    'SBCSamplingFrequency': 'codecs',
+    'SBCBlocks': 'codecs',
+    'SBCChannelMode': 'codecs',
+    'SBCAllocationMethod': 'codecs',
+    'SBCSubbands': 'codecs',
+    'SBCCodec': 'codecs',
+    'SBC_FREQUENCY_RATES': 'codecs',
+    'PCMResampler': 'codecs',
+    'SBC_SYNCWORD': 'codecs',
+    'sbc_frame_config': 'codecs',
+    'sbc_frame_length': 'codecs',
+    'BTConnectionManager': 'connection',
+    'BTControl': 'control',
+    'BTGenericDevice': 'device',
+    'BTDevice': 'device',
+    'BTDiscoveryInfo': 'discovery',
+    'BTServiceRecord': 'discovery',
+    'parse_service_record': 'discovery',
+    'parse_service_records': 'discovery',
+    'BTDiscoverySession': 'discoverysession',
+    'BTDiscoveredDevice': 'discoverysession',
+    'BTHeadset': 'headset',
+    'BTHeadsetGateway': 'headset',
+    'BTSimpleInterface': 'interface',
+    'BTInterface': 'interface',
+    'BTManager': 'manager',
+    'BTMedia': 'media',
+    'BTMediaTransport': 'media',
+    'BTInput': 'input',
+    'BTLatencyHistogram': 'histogram',
+    'BTMetrics': 'metrics',
+    'METRICS': 'metrics',
+    'PCMFileReader': 'pcmfile',
+    'PCMFileWriter': 'pcmfile',
+    'SBCPrompt': 'prompt',
+    'BTAdapterScheduler': 'scheduler',
+    'BTSignalRouter': 'router',
+    'BTServiceRecordCache': 'sdpcache',
+    'BTTracer': 'tracing',
+    'BTTraceEvent': 'tracing',
+    'TRACER': 'tracing',
+    'SERVICES': 'serviceuuids',
+    'resolve_services': 'serviceuuids',
+    'BTUUID': 'uuid',
+    'BTUUID16': 'uuid',
+    'BTUUID32': 'uuid',
+    'BASE_UUID': 'uuid',
+    'VENDORS': 'vendors',
+}
+
+__all__ = [str(k) for k in sorted(set(_LAZY_ATTRIBUTES) | set(['ffi']) |
+                                  set(k for k in dir() if k.startswith('BT')))]
+
+
+class _LazyModule(types.ModuleType):
+    """
+    Package module resolving the names in :py:data:`_LAZY_ATTRIBUTES`
+    on first access, like a Python 3.7 module `__getattr__`.
+    """
+    def __getattr__(self, name):
+        if (name.startswith('__')):
+            raise AttributeError(name)
+        module = _LAZY_ATTRIBUTES.get(name)
+        try:
+            if (module is None):
+                # Submodule not yet imported e.g., bt_manager.codecs
+                value = importlib.import_module(self.__name__ + '.' + name)
+            else:
+                module = importlib.import_module(self.__name__ + '.' +
+                                                 module)
+                value = getattr(module, name)
+        except ImportError:
+            if (module is not None):
+                raise
+            raise AttributeError(name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(_LAZY_ATTRIBUTES))
+
+
+_module = _LazyModule(__name__, __doc__)
+_module.__dict__.update(globals())
+# The original module must be kept alive as its globals are
+# otherwise cleared when it is garbage collected
+_module._original = sys.modules[__name__]
+sys.modules[__name__] = _module
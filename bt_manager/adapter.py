@@ -1,5 +1,7 @@
 from __future__ import unicode_literals
 
+import dbus
+
 from interface import BTInterface
 from manager import BTManager
 
@@ -17,7 +19,7 @@ class BTAdapter(BTInterface):
 
     * **Address(str) [readonly]**: The Bluetooth device address
         of the adapter.
-    * **Name(str) [readonly]**: The Bluetooth system name
+    * **Name(str) [readwrite]**: The Bluetooth system name
         (pretty hostname).
         This property is either a static system default
         or controlled by an external daemon providing
@@ -108,6 +110,22 @@ class BTAdapter(BTInterface):
         Signal notifying when a device is now out-of-range
     """
 
+    _PROPERTIES = {
+        'Address': (dbus.String, False),
+        'Name': (dbus.String, True),
+        'Alias': (dbus.String, True),
+        'Class': (dbus.UInt32, False),
+        'Powered': (dbus.Boolean, True),
+        'Discoverable': (dbus.Boolean, True),
+        'Pairable': (dbus.Boolean, True),
+        'PairableTimeout': (dbus.UInt32, True),
+        'DiscoverableTimeout': (dbus.UInt32, True),
+        'Discovering': (dbus.Boolean, False),
+        'Devices': (dbus.Array, False),
+        'UUIDs': (dbus.Array, False),
+        'Modalias': (dbus.String, False),
+    }
+
     def __init__(self, adapter_path=None, adapter_id=None):
         manager = BTManager()
         if (adapter_path is None):
@@ -1,18 +1,37 @@
 from __future__ import unicode_literals
 
+import audioop
+import dbus
 import dbus.service
 import gobject
 import pprint
+import fcntl
 import os
+import struct
+import termios
+import time
 
 from device import BTGenericDevice
 from media import GenericEndpoint, BTMediaTransport
 from codecs import SBCChannelMode, SBCSamplingFrequency, \
     SBCAllocationMethod, SBCSubbands, SBCBlocks, A2DP_CODECS, \
-    SBCCodecConfig, SBCCodec
+    SBCCodecConfig, SBCCodec, SBC_FREQUENCY_RATES, PCMResampler, _RTP_SIZE
 from serviceuuids import SERVICES
-from exceptions import BTIncompatibleTransportAccessType, \
-    BTInvalidConfiguration
+from metrics import METRICS
+from clock import BTPresentationClock
+from policy import SBCConfigPolicy, SBC_POLICIES, HIGH_QUALITY_BITPOOLS
+from exceptions import BTIncompatibleTransportAccessType
+
+
+def _remix(data, channels):
+    """
+    Convert 16-bit PCM of whole samples between mono and stereo,
+    averaging the two channels or duplicating the one, to the
+    given number of channels
+    """
+    if (channels == 1):
+        return audioop.tomono(data, 2, 0.5, 0.5)
+    return audioop.tostereo(data, 2, 1, 1)
 
 
 class BTAudio(BTGenericDevice):
@@ -37,30 +56,55 @@ class BTAudio(BTGenericDevice):
 
     See also: :py:class:`.BTGenericDevice` for setup params.
     """
+    _PROPERTIES = {
+        'State': (dbus.String, False),
+    }
+
     def __init__(self, *args, **kwargs):
         BTGenericDevice.__init__(self, addr='org.bluez.Audio',
                                  *args, **kwargs)
 
-    def connect(self):
+    def connect(self, cb_notify_connect=None, cb_notify_error=None):
         """
         Connect all supported audio profiles on the device.
 
+        The call blocks until the device is connected, unless
+        callbacks are given in which case it returns immediately.
+
+        :param func cb_notify_connect: Optional callback on success.
+        :param func cb_notify_error: Optional callback on error.  The
+            callback is called with the error reason.  Must be given
+            together with `cb_notify_connect`.
         :return:
 
         .. note:: This may invoke any registered media
             endpoints where media profiles are compatible.
         """
+        if (cb_notify_connect or cb_notify_error):
+            return self._interface.Connect(reply_handler=cb_notify_connect,
+                                           error_handler=cb_notify_error)
         return self._interface.Connect()
 
-    def disconnect(self):
+    def disconnect(self, cb_notify_disconnect=None, cb_notify_error=None):
         """
         Disconnect all audio profiles on the device
 
+        The call blocks until the device is disconnected, unless
+        callbacks are given in which case it returns immediately.
+
+        :param func cb_notify_disconnect: Optional callback on success.
+        :param func cb_notify_error: Optional callback on error.  The
+            callback is called with the error reason.  Must be given
+            together with `cb_notify_disconnect`.
         :return:
 
         .. note:: This may release any registered media
             endpoints where media profiles are compatible.
         """
+        if (cb_notify_disconnect or cb_notify_error):
+            return self._interface.Disconnect(
+                reply_handler=cb_notify_disconnect,
+                error_handler=cb_notify_error)
         return self._interface.Disconnect()
 
 
@@ -110,6 +154,12 @@ class BTAudioSink(BTAudio):
         remote device is suspended.
     """
 
+    _PROPERTIES = {
+        'State': (dbus.String, False),
+        'Connected': (dbus.Boolean, False),
+        'Playing': (dbus.Boolean, False),
+    }
+
     def __init__(self, *args, **kwargs):
         BTGenericDevice.__init__(self, addr='org.bluez.AudioSink',
                                  *args, **kwargs)
@@ -145,7 +195,8 @@ class SBCAudioCodec(GenericEndpoint):
 
     * Populates `properties` with the capabilities of the codec.
     * `SelectConfiguration`: computes and returns best SBC codec
-        configuration parameters based on device capabilities
+        configuration parameters based on device capabilities,
+        as chosen by the endpoint's :py:class:`.SBCConfigPolicy`
     * `SetConfiguration`: a sub-class notifier function is called
     * `ClearConfiguration`: nothing is done
     * `Release`: nothing
@@ -158,9 +209,50 @@ class SBCAudioCodec(GenericEndpoint):
     which allows transport read and write operations to be
     properly synchronized.
 
+    PCM read and written at a rate other than the negotiated
+    sampling frequency is resampled on the fly.  Where the device
+    supports it, `SelectConfiguration` picks the PCM's own rate
+    so that no resampling is needed.  Likewise stereo PCM is
+    downmixed, and mono PCM duplicated, to match the negotiated
+    channel mode.
+
     See also: :py:class:`SBCAudioSink` and :py:class:`SBCAudioSource`
+
+    :param str uuid: Service UUID of the endpoint.
+    :param str path: Object path of the endpoint.
+    :param int pcm_rate: Optional.  Sampling frequency in Hz of
+        the PCM read from or written to the media transport.
+        Defaults to the negotiated sampling frequency.
+    :param policy: Optional.  :py:class:`.SBCConfigPolicy`, or the
+        name of one in :py:data:`.SBC_POLICIES`, choosing the
+        configuration.  Defaults to `'default'`.
+    :param scheduler: Optional :py:class:`.BTAdapterScheduler` to
+        account each acquired media transport to as a stream.
+    :param int pcm_channels: Optional.  Number of channels, 1 or 2,
+        of the PCM read from or written to the media transport.
+        Defaults to that of the negotiated channel mode.
+    """
+
+    # Channels of the PCM and of the codec, once the media
+    # transport is acquired
+    _channels = (2, 2)
+
+    read_resampler = None
+    """
+    :py:class:`.PCMResampler` converting the PCM read from the
+    negotiated sampling frequency to `pcm_rate`, or `None` if they
+    match or the media transport is not read
     """
-    def __init__(self, uuid, path):
+
+    write_resampler = None
+    """
+    :py:class:`.PCMResampler` converting the PCM written from
+    `pcm_rate` to the negotiated sampling frequency, or `None` if
+    they match or the media transport is not written
+    """
+
+    def __init__(self, uuid, path, pcm_rate=None, policy='default',
+                 scheduler=None, pcm_channels=None):
         config = SBCCodecConfig(SBCChannelMode.ALL,
                                 SBCSamplingFrequency.ALL,
                                 SBCAllocationMethod.ALL,
@@ -173,8 +265,15 @@ class SBCAudioCodec(GenericEndpoint):
         delayed_reporting = dbus.Boolean(True)
         self.tag = None
         self.path = None
+        self.transport = None
         self.user_cb = None
         self.user_arg = None
+        self.pcm_rate = pcm_rate
+        self.pcm_channels = pcm_channels
+        if (not isinstance(policy, SBCConfigPolicy)):
+            policy = SBC_POLICIES[policy]
+        self.policy = policy
+        self.scheduler = scheduler
         self.properties = dbus.Dictionary({'UUID': uuid,
                                            'Codec': codec,
                                            'DelayReporting': delayed_reporting,
@@ -187,7 +286,11 @@ class SBCAudioCodec(GenericEndpoint):
         when transport data is ready to read
         """
         if(self.user_cb):
-            self.user_cb(self.user_arg)
+            if (METRICS.enabled):
+                METRICS.dispatch('transport_ready', fd, self.user_cb,
+                                 self.user_arg)
+            else:
+                self.user_cb(self.user_arg)
         return True
 
     def _install_transport_ready(self):
@@ -247,7 +350,17 @@ class SBCAudioCodec(GenericEndpoint):
         """
         if ('r' not in self.access_type):
             raise BTIncompatibleTransportAccessType
-        return self.codec.decode(self.fd, self.read_mtu)
+        if (METRICS.enabled):
+            data = self._measure_transport('rx', self.codec.decode, self.fd,
+                                           self.read_mtu)
+        else:
+            data = self.codec.decode(self.fd, self.read_mtu)
+        if (self.read_resampler is not None):
+            data = self.read_resampler.process(data)
+        (pcm_channels, channels) = self._channels
+        if (pcm_channels != channels):
+            return _remix(bytes(data), pcm_channels)
+        return data
 
     def write_transport(self, data):
         """
@@ -258,11 +371,95 @@ class SBCAudioCodec(GenericEndpoint):
 
         :param array{byte} data: Payload data to encode,
             encapsulate and send.
+        :return: Number of bytes of `data` that were encoded.
+            When resampling, all of `data` is taken and any
+            remainder shorter than one SBC frame is encoded
+            with the next write, unless audio resampled before
+            could still not be encoded, when none is taken.
+            When remixing, any partial sample is left untaken.
+        :rtype: int
         """
         if ('w' not in self.access_type):
             raise BTIncompatibleTransportAccessType
+        (pcm_channels, channels) = self._channels
+        if (pcm_channels != channels):
+            size = len(data) // (2 * pcm_channels) * 2 * pcm_channels
+            data = _remix(bytes(data[:size]), channels)
+        if (self.write_resampler is not None):
+            # Audio left over by the encoder is sent first, and no
+            # more taken until it is, bounding that held back
+            if (len(self._resampled) >= self.codec.codesize):
+                del self._resampled[:self._encode(self._resampled)]
+                if (len(self._resampled) >= self.codec.codesize):
+                    return 0
+            self._resampled.extend(self.write_resampler.process(data))
+            del self._resampled[:self._encode(self._resampled)]
+            return self._pcm_size(len(data))
+        return self._pcm_size(self._encode(data))
+
+    def _pcm_size(self, size):
+        """Size in bytes of the endpoint's PCM holding as many
+        samples as `size` bytes of the codec's"""
+        (pcm_channels, channels) = self._channels
+        return size * pcm_channels // channels
+
+    def _encode(self, data):
+        if (METRICS.enabled):
+            return self._measure_transport('tx', self.codec.encode, self.fd,
+                                           self.write_mtu, data)
         return self.codec.encode(self.fd, self.write_mtu, data)
 
+    def _transport_counts(self, direction):
+        """
+        Frames, packets and errors counted so far on the media
+        transport in the given direction
+        """
+        stats = self.codec.stats
+        if (direction == 'tx'):
+            return (stats.frames_sent, stats.packets_sent,
+                    stats.eagain + stats.short_writes + stats.write_errors)
+        return (stats.frames_received, stats.packets_received,
+                stats.sequence_gaps)
+
+    def _measure_transport(self, direction, function, *args):
+        """
+        Call a codec function on the media transport, recording
+        the data transferred in :py:data:`.METRICS` from the
+        transport's statistics.
+        """
+        before = self._transport_counts(direction)
+        start = time.time()
+        nbytes = 0
+        failed = 1
+        try:
+            result = function(*args)
+            nbytes = result if (direction == 'tx') else len(result)
+            failed = 0
+            return result
+        finally:
+            after = self._transport_counts(direction)
+            METRICS.record_transport(self.path, direction, nbytes,
+                                     after[0] - before[0],
+                                     after[1] - before[1],
+                                     after[2] - before[2] + failed,
+                                     time.time() - start)
+
+    def get_transport_stats(self):
+        """
+        Return the statistics of the media transport, as kept
+        by the codec while reading and writing it, along with
+        the negotiated MTUs `read_mtu` and `write_mtu`.
+
+        See also: :py:meth:`.SBCCodec.get_stats`
+
+        :return: Dictionary of statistics.
+        :rtype: dict
+        """
+        stats = self.codec.get_stats()
+        stats['read_mtu'] = self.read_mtu
+        stats['write_mtu'] = self.write_mtu
+        return stats
+
     def close_transport(self):
         """
         Forcibly close previously acquired media transport.
@@ -289,18 +486,54 @@ class SBCAudioCodec(GenericEndpoint):
         """
         transport = BTMediaTransport(path=path)
         (fd, read_mtu, write_mtu) = transport.acquire(access_type)
+        self.transport = transport
         self.fd = fd.take()   # We must do the clean-up later
         self.write_mtu = write_mtu
         self.read_mtu = read_mtu
         self.access_type = access_type
         self.path = path
+        if (self.codec.codec_config.channel_mode ==
+                SBCChannelMode.CHANNEL_MODE_MONO):
+            channels = 1
+        else:
+            channels = 2
+        self._channels = (self.pcm_channels or channels, channels)
+        self.read_resampler = None
+        self.write_resampler = None
+        if ('r' in access_type):
+            self.read_resampler = self._make_resampler('r')
+        if ('w' in access_type):
+            self.write_resampler = self._make_resampler('w')
+        self._resampled = bytearray()
         self._install_transport_ready()
+        if (self.scheduler):
+            self.scheduler.transport_acquired(path)
+
+    def _make_resampler(self, direction):
+        """
+        Create the resampler between `pcm_rate` and the negotiated
+        sampling frequency, if they differ, for PCM read ('r') or
+        written ('w') in the given direction
+        """
+        if (not self.pcm_rate):
+            return None
+        config = self.codec.codec_config
+        rate = SBC_FREQUENCY_RATES[config.frequency]
+        if (self.pcm_rate == rate):
+            return None
+        channels = self._channels[1]
+        if (direction == 'w'):
+            return PCMResampler(self.pcm_rate, rate, channels,
+                                codec=self.codec)
+        return PCMResampler(rate, self.pcm_rate, channels, codec=self.codec)
 
     def _release_media_transport(self, path, access_type):
         """
         Should be called by subclass when it is finished
         with the media transport file descriptor
         """
+        if (self.scheduler):
+            self.scheduler.transport_released(path)
         try:
             self._uninstall_transport_ready()
             os.close(self.fd)   # Clean-up previously taken fd
@@ -311,43 +544,10 @@ class SBCAudioCodec(GenericEndpoint):
 
     @staticmethod
     def _default_bitpool(frequency, channel_mode):
-        if (frequency ==
-                SBCSamplingFrequency.FREQ_16KHZ or
-            frequency ==
-                SBCSamplingFrequency.FREQ_32KHZ):
-            return 53
-        elif (frequency ==
-                SBCSamplingFrequency.FREQ_44_1KHZ):
-            if (channel_mode ==
-                    SBCChannelMode.CHANNEL_MODE_MONO or
-                channel_mode ==
-                    SBCChannelMode.CHANNEL_MODE_DUAL):
-                return 31
-            elif (channel_mode ==
-                    SBCChannelMode.CHANNEL_MODE_STEREO or
-                  channel_mode ==
-                    SBCChannelMode.CHANNEL_MODE_JOINT_STEREO):
-                return 53
-            else:
-                # TODO: Invalid channel_mode
-                return 53
-        elif (frequency == SBCSamplingFrequency.FREQ_48KHZ):
-            if (channel_mode ==
-                    SBCChannelMode.CHANNEL_MODE_MONO or
-                channel_mode ==
-                    SBCChannelMode.CHANNEL_MODE_DUAL):
-                return 29
-            elif (channel_mode ==
-                    SBCChannelMode.CHANNEL_MODE_STEREO or
-                  channel_mode ==
-                    SBCChannelMode.CHANNEL_MODE_JOINT_STEREO):
-                return 51
-            else:
-                # TODO: Invalid channel_mode
-                return 51
-        else:
-            # TODO: Invalid frequency
-            return 53
+        return HIGH_QUALITY_BITPOOLS.get(
+            (frequency, channel_mode),
+            HIGH_QUALITY_BITPOOLS.get(
+                (frequency, SBCChannelMode.CHANNEL_MODE_JOINT_STEREO), 53))
 
     @staticmethod
     def _make_config(config):
@@ -399,68 +599,8 @@ class SBCAudioCodec(GenericEndpoint):
     def SelectConfiguration(self, caps):
         our_caps = SBCAudioCodec._parse_config(self.properties['Capabilities'])
         device_caps = SBCAudioCodec._parse_config(caps)
-        frequency = SBCSamplingFrequency.FREQ_44_1KHZ
-
-        if ((our_caps.channel_mode & device_caps.channel_mode) &
-                SBCChannelMode.CHANNEL_MODE_JOINT_STEREO):
-            channel_mode = SBCChannelMode.CHANNEL_MODE_JOINT_STEREO
-        elif ((our_caps.channel_mode & device_caps.channel_mode) &
-              SBCChannelMode.CHANNEL_MODE_STEREO):
-            channel_mode = SBCChannelMode.CHANNEL_MODE_STEREO
-        elif ((our_caps.channel_mode & device_caps.channel_mode) &
-              SBCChannelMode.CHANNEL_MODE_DUAL):
-            channel_mode = SBCChannelMode.CHANNEL_MODE_DUAL
-        elif ((our_caps.channel_mode & device_caps.channel_mode) &
-              SBCChannelMode.CHANNEL_MODE_MONO):
-            channel_mode = SBCChannelMode.CHANNEL_MODE_MONO
-        else:
-            raise BTInvalidConfiguration
-
-        if ((our_caps.block_length & device_caps.block_length) &
-                SBCBlocks.BLOCKS_16):
-            block_length = SBCBlocks.BLOCKS_16
-        elif ((our_caps.block_length & device_caps.block_length) &
-              SBCBlocks.BLOCKS_12):
-            block_length = SBCBlocks.BLOCKS_12
-        elif ((our_caps.block_length & device_caps.block_length) &
-              SBCBlocks.BLOCKS_8):
-            block_length = SBCBlocks.BLOCKS_8
-        elif ((our_caps.block_length & device_caps.block_length) &
-              SBCBlocks.BLOCKS_4):
-            block_length = SBCBlocks.BLOCKS_4
-        else:
-            raise BTInvalidConfiguration
-
-        if ((our_caps.subbands & device_caps.subbands) &
-                SBCSubbands.SUBBANDS_8):
-            subbands = SBCSubbands.SUBBANDS_8
-        elif ((our_caps.subbands & device_caps.subbands) &
-              SBCSubbands.SUBBANDS_4):
-            subbands = SBCSubbands.SUBBANDS_4
-        else:
-            raise BTInvalidConfiguration
-
-        if ((our_caps.allocation_method & device_caps.allocation_method) &
-                SBCAllocationMethod.LOUDNESS):
-            allocation_method = SBCAllocationMethod.LOUDNESS
-        elif ((our_caps.allocation_method & device_caps.allocation_method) &
-              SBCAllocationMethod.SNR):
-            allocation_method = SBCAllocationMethod.SNR
-        else:
-            raise BTInvalidConfiguration
-
-        min_bitpool = max(our_caps.min_bitpool, device_caps.min_bitpool)
-        max_bitpool = min(SBCAudioCodec._default_bitpool(frequency,
-                                                         channel_mode),
-                          device_caps.max_bitpool)
-
-        selected_config = SBCCodecConfig(channel_mode,
-                                         frequency,
-                                         allocation_method,
-                                         subbands,
-                                         block_length,
-                                         min_bitpool,
-                                         max_bitpool)
+        selected_config = self.policy.select(our_caps, device_caps,
+                                             self.pcm_rate)
 
         # Create SBC codec based on selected configuration
         self.codec = SBCCodec(selected_config)
@@ -489,9 +629,14 @@ class SBCAudioSink(SBCAudioCodec):
     endpoint steps
     """
     def __init__(self,
-                 path='/endpoint/a2dpsink'):
+                 path='/endpoint/a2dpsink',
+                 pcm_rate=None,
+                 policy='default',
+                 scheduler=None,
+                 pcm_channels=None):
         uuid = dbus.String(SERVICES['AudioSink'].uuid)
-        SBCAudioCodec.__init__(self, uuid, path)
+        SBCAudioCodec.__init__(self, uuid, path, pcm_rate, policy,
+                               scheduler, pcm_channels)
 
     def _property_change_event_handler(self, signal, transport, *args):
         """
@@ -527,11 +672,214 @@ class SBCAudioSource(SBCAudioCodec):
 
     Refer to :py:class:`SBCAudioCodec` for basic overview of
     endpoint steps
+
+    While the media transport is acquired, the endpoint tracks
+    the delay reported by the sink and the latency of its own
+    writes, so that applications may tell when audio will be
+    heard.  See :py:meth:`presentation_time`
+    """
+
+    clock = None
+    """
+    :py:class:`.BTPresentationClock` of the media transport,
+    or `None` while it is not acquired.  Each acquisition of
+    the transport starts a new clock.
     """
+
     def __init__(self,
-                 path='/endpoint/a2dpsource'):
+                 path='/endpoint/a2dpsource',
+                 pcm_rate=None,
+                 policy='default',
+                 scheduler=None,
+                 pcm_channels=None):
         uuid = dbus.String(SERVICES['AudioSource'].uuid)
-        SBCAudioCodec.__init__(self, uuid, path)
+        SBCAudioCodec.__init__(self, uuid, path, pcm_rate, policy,
+                               scheduler, pcm_channels)
+
+    def write_transport(self, data):
+        """
+        Write data to media transport.  The data is
+        encoded using the SBC codec and RTP encapsulated
+        before being written to the transport file
+        descriptor.
+
+        :param array{byte} data: Payload data to encode,
+            encapsulate and send.
+        :return: Number of bytes of `data` that were encoded.
+        :rtype: int
+        """
+        if (self.clock is None):
+            return SBCAudioCodec.write_transport(self, data)
+        if (self.write_resampler is not None):
+            return self._clocked_write(
+                lambda: SBCAudioCodec.write_transport(self, data),
+                self._channels[0] * 2, 1.0 / self.pcm_rate, True)
+        return self._clocked_write(
+            lambda: SBCAudioCodec.write_transport(self, data),
+            self._pcm_size(self.codec.codesize),
+            self.codec.frame_duration / 1e6, True)
+
+    def accepts_frames(self, data):
+        """
+        Check whether pre-encoded SBC frames match the negotiated
+        configuration and so may be sent with
+        :py:meth:`write_transport_frames`.
+
+        :param array{byte} data: SBC frames to check.
+        :return: `True` if the frames are compatible, `False`
+            otherwise.
+        :rtype: boolean
+        """
+        return self.codec.accepts_frames(data)
+
+    def write_transport_frames(self, data):
+        """
+        Write pre-encoded SBC frames to media transport.  The
+        frames are RTP encapsulated as-is, bypassing the SBC
+        encoder altogether.
+
+        :param array{byte} data: SBC frames to send.  See
+            :py:meth:`accepts_frames`.
+        :return: Number of bytes of `data` that were sent.
+        :rtype: int
+        """
+        if ('w' not in self.access_type):
+            raise BTIncompatibleTransportAccessType
+        if (self.clock is None):
+            return self.codec.send_frames(self.fd, self.write_mtu, data)
+        return self._clocked_write(
+            lambda: self.codec.send_frames(self.fd, self.write_mtu, data),
+            self.codec.frame_length, self.codec.frame_duration / 1e6)
+
+    def _clocked_write(self, write, frame_size, frame_duration,
+                       encoded=False):
+        """
+        Write to the media transport, accounting for the audio
+        written in :py:attr:`clock`.  `write` returns the number
+        of bytes written, in frames of `frame_size` bytes each
+        lasting `frame_duration` seconds.  If `encoded`, the bytes
+        written include those of packets the encoder dropped since
+        the transport would have blocked, which are never heard.
+        """
+        eagain = self.codec.stats.eagain
+        start = time.time()
+        written = write()
+        now = time.time()
+        duration = written // frame_size * frame_duration
+        if (encoded):
+            # Packets are taken as full, as all but the last of a
+            # write are
+            frames = min(15, (self.write_mtu - _RTP_SIZE) //
+                         self.codec.frame_length)
+            duration = max(0.0, duration -
+                           (self.codec.stats.eagain - eagain) * frames *
+                           self.codec.frame_duration / 1e6)
+        self.clock.wrote(duration, now - start, now)
+        return written
+
+    def presentation_time(self, position=None):
+        """
+        Return the time a sample is heard by the sink, as returned
+        by `time.time()`.  This accounts for the audio already
+        queued on the media transport, the time taken to resample,
+        encode and write it and the delay reported by the sink.
+
+        :param float position: Optional.  Position of the sample
+            in seconds of audio written since the media transport
+            was acquired.  Defaults to the next sample to be
+            written.
+        :return: Time the sample is heard, or `None` if the media
+            transport is not acquired.
+        :rtype: float
+        """
+        if (self.clock is None):
+            return None
+        return self.clock.presentation_time(position) + \
+            self._resample_delay()
+
+    def _resample_delay(self):
+        """Delay of the audio through the resampler, including
+        that held back until a whole SBC frame is resampled"""
+        resampler = self.write_resampler
+        if (resampler is None):
+            return 0.0
+        return resampler.delay + float(len(self._resampled)) / \
+            (resampler.channels * 2) / resampler.out_rate
+
+    def get_latency(self):
+        """
+        Return the latency from writing a sample to it being
+        heard, in seconds, and its components:
+
+        * **delay**: Delay reported by the sink
+        * **resample**: Delay through the resampler, if any
+        * **encode**: Time taken to encode and write a block of
+            audio, averaged over recent writes
+        * **queue**: Audio written but not yet played
+        * **total**: Sum of the above
+
+        :return: Dictionary of latencies, or `None` if the media
+            transport is not acquired.
+        :rtype: dict
+        """
+        if (self.clock is None):
+            return None
+        now = time.time()
+        resample = self._resample_delay()
+        return {'delay': self.clock.delay,
+                'resample': resample,
+                'encode': self.clock.encode_latency,
+                'queue': self.clock.queued(now),
+                'total': self.clock.latency(now) + resample}
+
+    def measure_queue(self):
+        """
+        Correct the estimate of the audio queued on the media
+        transport, see :py:meth:`get_latency`, from the data
+        waiting in its socket's send queue.  Only useful for
+        transports whose queue drains as the audio is played.
+
+        :return: Duration of the audio queued in seconds.
+        :rtype: float
+        """
+        nbytes = struct.unpack(b'i', fcntl.ioctl(self.fd, termios.TIOCOUTQ,
+                                                 b'\0' * 4))[0]
+        queued = float(nbytes) / self.codec.frame_length * \
+            self.codec.frame_duration / 1e6
+        self.clock.observe_queue(queued)
+        return queued
+
+    def _acquire_media_transport(self, path, access_type):
+        """
+        Acquire the media transport and start tracking the delay
+        reported by the sink
+        """
+        SBCAudioCodec._acquire_media_transport(self, path, access_type)
+        self.clock = BTPresentationClock()
+        self.clock.set_delay(self.transport.Delay or 0)
+        self.transport.add_signal_receiver(
+            self._transport_property_changed,
+            BTMediaTransport.SIGNAL_PROPERTY_CHANGED, None)
+
+    def _release_media_transport(self, path, access_type):
+        """
+        Stop tracking the sink's delay and release the media
+        transport
+        """
+        self.clock = None
+        if (self.transport):
+            self.transport.remove_signal_receiver(
+                BTMediaTransport.SIGNAL_PROPERTY_CHANGED)
+            self.transport = None
+        SBCAudioCodec._release_media_transport(self, path, access_type)
+
+    def _transport_property_changed(self, signal, user_arg, name, value):
+        """
+        Handler for the media transport's property changes,
+        tracking the delay reported by the sink
+        """
+        if (name == 'Delay' and self.clock):
+            self.clock.set_delay(value)
 
     def _property_change_event_handler(self, signal, transport, *args):
         """
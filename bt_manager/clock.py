@@ -0,0 +1,374 @@
+from __future__ import unicode_literals
+
+import gobject
+import time
+
+
+class BTPresentationClock(object):
+    """
+    Tracks when audio written to a media transport will be heard.
+
+    Audio written to the transport is queued, by the kernel and
+    the adapter, ahead of being played out in real time by the
+    sink, which adds its own delay as reported with the transport's
+    `Delay` property.  The time each sample is heard is thus the
+    time the queue in front of it finishes playing plus the sink's
+    delay.  Samples not yet written are further delayed by the time
+    taken to encode and write them, estimated from recent writes.
+
+    All times are in seconds, as returned by `time.time()`.
+    """
+
+    # Weight of each new write in the encode latency estimate, as
+    # for the RFC 3550 jitter estimate
+    _GAIN = 1 / 16.0
+
+    def __init__(self):
+        self.delay = 0.0
+        self.encode_latency = 0.0
+        self.written = 0.0
+        self._play_end = 0.0
+
+    def set_delay(self, delay):
+        """
+        Set the delay reported by the sink.
+
+        :param int delay: Delay in 1/10 of milliseconds, as given
+            by the transport's `Delay` property.
+        :return:
+        """
+        self.delay = delay / 10000.0
+
+    def wrote(self, duration, latency, now=None):
+        """
+        Account for audio written to the transport.
+
+        :param float duration: Duration of the audio written.
+        :param float latency: Time taken to encode and write it.
+        :param float now: Optional.  Time the write completed.
+        :return:
+        """
+        if (now is None):
+            now = time.time()
+        if (duration):
+            self.encode_latency += (latency - self.encode_latency) * \
+                BTPresentationClock._GAIN
+        self._play_end = max(self._play_end, now) + duration
+        self.written += duration
+
+    def queued(self, now=None):
+        """
+        :param float now: Optional.  Current time.
+        :return: Duration of the audio written but not yet played.
+        :rtype: float
+        """
+        if (now is None):
+            now = time.time()
+        return max(0.0, self._play_end - now)
+
+    def latency(self, now=None):
+        """
+        :param float now: Optional.  Current time.
+        :return: Time from writing a sample to it being heard.
+        :rtype: float
+        """
+        return self.encode_latency + self.queued(now) + self.delay
+
+    def presentation_time(self, position=None, now=None):
+        """
+        Return the time a sample is, or was, heard.  Samples
+        written before the queue last ran dry are assumed to have
+        been played without interruption.
+
+        :param float position: Optional.  Position of the sample
+            in seconds of audio from the start of the stream.
+            Defaults to the next sample to be written.
+        :param float now: Optional.  Current time.
+        :return: Time the sample is heard.
+        :rtype: float
+        """
+        if (now is None):
+            now = time.time()
+        if (position is None):
+            position = self.written
+        if (position < self.written):
+            end = self._play_end
+        else:
+            end = max(self._play_end, now + self.encode_latency)
+        return end + (position - self.written) + self.delay
+
+    def observe_queue(self, queued, now=None):
+        """
+        Correct the estimate of the audio queued from a
+        measurement e.g., of the transport's socket send queue.
+
+        :param float queued: Duration of the audio queued.
+        :param float now: Optional.  Time of the measurement.
+        :return:
+        """
+        if (now is None):
+            now = time.time()
+        self._play_end = now + queued
+
+
+class _SyncedSource(object):
+    """
+    Position in the shared stream of a source endpoint played to
+    by :py:class:`BTPlaybackClock`
+    """
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.inserted = 0
+        self.dropped = 0
+        self.reset(None)
+
+    def reset(self, clock):
+        """Start over on the endpoint's media transport clock,
+        or `None` until the media transport is acquired"""
+        self.clock = clock
+        # Stream byte position of the next byte to buffer, or None
+        # until the media transport is acquired
+        self.offset = None
+        # PCM to write, including samples inserted
+        self.pending = bytearray()
+        # Bytes written and the stream position of the next one
+        self.written = 0
+        self.skew = 0
+        # (bytes written, change of skew) of pending corrections
+        self.corrections = []
+
+    def head(self):
+        """Stream byte position of the next sample to write"""
+        return self.written + self.skew
+
+    def wrote(self, nbytes):
+        self.written += nbytes
+        while (self.corrections and self.corrections[0][0] <= self.written):
+            self.skew += self.corrections.pop(0)[1]
+
+
+class BTPlaybackClock(object):
+    """
+    Plays a PCM stream in sync to any number of
+    :py:class:`.SBCAudioSource` endpoints e.g., speakers in
+    different rooms, against a shared clock.
+
+    PCM written with :py:meth:`write` is placed on a common
+    timeline, starting `latency` seconds after the first write:
+    the sample `p` seconds into the stream is to be heard by every
+    sink at the start time plus `p`.  Every `tick` seconds, each
+    endpoint whose media transport is acquired is written the
+    audio due to be heard within the next `latency` plus `tick`
+    seconds.  The time the endpoint's next sample is heard, see
+    :py:meth:`.SBCAudioSource.presentation_time`, is compared with
+    the timeline beforehand and any error larger than `tolerance`
+    removed by dropping samples or repeating the last one.  The
+    error is removed by at most `max_correction` seconds per tick,
+    which is inaudible, or at once if larger than `resync` e.g.,
+    when an endpoint joins or its sink's delay changes.  An
+    endpoint whose media transport is released and acquired again
+    rejoins the stream as if newly added.
+
+    Clock drift between the sinks shows up as changes in the
+    delay they report.  Sinks that do not report delay may
+    instead be kept in sync by measuring the transport's send
+    queue with `measure_queue`, if it drains in real time.
+
+    :param int rate: Optional.  Sampling frequency of the PCM in Hz.
+    :param int channels: Optional.  Number of 16-bit channels.
+    :param float latency: Optional.  Time from writing audio to
+        the endpoints to it being heard in seconds.  Must exceed
+        the delay of every sink.
+    :param float tick: Optional.  Interval between writes in
+        seconds.
+    :param float tolerance: Optional.  Error left uncorrected in
+        seconds.
+    :param float max_correction: Optional.  Largest correction
+        made per tick in seconds.
+    :param float resync: Optional.  Error corrected at once in
+        seconds.
+    :param bool measure_queue: Optional.  Measure the transports'
+        send queues.  See :py:meth:`.SBCAudioSource.measure_queue`
+    """
+    def __init__(self, rate=44100, channels=2, latency=0.25, tick=0.01,
+                 tolerance=0.001, max_correction=0.0002, resync=0.05,
+                 measure_queue=False):
+        self.rate = rate
+        self.sample_size = 2 * channels
+        self.latency = latency
+        self.tick = tick
+        self.tolerance = tolerance
+        self.max_correction = max_correction
+        self.resync = resync
+        self.measure_queue = measure_queue
+        self.start_time = None
+        self._sources = []
+        self._buffer = bytearray()
+        self._base = 0
+        self._timer = None
+
+    @property
+    def bytes_per_second(self):
+        """Bytes of PCM per second of audio"""
+        return self.rate * self.sample_size
+
+    @property
+    def end(self):
+        """Stream byte position of the end of the PCM written"""
+        return self._base + len(self._buffer)
+
+    def _position(self, when):
+        """Stream byte position heard at the given time, whole
+        samples only"""
+        position = int((when - self.start_time) * self.bytes_per_second)
+        return position - position % self.sample_size
+
+    def write(self, data, now=None):
+        """
+        Append PCM to the stream.
+
+        :param array{byte} data: PCM data, in whole samples.
+        :param float now: Optional.  Current time.
+        :return: Time the first sample of `data` is heard.
+        :rtype: float
+        """
+        if (self.start_time is None):
+            self.start_time = (time.time() if now is None else now) + \
+                self.latency
+        heard = self.start_time + float(self.end) / self.bytes_per_second
+        self._buffer.extend(data)
+        return heard
+
+    def add(self, endpoint):
+        """
+        Play the stream to an endpoint, from the time its media
+        transport is acquired.
+
+        :param endpoint: :py:class:`.SBCAudioSource` instance.
+        :return:
+        """
+        self._sources.append(_SyncedSource(endpoint))
+
+    def remove(self, endpoint):
+        """
+        Stop playing the stream to an endpoint.
+
+        :param endpoint: :py:class:`.SBCAudioSource` instance.
+        :return:
+        """
+        self._sources = [s for s in self._sources
+                         if s.endpoint is not endpoint]
+
+    def get_stats(self, endpoint):
+        """
+        :param endpoint: :py:class:`.SBCAudioSource` instance.
+        :return: Dictionary of the number of samples `inserted`
+            and `dropped` to keep the endpoint in sync and its
+            current `error` in seconds, positive if late, or
+            `None` while its media transport is not acquired.
+        :rtype: dict
+        """
+        for source in self._sources:
+            if (source.endpoint is endpoint):
+                return {'inserted': source.inserted,
+                        'dropped': source.dropped,
+                        'error': self._error(source)}
+
+    def start(self):
+        """
+        Start writing to the endpoints from the main loop every
+        `tick` seconds.
+
+        :return:
+        """
+        if (self._timer is None):
+            self._timer = gobject.timeout_add(int(self.tick * 1000),
+                                              self._timeout)
+
+    def stop(self):
+        """
+        Stop writing to the endpoints.
+
+        :return:
+        """
+        if (self._timer is not None):
+            gobject.source_remove(self._timer)
+            self._timer = None
+
+    def _timeout(self):
+        self.update()
+        return True
+
+    def _error(self, source):
+        if (source.offset is None or
+                source.endpoint.clock is not source.clock):
+            return None
+        heard = source.endpoint.presentation_time()
+        return heard - self.start_time - \
+            float(source.head()) / self.bytes_per_second
+
+    def update(self, now=None):
+        """
+        Write the audio now due to every endpoint, correcting
+        their errors.  Called every `tick` seconds once started.
+
+        :param float now: Optional.  Current time.
+        :return:
+        """
+        if (self.start_time is None):
+            return
+        if (now is None):
+            now = time.time()
+        for source in self._sources:
+            clock = source.endpoint.clock
+            if (clock is not source.clock):
+                # The media transport was released or acquired again,
+                # so join the stream afresh
+                source.reset(clock)
+            if (clock is not None):
+                self._update(source, now)
+        low = [s.offset for s in self._sources if s.offset is not None]
+        low = min(low + [max(self._base, self._position(now))])
+        del self._buffer[:low - self._base]
+        self._base = low
+
+    def _update(self, source, now):
+        endpoint = source.endpoint
+        sample = self.sample_size
+        if (self.measure_queue):
+            endpoint.measure_queue()
+        if (source.offset is None):
+            # Join so that audio written now is heard on time
+            source.offset = min(self.end, max(self._base, self._position(
+                now + self.latency)))
+            source.skew = source.offset
+        error = self._error(source)
+        if (abs(error) > self.tolerance):
+            if (abs(error) < self.resync):
+                error = max(-self.max_correction,
+                            min(self.max_correction, error))
+            nbytes = int(abs(error) * self.rate) * sample
+            if (error > 0):
+                # Late, so skip samples
+                nbytes = min(nbytes, self.end - source.offset)
+                source.offset += nbytes
+                source.dropped += nbytes // sample
+            else:
+                # Early, so repeat the last sample, if any
+                index = source.offset - self._base
+                last = self._buffer[index - sample:index] \
+                    if index >= sample else bytearray(sample)
+                source.pending.extend(last * (nbytes // sample))
+                source.inserted += nbytes // sample
+                nbytes = -nbytes
+            source.corrections.append((source.written + len(source.pending),
+                                       nbytes))
+        due = min(self.end, self._position(now + self.latency + self.tick))
+        if (due > source.offset):
+            source.pending.extend(self._buffer[source.offset - self._base:
+                                               due - self._base])
+            source.offset = due
+        if (source.pending):
+            written = endpoint.write_transport(bytes(source.pending))
+            del source.pending[:written]
+            source.wrote(written)
@@ -1,7 +1,9 @@
 from __future__ import unicode_literals
 
+from collections import OrderedDict
 
-class BTCoD:
+
+class BTCoD(object):
     """
     Bluetooth class of device decoder for providing
     a human readable form of the device class value.
@@ -28,6 +30,12 @@ class BTCoD:
     .. note:: The class of device may be obtained from both
         the :py:class:`.BTAdapter` and :py:class:`.BTDevice`
         classes using the `Class` attribute.
+
+    .. note:: Decoding is done with precomputed tables and
+        instances are shared i.e., constructing a BTCoD from a
+        value recently decoded returns the existing instance.
+        Up to `_CACHE_SIZE` instances are kept, evicting the
+        oldest.  Bits above the 24-bit class of device are ignored.
     """
 
     _MAJOR_SERVICE_POS = 13
@@ -62,6 +70,10 @@ class BTCoD:
         0x1F00: 'Uncategorized: device code not specified'
     }
 
+    # Major and minor device class fields together
+    _DEVICE_POS = 2
+    _DEVICE_MASK = 0x001FFC
+
     _MINOR_DEVICE_CLASS = {
         0x0100: [{'mask': 0x1C, 'pos': 2,
                   0x00: 'Uncategorized, code for device not assigned',
@@ -160,8 +172,43 @@ class BTCoD:
                   0x3C: 'Personal Mobility Device'}]
     }
 
-    def __init__(self, cod):
-        self.cod = cod
+    _COD_MASK = 0xFFFFFF
+
+    # Decoded classes of device, keyed by 24-bit value
+    _CACHE_SIZE = 1024
+    _instances = OrderedDict()
+
+    def __new__(cls, cod):
+        cod = int(cod) & cls._COD_MASK
+        obj = cls._instances.get(cod)
+        if (obj is None):
+            obj = object.__new__(cls)
+            obj.cod = cod
+            obj._major_service = cls._SERVICE_TABLE[
+                (cod & cls._MAJOR_SERVICE_MASK) >> cls._MAJOR_SERVICE_POS]
+            obj._major_device = cls._DEVICE_TABLE[
+                (cod & cls._MAJOR_DEVICE_MASK) >> cls._MAJOR_DEVICE_POS]
+            obj._minor_device = cls._MINOR_TABLE[
+                (cod & cls._DEVICE_MASK) >> cls._DEVICE_POS]
+            obj._str = None
+            while (len(cls._instances) >= cls._CACHE_SIZE):
+                cls._instances.popitem(last=False)
+            cls._instances[cod] = obj
+        return obj
+
+    @classmethod
+    def decode_many(cls, cods):
+        """
+        Decode a sequence of class of device values e.g., the
+        `Class` values of inquiry results, in a single call.
+
+        :param list cods: 24-bit integer class of device values.
+        :return: decoded class of device of each value, in order
+        :rtype: list of :py:class:`BTCoD`
+        """
+        instances = cls._instances
+        mask = cls._COD_MASK
+        return [instances.get(cod & mask) or cls(cod) for cod in cods]
 
     @property
     def major_service_class(self):
@@ -169,11 +216,7 @@ class BTCoD:
         Return the major service class property decoded e.g.,
         Audio, Telephony, etc
         """
-        major_service = []
-        for i in BTCoD._MAJOR_SERVICE_CLASS.keys():
-            if (self.cod & i):
-                major_service.append(BTCoD._MAJOR_SERVICE_CLASS[i])
-        return major_service
+        return list(self._major_service)
 
     @property
     def major_device_class(self):
@@ -181,9 +224,7 @@ class BTCoD:
         Return the major device class property decoded e.g.,
         Computer, Audio/Video, Toy, etc.
         """
-        return BTCoD._MAJOR_DEVICE_CLASS.get(self.cod &
-                                             BTCoD._MAJOR_DEVICE_MASK,
-                                             'Unknown')
+        return self._major_device
 
     @property
     def minor_device_class(self):
@@ -191,21 +232,46 @@ class BTCoD:
         Return the minor device class property decoded e.g.,
         Scanner, Printer, Loudspeaker, Camera, etc.
         """
-        minor_device = []
-        minor_lookup = BTCoD._MINOR_DEVICE_CLASS.get(self.cod &
-                                                     BTCoD._MAJOR_DEVICE_MASK,
-                                                     [])
-        for i in minor_lookup:
-            minor_value = self.cod & i.get('mask')
-            minor_device.append(i.get(minor_value, 'Unknown'))
-        return minor_device
+        return list(self._minor_device)
 
     def __str__(self):
         """Stringify all elements of the class of device"""
-        return '<cod:' + str(hex(self.cod)) + ' Major Service:' + str(self.major_service_class) + \
-            ' Major Device:' + \
-            self.major_device_class + ' Minor Device:' + \
-            str(self.minor_device_class) + '>'
+        if (self._str is None):
+            self._str = '<cod:' + str(hex(self.cod)) + ' Major Service:' + str(self.major_service_class) + \
+                ' Major Device:' + \
+                self.major_device_class + ' Minor Device:' + \
+                str(self.minor_device_class) + '>'
+        return self._str
 
     def __repr__(self):
         return self.__str__()
+
+
+def _build_tables():
+    """
+    Precompute the decoded major service classes for every value
+    of the 11 service bits, and the decoded major and minor device
+    classes for every value of the 5 major and 6 minor device bits.
+    """
+    services = sorted(BTCoD._MAJOR_SERVICE_CLASS.items())
+    BTCoD._SERVICE_TABLE = tuple(
+        tuple(name for (bit, name) in services
+              if (index << BTCoD._MAJOR_SERVICE_POS) & bit)
+        for index in range((BTCoD._MAJOR_SERVICE_MASK >>
+                            BTCoD._MAJOR_SERVICE_POS) + 1))
+    BTCoD._DEVICE_TABLE = tuple(
+        BTCoD._MAJOR_DEVICE_CLASS.get(index << BTCoD._MAJOR_DEVICE_POS,
+                                      'Unknown')
+        for index in range((BTCoD._MAJOR_DEVICE_MASK >>
+                            BTCoD._MAJOR_DEVICE_POS) + 1))
+    minor_table = []
+    for index in range((BTCoD._DEVICE_MASK >> BTCoD._DEVICE_POS) + 1):
+        cod = index << BTCoD._DEVICE_POS
+        minor_lookup = BTCoD._MINOR_DEVICE_CLASS.get(
+            cod & BTCoD._MAJOR_DEVICE_MASK, [])
+        minor_table.append(tuple(i.get(cod & i.get('mask'), 'Unknown')
+                                 for i in minor_lookup))
+    BTCoD._MINOR_TABLE = tuple(minor_table)
+
+
+_build_tables()
@@ -1,5 +1,6 @@
 from __future__ import unicode_literals
 from collections import namedtuple
+from fractions import gcd
 from bt_manager import ffi
 
 A2DP_CODECS = {'SBC': 0x00,
@@ -11,6 +12,9 @@ A2DP_CODECS = {'SBC': 0x00,
 Enumeration of codec types supported by A2DP profile
 """
 
+# Source compiled by cffi against the codec library
+_SOURCE = b'#include "rtpsbc_stats.h"\n#include "rtpsbc.h"'
+
 SBCCodecConfig = namedtuple('SBCCodecConfig',
                             'channel_mode frequency allocation_method '
                             'subbands block_length min_bitpool '
@@ -30,6 +34,15 @@ class SBCSamplingFrequency:
     ALL = 0xF
 
 
+SBC_FREQUENCY_RATES = {SBCSamplingFrequency.FREQ_16KHZ: 16000,
+                       SBCSamplingFrequency.FREQ_32KHZ: 32000,
+                       SBCSamplingFrequency.FREQ_44_1KHZ: 44100,
+                       SBCSamplingFrequency.FREQ_48KHZ: 48000}
+"""
+Sampling frequency in Hz of each :py:class:`.SBCSamplingFrequency`
+"""
+
+
 class SBCBlocks:
     """The block size with which the stream has been encoded"""
     BLOCKS_4 = (1 << 3)
@@ -96,7 +109,7 @@ class SBCCodec:
         import sys
 
         try:
-            self.codec = ffi.verify(b'#include "rtpsbc.h"',
+            self.codec = ffi.verify(_SOURCE,
                                     libraries=[b'rtpsbc'],
                                     ext_package=b'rtpsbc')
         except:
@@ -105,8 +118,79 @@ class SBCCodec:
         self.config = ffi.new('sbc_t *')
         self.ts = ffi.new('unsigned int *', 0)
         self.seq_num = ffi.new('unsigned int *', 0)
-        self._init_sbc_config(config)
+        self.stats = ffi.new('struct rtp_sbc_stats *')
         self.codec.sbc_init(self.config, 0)
+        self.codec_config = config
+        self._init_sbc_config(config)
+
+    def reset(self):
+        """
+        Discard all encoder/decoder state so that the next frame
+        is processed as the start of a new stream.  The codec
+        configuration is retained.
+
+        :return:
+        """
+        self.codec.sbc_reinit(self.config, 0)
+        self._init_sbc_config(self.codec_config)
+
+    @property
+    def codesize(self):
+        """Number of PCM bytes encoded into each SBC frame"""
+        return self.codec.sbc_get_codesize(self.config)
+
+    @property
+    def frame_length(self):
+        """Length in bytes of each encoded SBC frame"""
+        return self.codec.sbc_get_frame_length(self.config)
+
+    @property
+    def frame_duration(self):
+        """Duration in microseconds of each SBC frame"""
+        return self.codec.sbc_get_frame_duration(self.config)
+
+    def get_stats(self):
+        """
+        Return the statistics of the media transport packets
+        written by :py:meth:`encode` and :py:meth:`send_frames`
+        and read by :py:meth:`decode`.  They are kept by the C
+        library as it handles each packet.
+
+        * **packets_sent, packets_received**: RTP packets
+        * **frames_sent, frames_received**: SBC frames
+        * **bytes_sent, bytes_received**: SBC payload bytes,
+            excluding RTP headers
+        * **eagain**: Packets dropped since the transport
+            would have blocked
+        * **short_writes**: Packets not written in full
+        * **write_errors**: Packets dropped due to other errors
+        * **sequence_gaps**: Packets found missing from the RTP
+            sequence numbers of the packets read
+        * **jitter**: RFC 3550 interarrival jitter estimate of the
+            packets read, in seconds
+        * **encode_time, decode_time**: Time spent in the SBC
+            encoder and decoder in seconds
+        * **bitrate**: Effective bitrate of the payload sent and
+            received in bits per second, between the first and
+            last packet
+
+        :return: Dictionary of statistics.
+        :rtype: dict
+        """
+        stats = self.stats
+        payload = stats.bytes_sent + stats.bytes_received
+        elapsed = (stats.last_ns - stats.first_ns) / 1e9
+        result = dict((name, getattr(stats, name)) for name in
+                      ('packets_sent', 'frames_sent', 'bytes_sent',
+                       'packets_received', 'frames_received',
+                       'bytes_received', 'eagain', 'short_writes',
+                       'write_errors', 'sequence_gaps'))
+        rate = SBC_FREQUENCY_RATES[self.codec_config.frequency]
+        result.update({'jitter': stats.jitter / rate,
+                       'encode_time': stats.encode_ns / 1e9,
+                       'decode_time': stats.decode_ns / 1e9,
+                       'bitrate': payload * 8 / elapsed if elapsed else 0.0})
+        return result
 
     def _init_sbc_config(self, config):
         """
@@ -168,17 +252,91 @@ class SBCCodec:
         :param int mtu: Media transport MTU size as returned
             when the media transport was acquired.
         :param array{byte} data: Data to encode and send
-            over the media transport.
-        :return:
+            over the media transport.  Objects supporting the
+            buffer protocol (e.g., a slice of a memory-mapped
+            file) are passed to the encoder without copying.
+        :return: Number of bytes of `data` consumed by the
+            encoder.  Any remainder shorter than one SBC frame's
+            worth of samples is not encoded.
+        :rtype: int
+        """
+        return self.codec.rtp_sbc_encode_to_fd(self.config,
+                                               SBCCodec._input_buffer(data),
+                                               len(data),
+                                               mtu,
+                                               self.ts,
+                                               self.seq_num,
+                                               fd,
+                                               self.stats)
+
+    def send_frames(self, fd, mtu, data):
+        """
+        Write pre-encoded SBC frames to the media transport file
+        descriptor encapsulated as RTP packets.  The frames are
+        sent as-is without passing through the encoder, so they
+        must already match the negotiated configuration.
+
+        :param int fd: Media transport file descriptor
+        :param int mtu: Media transport MTU size as returned
+            when the media transport was acquired.
+        :param array{byte} data: SBC frames to send.
+        :return: Number of bytes of `data` sent.  Any trailing
+            partial frame is not sent, and sending stops early,
+            possibly before any frame, while the transport would
+            block.  Packets failing for other reasons are dropped.
+        :rtype: int
+
+        See also: :py:meth:`accepts_frames`
         """
-        self.codec.rtp_sbc_encode_to_fd(self.config,
-                                        ffi.new('char[]',
-                                                data),
-                                        len(data),
-                                        mtu,
-                                        self.ts,
-                                        self.seq_num,
-                                        fd)
+        frames_config = sbc_frame_config(data)
+        if (frames_config is None):
+            return 0
+        return self.codec.rtp_sbc_send_frames_to_fd(self.config,
+                                                    SBCCodec._input_buffer(data),  # noqa
+                                                    len(data),
+                                                    sbc_frame_length(frames_config),  # noqa
+                                                    mtu,
+                                                    self.ts,
+                                                    self.seq_num,
+                                                    fd,
+                                                    self.stats)
+
+    def accepts_frames(self, data):
+        """
+        Check whether a stream of pre-encoded SBC frames may be
+        sent with :py:meth:`send_frames`.  All frames must share
+        the channel mode, sampling frequency, allocation method,
+        subbands and blocks of the codec configuration, and a
+        single bitpool within its bitpool range.
+
+        :param array{byte} data: SBC frames to check.
+        :return: `True` if the frames are compatible, `False`
+            otherwise.
+        :rtype: boolean
+        """
+        frames_config = sbc_frame_config(data)
+        if (frames_config is None or
+                frames_config[:5] != self.codec_config[:5] or
+                frames_config.max_bitpool < self.codec_config.min_bitpool or
+                frames_config.max_bitpool > self.codec_config.max_bitpool):
+            return False
+        frame_length = sbc_frame_length(frames_config)
+        header = bytearray(data[0:3])
+        nframes = len(data) // frame_length
+        return (len(data) % frame_length == 0 and
+                bytearray(data[::frame_length]) ==
+                bytearray((SBC_SYNCWORD,)) * nframes and
+                bytearray(data[2::frame_length]) ==
+                bytearray(header[2:3]) * nframes)
+
+    @staticmethod
+    def _input_buffer(data):
+        """Wrap data for passing to the codec, avoiding a copy
+        whenever the data exposes the buffer protocol"""
+        try:
+            return ffi.from_buffer(data)
+        except (AttributeError, TypeError):
+            return ffi.new('char[]', data)
 
     def decode(self, fd, mtu, max_len=2560):
         """
@@ -192,14 +350,258 @@ class SBCCodec:
         :param int mtu: Media transport MTU size as returned
             when the media transport was acquired.
         :param int max_len: Optional.  Set maximum number of
-            bytes to read.
+            bytes to read.  Raised if need be to hold the frames
+            of a packet of the full MTU, since packets are only
+            read when all of their frames can be decoded.
         :return data: Decoded data bytes as an array.
         :rtype: array{byte}
         """
+        max_len = max(max_len,
+                      (mtu - _RTP_SIZE) // self.frame_length * self.codesize)
         output_buffer = ffi.new('char[]', max_len)
         sz = self.codec.rtp_sbc_decode_from_fd(self.config,
                                                output_buffer,
                                                max_len,
                                                mtu,
-                                               fd)
-        return ffi.buffer(output_buffer[0:sz])
+                                               fd,
+                                               self.stats)
+        # The buffer keeps output_buffer alive, unlike a slice of it
+        return ffi.buffer(output_buffer, sz)
+
+    def encode_frames(self, data):
+        """
+        Encode the supplied PCM data into a stream of raw SBC
+        frames without any RTP encapsulation.  All complete
+        frames are encoded in a single call into the codec.
+
+        :param array{byte} data: PCM data to encode.  Any
+            remainder shorter than :py:attr:`codesize` is ignored.
+        :return data: Encoded SBC frames.
+        :rtype: bytes
+        """
+        nframes = len(data) // self.codesize
+        if (nframes == 0):
+            return b''
+        output_buffer = ffi.new('char[]', nframes * self.frame_length)
+        written = ffi.new('size_t *', 0)
+        self.codec.sbc_encode_frames(self.config,
+                                     SBCCodec._input_buffer(data),
+                                     len(data),
+                                     output_buffer,
+                                     len(output_buffer),
+                                     written)
+        return ffi.buffer(output_buffer, written[0])[:]
+
+    def decode_frames(self, data):
+        """
+        Decode a stream of raw SBC frames into PCM data.  Runs of
+        frames sharing the same length are decoded in a single call
+        into the codec.
+
+        :param array{byte} data: SBC frames to decode.  Any trailing
+            partial frame is ignored.
+        :return data: Decoded PCM data.
+        :rtype: bytes
+        """
+        input_buffer = SBCCodec._input_buffer(data)
+        written = ffi.new('size_t *', 0)
+        output = []
+        index = 0
+        while (index < len(data)):
+            frame_length = self.codec.sbc_parse(self.config,
+                                                input_buffer + index,
+                                                len(data) - index)
+            if (frame_length <= 0):
+                break
+            nframes = (len(data) - index) // frame_length + 1
+            output_buffer = ffi.new('char[]', nframes * self.codesize)
+            consumed = self.codec.sbc_decode_frames(self.config,
+                                                    input_buffer + index,
+                                                    len(data) - index,
+                                                    output_buffer,
+                                                    len(output_buffer),
+                                                    written)
+            if (consumed == 0):
+                break
+            output.append(ffi.buffer(output_buffer, written[0])[:])
+            index += consumed
+        return b''.join(output)
+
+
+class PCMResampler:
+    """
+    Streaming sample rate converter for interleaved 16-bit PCM,
+    implemented in C alongside the SBC codec as a polyphase FIR
+    filter.  PCM may be passed in blocks of any size, and is
+    converted with state carried from one block to the next, so
+    that a stream can be resampled as it is played or recorded.
+    Memory use is fixed by the filter, whatever the block size.
+
+    The anti-aliasing filter is a Kaiser windowed sinc with 90dB
+    of stopband attenuation.  The more `taps`, the narrower its
+    transition band below the lower of the two Nyquist
+    frequencies, at the cost of more CPU time.
+
+    :param int in_rate: Sampling frequency of the input in Hz.
+    :param int out_rate: Sampling frequency of the output in Hz.
+    :param int channels: Optional.  Number of channels.
+    :param int taps: Optional.  Length of the filter in input
+        samples, at least 2.
+    :param codec: Optional.  :py:class:`SBCCodec` whose codec
+        library the resampler shares, rather than loading its own.
+    :raises ValueError: if a rate or the number of channels is
+        not positive, or there are fewer than 2 taps.
+    :raises MemoryError: if the filter cannot be allocated.
+    """
+
+    def __init__(self, in_rate, out_rate, channels=2, taps=64, codec=None):
+        if (in_rate <= 0 or out_rate <= 0):
+            raise ValueError('Sampling frequencies must be positive')
+        if (channels <= 0):
+            raise ValueError('There must be at least one channel')
+        if (taps < 2):
+            raise ValueError('The filter must have at least 2 taps')
+        divisor = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        self.taps = taps
+        self._up = out_rate // divisor
+        self._down = in_rate // divisor
+        self._frame_size = 2 * channels
+        self._partial = b''
+        self.resampler = None
+        if (in_rate == out_rate):
+            return
+        if (codec is None):
+            self._lib = ffi.verify(_SOURCE,
+                                   libraries=[b'rtpsbc'],
+                                   ext_package=b'rtpsbc')
+        else:
+            self._lib = codec.codec
+        resampler = self._lib.pcm_resampler_new(in_rate, out_rate, channels,
+                                                taps)
+        if (resampler == ffi.NULL):
+            raise MemoryError
+        self.resampler = ffi.gc(resampler, self._lib.pcm_resampler_free)
+
+    @property
+    def delay(self):
+        """Delay through the filter in seconds"""
+        if (self.resampler is None):
+            return 0.0
+        return (self.taps * self._up - 1) / (2.0 * self._up * self.in_rate)
+
+    def reset(self):
+        """
+        Discard all filter state so that the next block is
+        converted as the start of a new stream.
+
+        :return:
+        """
+        self._partial = b''
+        if (self.resampler is not None):
+            self._lib.pcm_resampler_reset(self.resampler)
+
+    def process(self, data):
+        """
+        Convert a block of PCM.
+
+        :param array{byte} data: PCM to convert.  Any trailing
+            partial sample is kept and prefixed to the next block.
+        :return data: PCM at the output rate.
+        :rtype: bytes
+        """
+        if (self.resampler is None):
+            return bytes(data)
+        if (self._partial):
+            data = self._partial + bytes(data)
+        frames = len(data) // self._frame_size
+        self._partial = bytes(data[frames * self._frame_size:])
+        if (frames == 0):
+            return b''
+        output_buffer = ffi.new('char[]', (frames * self._up // self._down +
+                                           2) * self._frame_size)
+        sz = self._lib.pcm_resample(self.resampler,
+                                    SBCCodec._input_buffer(data),
+                                    frames * self._frame_size,
+                                    output_buffer,
+                                    len(output_buffer))
+        return ffi.buffer(output_buffer, sz)[:]
+
+
+# Length of the RTP header and SBC payload header of each packet
+_RTP_SIZE = 13
+
+SBC_SYNCWORD = 0x9C
+"""
+First byte of every SBC frame header
+"""
+
+_SBC_FREQUENCIES = (SBCSamplingFrequency.FREQ_16KHZ,
+                    SBCSamplingFrequency.FREQ_32KHZ,
+                    SBCSamplingFrequency.FREQ_44_1KHZ,
+                    SBCSamplingFrequency.FREQ_48KHZ)
+_SBC_BLOCKS = (SBCBlocks.BLOCKS_4,
+               SBCBlocks.BLOCKS_8,
+               SBCBlocks.BLOCKS_12,
+               SBCBlocks.BLOCKS_16)
+_SBC_CHANNEL_MODES = (SBCChannelMode.CHANNEL_MODE_MONO,
+                      SBCChannelMode.CHANNEL_MODE_DUAL,
+                      SBCChannelMode.CHANNEL_MODE_STEREO,
+                      SBCChannelMode.CHANNEL_MODE_JOINT_STEREO)
+_SBC_ALLOCATION_METHODS = (SBCAllocationMethod.LOUDNESS,
+                           SBCAllocationMethod.SNR)
+_SBC_SUBBANDS = (SBCSubbands.SUBBANDS_4,
+                 SBCSubbands.SUBBANDS_8)
+
+
+def sbc_frame_config(data):
+    """
+    Decode the header of an SBC frame into the codec
+    configuration it was encoded with.
+
+    :param array{byte} data: At least the first 3 bytes of
+        an SBC frame.
+    :return config: The frame's configuration, with both
+        `min_bitpool` and `max_bitpool` set to the frame's bitpool,
+        or `None` if `data` does not start with an SBC frame.
+    :rtype: namedtuple :py:class:`.SBCCodecConfig`
+    """
+    header = bytearray(data[0:3])
+    if (len(header) < 3 or header[0] != SBC_SYNCWORD):
+        return None
+    return SBCCodecConfig(_SBC_CHANNEL_MODES[(header[1] >> 2) & 0x03],
+                          _SBC_FREQUENCIES[(header[1] >> 6) & 0x03],
+                          _SBC_ALLOCATION_METHODS[(header[1] >> 1) & 0x01],
+                          _SBC_SUBBANDS[header[1] & 0x01],
+                          _SBC_BLOCKS[(header[1] >> 4) & 0x03],
+                          header[2],
+                          header[2])
+
+
+def sbc_frame_length(config):
+    """
+    Compute the length in bytes of each SBC frame encoded with
+    the given configuration at its `max_bitpool`.
+
+    :param namedtuple config: See :py:class:`.SBCCodecConfig`
+    :return: Frame length in bytes.
+    :rtype: int
+    """
+    subbands = (4, 8)[_SBC_SUBBANDS.index(config.subbands)]
+    blocks = (4, 8, 12, 16)[_SBC_BLOCKS.index(config.block_length)]
+    bitpool = config.max_bitpool
+    if (config.channel_mode == SBCChannelMode.CHANNEL_MODE_MONO):
+        channels = 1
+    else:
+        channels = 2
+    length = 4 + (4 * subbands * channels) // 8
+    if (config.channel_mode == SBCChannelMode.CHANNEL_MODE_MONO or
+            config.channel_mode == SBCChannelMode.CHANNEL_MODE_DUAL):
+        length += (blocks * channels * bitpool + 7) // 8
+    elif (config.channel_mode == SBCChannelMode.CHANNEL_MODE_JOINT_STEREO):
+        length += (subbands + blocks * bitpool + 7) // 8
+    else:
+        length += (blocks * bitpool + 7) // 8
+    return length
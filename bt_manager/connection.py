@@ -0,0 +1,342 @@
+from __future__ import unicode_literals
+
+import heapq
+import itertools
+import time
+
+import functools
+
+import dbus
+import gobject
+
+from exceptions import BTConnectionTimeoutException
+from histogram import BTLatencyHistogram
+from manager import BTManager
+from scheduler import BTAdapterScheduler
+
+
+class _Connection(object):
+    __slots__ = ('address', 'priority', 'deadline', 'cb_connected',
+                 'cb_failed', 'user_arg', 'attempts', 'adapter_path',
+                 'device', 'started', 'token', 'timer')
+
+    def __init__(self, address, priority, deadline, cb_connected,
+                 cb_failed, user_arg):
+        self.address = address
+        self.priority = priority
+        self.deadline = deadline
+        self.cb_connected = cb_connected
+        self.cb_failed = cb_failed
+        self.user_arg = user_arg
+        self.attempts = 0
+        self.adapter_path = None
+        self.device = None
+        self.started = None
+        self.token = None
+        self.timer = None
+
+
+class _DeviceProxy(object):
+    """
+    Connect and Disconnect methods of a device's interface, set up
+    without any blocking D-Bus calls and always called
+    asynchronously
+    """
+    def __init__(self, dev_path, interface):
+        bus = dbus.SystemBus()
+        self._interface = dbus.Interface(bus.get_object('org.bluez',
+                                                        dev_path,
+                                                        introspect=False),
+                                         interface)
+
+    def connect(self, cb_notify_connect, cb_notify_error):
+        self._interface.Connect(reply_handler=cb_notify_connect,
+                                error_handler=cb_notify_error)
+
+    def disconnect(self, cb_notify_disconnect, cb_notify_error):
+        self._interface.Disconnect(reply_handler=cb_notify_disconnect,
+                                   error_handler=cb_notify_error)
+
+
+def _ignore(*args):
+    pass
+
+
+class BTConnectionManager:
+    """
+    Brings up connections to a set of devices concurrently, so that
+    devices which are off or out of range do not hold up the rest.
+
+    Devices are queued with a priority and taken from the queue as
+    connection slots become free, with at most `max_concurrent`
+    connection attempts in progress on each adapter.  Connect calls
+    are made asynchronously and an attempt that takes longer than
+    `timeout` seconds is abandoned, freeing its slot.  Failed
+    attempts are retried after an exponential backoff of `backoff`,
+    `2 * backoff`, `4 * backoff`... seconds up to `max_backoff`,
+    until `retries` retries have failed or the device's deadline
+    has passed.
+
+    The time taken by successful and failed connection attempts are
+    recorded in the :py:attr:`latency` and :py:attr:`failure_latency`
+    histograms.
+
+    No call made by the manager once created blocks on the bus.
+    Devices are addressed by the object path bluez gives them under
+    their adapter, without looking them up, and are connected and
+    disconnected asynchronously.
+
+    :param str interface: Optional.  Device interface whose `Connect`
+        and `Disconnect` methods are called e.g., 'org.bluez.Input'.
+        Defaults to 'org.bluez.Audio'.
+    :param func factory: Optional.  Called as `factory(dev_path)` to
+        create the device instance to connect instead e.g., for
+        testing.  It must not block, and the instance's `connect`
+        and `disconnect` methods are called with a success and an
+        error callback and must not block either.
+    :param int max_concurrent: Maximum number of connection attempts
+        in progress per adapter.
+    :param scheduler: Optional :py:class:`.BTAdapterScheduler` used
+        to spread connections across adapters, each device going to
+        the least loaded adapter with a free slot.  Devices stay
+        queued while the scheduler has no adapters.  Otherwise all
+        connections are made on one adapter.
+    :param str adapter_path: Optional adapter object path used when
+        no scheduler is given.  Defaults to the default adapter,
+        looked up once when the manager is created.
+    :param float timeout: Time allowed for each attempt in seconds.
+    :param int retries: Maximum number of retries per device.
+    :param float backoff: Delay before the first retry in seconds.
+    :param float max_backoff: Maximum delay between retries in seconds.
+    """
+    def __init__(self, interface='org.bluez.Audio', factory=None,
+                 max_concurrent=2, scheduler=None, adapter_path=None,
+                 timeout=30.0, retries=5, backoff=1.0, max_backoff=60.0):
+        if (factory is None):
+            factory = functools.partial(_DeviceProxy, interface=interface)
+        if (scheduler is None and adapter_path is None):
+            adapter_path = BTManager().default_adapter()
+        self.factory = factory
+        self.max_concurrent = max_concurrent
+        self.scheduler = scheduler
+        self.adapter_path = adapter_path
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.latency = BTLatencyHistogram()
+        self.failure_latency = BTLatencyHistogram()
+        self._queue = []
+        self._entries = {}
+        self._active = {}
+        self._seq = itertools.count()
+        self._pumping = False
+
+    def add(self, address, priority=0, deadline=None,
+            cb_notify_connected=None, cb_notify_failed=None, user_arg=None):
+        """
+        Queue a device to be connected.  Devices with a lower
+        `priority` value are connected first, and devices with equal
+        priority in the order they were queued.
+
+        :param str address: Device address e.g., '11:22:33:44:55:66'
+        :param int priority: Optional queue priority.
+        :param float deadline: Optional time in seconds from now after
+            which no further attempts are made.
+        :param func cb_notify_connected: Optional callback called as
+            `cb_notify_connected(address, user_arg)` once connected.
+        :param func cb_notify_failed: Optional callback called as
+            `cb_notify_failed(address, user_arg, reason)` once all
+            attempts have failed.  `reason` is the `dbus.DBusException`
+            of the last attempt, a
+            :py:class:`.BTConnectionTimeoutException` if it timed out
+            or the deadline passed.
+        :param user_arg: User defined callback argument.
+        :return: `False` if the device is already queued or being
+            connected, `True` otherwise.
+        :rtype: bool
+        """
+        if (address in self._entries):
+            return False
+        if (deadline is not None):
+            deadline += time.time()
+        entry = _Connection(address, priority, deadline, cb_notify_connected,
+                            cb_notify_failed, user_arg)
+        self._entries[address] = entry
+        self._push(entry)
+        self._pump()
+        return True
+
+    def cancel(self, address):
+        """
+        Remove a device from the queue, abandoning any connection
+        attempt in progress.  No callback is made for the device.
+
+        :param str address: Device address e.g., '11:22:33:44:55:66'
+        :return: `True` if the device was queued or being connected.
+        :rtype: bool
+        """
+        entry = self._entries.pop(address, None)
+        if (entry is None):
+            return False
+        if (entry.token is not None):
+            self._abort(entry)
+            self._finish(entry)
+            self._pump()
+        self._stop_timer(entry)
+        return True
+
+    @property
+    def pending(self):
+        """Number of devices queued or being connected"""
+        return len(self._entries)
+
+    def active(self, adapter_path=None):
+        """
+        Return the number of connection attempts in progress.
+
+        :param str adapter_path: Optional adapter object path.
+            Defaults to :py:attr:`adapter_path`.
+        :return: Number of attempts in progress on the adapter.
+        :rtype: int
+        """
+        return self._active.get(adapter_path or self.adapter_path, 0)
+
+    def _push(self, entry):
+        heapq.heappush(self._queue, (entry.priority, next(self._seq), entry))
+
+    def _pump(self):
+        # Attempts failing straight away call back into here
+        if (self._pumping):
+            return
+        self._pumping = True
+        try:
+            self._pump_queue()
+        finally:
+            self._pumping = False
+
+    def _full(self, path):
+        return self._active.get(path, 0) >= self.max_concurrent
+
+    def _pump_queue(self):
+        deferred = []
+        if (self.scheduler):
+            # Full adapters are left out of the choice, so that work
+            # goes to the least loaded adapter with a free slot
+            full = set(p for p in self.scheduler.adapters if self._full(p))
+        while (self._queue):
+            entry = heapq.heappop(self._queue)[2]
+            if (self._entries.get(entry.address) is not entry):
+                continue
+            if (entry.deadline is not None and time.time() >= entry.deadline):
+                self._give_up(entry, BTConnectionTimeoutException('deadline'))
+                continue
+            if (not self.scheduler):
+                if (self._full(self.adapter_path)):
+                    deferred.append(entry)
+                    break
+                self._start(entry, self.adapter_path)
+                continue
+            if (len(full) >= len(self.scheduler.adapters)):
+                # All full, or no adapters until one is plugged in
+                deferred.append(entry)
+                break
+            path = self.scheduler.path_of(self.scheduler.acquire(
+                BTAdapterScheduler.CONNECTION, entry.address, full))
+            if (self._full(path)):
+                # Waits for the full adapter the device is known to
+                self.scheduler.release(path, BTAdapterScheduler.CONNECTION)
+                deferred.append(entry)
+                continue
+            self._start(entry, path)
+            if (self._full(path)):
+                full.add(path)
+        for entry in deferred:
+            self._push(entry)
+
+    def _start(self, entry, path):
+        token = object()
+        entry.token = token
+        entry.attempts += 1
+        entry.adapter_path = path
+        entry.started = time.time()
+        self._active[path] = self._active.get(path, 0) + 1
+        timeout = self.timeout
+        if (entry.deadline is not None):
+            timeout = max(0, min(timeout, entry.deadline - entry.started))
+        entry.timer = gobject.timeout_add(int(timeout * 1000),
+                                          self._timed_out, entry, token)
+        try:
+            entry.device = self.factory('%s/dev_%s' % (
+                path, entry.address.upper().replace(':', '_')))
+            entry.device.connect(lambda: self._connected(entry, token),
+                                 lambda reason: self._failed(entry, token,
+                                                             reason))
+        except dbus.exceptions.DBusException as e:
+            self._failed(entry, token, e)
+
+    def _stop_timer(self, entry):
+        if (entry.timer is not None):
+            gobject.source_remove(entry.timer)
+            entry.timer = None
+
+    def _finish(self, entry):
+        path = entry.adapter_path
+        entry.token = None
+        self._stop_timer(entry)
+        self._active[path] -= 1
+        if (self.scheduler):
+            self.scheduler.release(path, BTAdapterScheduler.CONNECTION)
+
+    def _abort(self, entry):
+        try:
+            entry.device.disconnect(_ignore, _ignore)
+        except (AttributeError, dbus.exceptions.DBusException):
+            pass
+
+    def _give_up(self, entry, reason):
+        del self._entries[entry.address]
+        if (entry.cb_failed):
+            entry.cb_failed(entry.address, entry.user_arg, reason)
+
+    def _connected(self, entry, token):
+        if (entry.token is not token):
+            return
+        self.latency.add(time.time() - entry.started)
+        self._finish(entry)
+        if (self.scheduler):
+            self.scheduler.bind_device(entry.address, entry.adapter_path)
+        del self._entries[entry.address]
+        if (entry.cb_connected):
+            entry.cb_connected(entry.address, entry.user_arg)
+        self._pump()
+
+    def _failed(self, entry, token, reason):
+        if (entry.token is not token):
+            return
+        now = time.time()
+        self.failure_latency.add(now - entry.started)
+        self._finish(entry)
+        delay = min(self.backoff * 2 ** (entry.attempts - 1), self.max_backoff)
+        if (entry.attempts > self.retries):
+            self._give_up(entry, reason)
+        elif (entry.deadline is not None and now + delay >= entry.deadline):
+            self._give_up(entry, BTConnectionTimeoutException('deadline'))
+        else:
+            entry.timer = gobject.timeout_add(int(delay * 1000),
+                                              self._retry, entry)
+        self._pump()
+
+    def _timed_out(self, entry, token):
+        if (entry.token is token):
+            entry.timer = None
+            self._abort(entry)
+            self._failed(entry, token, BTConnectionTimeoutException('timeout'))
+        return False
+
+    def _retry(self, entry):
+        entry.timer = None
+        if (self._entries.get(entry.address) is entry):
+            self._push(entry)
+            self._pump()
+        return False
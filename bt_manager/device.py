@@ -1,5 +1,7 @@
 from __future__ import unicode_literals
 
+import dbus
+
 from interface import BTInterface
 from adapter import BTAdapter
 from exceptions import BTDeviceNotSpecifiedException
@@ -54,7 +56,7 @@ class BTDevice(BTGenericDevice):
         not be changed. Use the Alias property instead.
     * **Icon(str) [readonly]**: Proposed icon name according to the
         freedesktop.org icon naming specification.
-    * **Class(str) [readonly]**: The Bluetooth class of device of the remote
+    * **Class(uint32) [readonly]**: The Bluetooth class of device of the remote
         device.
     * **UUIDs(list{str}) [readonly]**: List of 128-bit UUIDs that represents
         the available remote services.
@@ -79,7 +81,7 @@ class BTDevice(BTGenericDevice):
         or simple pairing will occur. Note that this property can exhibit
         false-positives in the case of Bluetooth 2.1 (or newer) devices that
         have disabled Extended Inquiry Response support.
-    * **Blocked(boolean) [readonly]**: Set to true if the device is blocked.
+    * **Blocked(boolean) [readwrite]**: Set to true if the device is blocked.
     * **Product(uint16) [readonly]**: Product code identifier.
     * **Vendor(uint16) [readonly]**: Product vendor identifier.
     * **Services(list{str}) [readonly]**: TBD.
@@ -102,6 +104,25 @@ class BTDevice(BTGenericDevice):
         when a device node has been removed.
     """
 
+    _PROPERTIES = {
+        'Address': (dbus.String, False),
+        'Name': (dbus.String, False),
+        'Icon': (dbus.String, False),
+        'Class': (dbus.UInt32, False),
+        'UUIDs': (dbus.Array, False),
+        'Paired': (dbus.Boolean, False),
+        'Connected': (dbus.Boolean, False),
+        'Trusted': (dbus.Boolean, True),
+        'Alias': (dbus.String, True),
+        'Nodes': (dbus.Array, False),
+        'Adapter': (dbus.ObjectPath, False),
+        'LegacyPairing': (dbus.Boolean, False),
+        'Blocked': (dbus.Boolean, True),
+        'Product': (dbus.UInt16, False),
+        'Vendor': (dbus.UInt16, False),
+        'Services': (dbus.Array, False),
+    }
+
     def __init__(self, *args, **kwargs):
         BTGenericDevice.__init__(self, addr='org.bluez.Device',
                                  *args, **kwargs)
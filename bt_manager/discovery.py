@@ -1,9 +1,174 @@
 from __future__ import unicode_literals
-from xml.etree.ElementTree import XML
+from collections import namedtuple
+from xml.parsers import expat
+import binascii
 import pprint
 
-from serviceuuids import SERVICES
+from serviceuuids import SERVICES, _service_uuid
 from attributes import ATTRIBUTES
+from uuid import BTUUID
+
+
+BTServiceRecord = namedtuple('BTServiceRecord', 'handle attributes')
+"""
+Named tuple of a service record obtained from the bluetooth
+service discovery procedure.  `attributes` maps each attribute
+ID (int) to its typed value.
+
+Values are typed according to their XML data element:
+
+* unsigned and signed integers are `int`
+* booleans are `bool`
+* UUIDs are :py:class:`.BTUUID` instances, which are shared with
+  :py:data:`.SERVICES` where known
+* text and URLs are `str`, or `bytes` if hex encoded
+* nil is `None`
+* sequences and alternatives are `tuple`
+"""
+
+_ATTRIBUTE_IDS = {v: int(k, 16) for (k, v) in ATTRIBUTES['*'].items()}
+_SEQUENCES = ('sequence', 'alternate')
+
+
+class _ParseComplete(Exception):
+    pass
+
+
+def _attribute_ids(attributes):
+    """Translate attribute names and IDs into a set of IDs"""
+    if (attributes is None):
+        return None
+    return set(_ATTRIBUTE_IDS[k] if k in _ATTRIBUTE_IDS else k
+               for k in attributes)
+
+
+def _parse_record(text, attributes, value, sequence, attribute):
+    """
+    Walk an XML service record in a single pass, without building
+    an element tree.
+
+    :param str text: XML service record.
+    :param set attributes: Attribute IDs to parse or `None` for all.
+        Parsing stops as soon as all of them have been found and
+        the data elements of all other attributes are skipped.
+    :param func value: Called with the tag and XML attributes of
+        each data element and returns its value.
+    :param func sequence: Called with the list of values of each
+        sequence or alternative and returns its value.
+    :param func attribute: Called with the ID and value of each
+        attribute parsed.
+    """
+    remaining = set(attributes) if attributes is not None else None
+    stack = []
+    state = {'id': None}
+
+    def start_element(tag, attrib):
+        if (tag == 'attribute'):
+            attr_id = int(attrib['id'], 16)
+            if (remaining is None or attr_id in remaining):
+                state['id'] = attr_id
+                stack.append([])
+        elif (state['id'] is None):
+            return
+        elif (tag in _SEQUENCES):
+            stack.append([])
+        else:
+            stack[-1].append(value(tag, attrib))
+
+    def end_element(tag):
+        attr_id = state['id']
+        if (attr_id is None):
+            return
+        if (tag in _SEQUENCES):
+            items = stack.pop()
+            stack[-1].append(sequence(items))
+        elif (tag == 'attribute'):
+            items = stack.pop()
+            state['id'] = None
+            attribute(attr_id, items[0] if items else None)
+            if (remaining is not None):
+                remaining.discard(attr_id)
+                if (not remaining):
+                    raise _ParseComplete
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    if (isinstance(text, unicode)):
+        text = text.encode('utf-8')
+    try:
+        parser.Parse(text, True)
+    except _ParseComplete:
+        pass
+
+
+def _typed_uuid(value):
+    # BTUUIDs are interned, and known services resolve to the
+    # instances in SERVICES
+    if (len(value) <= 6):
+        uuid = BTUUID(uuid16=value[2:].zfill(4))
+    elif (len(value) <= 10):
+        uuid = BTUUID(uuid32=value[2:].zfill(8))
+    else:
+        uuid = BTUUID(uuid=value)
+    return _service_uuid(uuid)
+
+
+def _typed_value(tag, attrib):
+    value = attrib.get('value')
+    if (value is None):
+        return None
+    elif (tag == 'uuid'):
+        return _typed_uuid(value)
+    elif (tag == 'boolean'):
+        return value == 'true'
+    elif (tag.startswith('uint') or tag.startswith('int')):
+        if (value.startswith('0x')):
+            return int(value, 16)
+        return int(value)
+    elif (attrib.get('encoding') == 'hex'):
+        return binascii.unhexlify(value)
+    return value
+
+
+def parse_service_record(text, attributes=None, handle=None):
+    """
+    Parse an XML service record into a compact, typed
+    :py:class:`BTServiceRecord` in a single pass.
+
+    :param str text: An XML service record returned as part of
+        the device service discovery procedure.
+    :param list attributes: Optional.  Attribute IDs (int) or
+        universal attribute names e.g., `ServiceClassIDList`,
+        to parse.  All others are skipped, and parsing stops
+        as soon as all requested attributes have been found.
+    :param int handle: Optional.  Record handle, otherwise it
+        is taken from the `ServiceRecordHandle` attribute.
+    :return: the service record
+    :rtype: namedtuple :py:class:`BTServiceRecord`
+    """
+    record = {}
+    _parse_record(text, _attribute_ids(attributes), _typed_value, tuple,
+                  record.__setitem__)
+    if (handle is None):
+        handle = record.get(_ATTRIBUTE_IDS['ServiceRecordHandle'])
+    return BTServiceRecord(handle, record)
+
+
+def parse_service_records(services, attributes=None):
+    """
+    Parse all XML service records of a device.
+
+    :param dict services: Service records as returned by
+        :py:meth:`.BTDevice.discover_services`.
+    :param list attributes: Optional.  Attributes to parse, see
+        :py:func:`parse_service_record`.
+    :return: dictionary with record handles as keys and
+        :py:class:`BTServiceRecord` values.
+    :rtype: dict
+    """
+    return {int(handle): parse_service_record(text, attributes, int(handle))
+            for (handle, text) in services.items()}
 
 
 class BTDiscoveryInfo:
@@ -11,46 +176,48 @@ class BTDiscoveryInfo:
     Parser for XML discovery service record obtained from the
     bluetooth service discovery procedure.
 
-    The XML parser recursively and iteratively translates all known
-    service UUIDs and attribute UUIDs to their human readable
-    form thus allowing a BTDiscoveryInfo instance to be printed
-    e.g., for debugging purposes.
+    The XML parser translates all known service UUIDs and
+    attribute UUIDs to their human readable form thus allowing
+    a BTDiscoveryInfo instance to be printed e.g., for debugging
+    purposes.
 
     :param str text: An XML service record return as part of
         the device service discovery procedure.
+    :param list attributes: Optional.  Attribute IDs (int) or
+        universal attribute names to parse, see
+        :py:func:`parse_service_record`.
 
     .. note:: A dictionary of XML service records is obtained
         by executing the :py:meth:`.BTDevice.discover_services`
         method.
+
+    .. note:: Use :py:func:`parse_service_records` instead where
+        typed values are required.
     """
-    def __init__(self, text):
-        tree = XML(text)
-        rec = tree.iter().next()
-        if (rec is not None):
-            self._uuid = None
-            self.__dict__ = self._parse_element(rec)
-
-    def _parse_element(self, elem):
-        if (elem.tag == 'record'):
-            return {self._parse_element(k):
-                    self._parse_element(list(k)[0])
-                    for k in elem.findall('attribute')}
-        elif (elem.tag == 'sequence'):
-            return [self._parse_element(k) for k in list(elem)]
-        elif (elem.tag == 'attribute'):
-            attrib_id = elem.attrib['id'][2:].upper()  # Remove leading '0x'
+    def __init__(self, text, attributes=None):
+        record = {}
+        state = {'uuid': None}
+
+        def value(tag, attrib):
+            if (tag == 'uuid'):
+                # Remove leading '0x'
+                state['uuid'] = attrib['value'][2:].upper()
+                return {'uuid': SERVICES.get(state['uuid'], state['uuid'])}
+            return attrib.get('value')
+
+        def attribute(attr_id, value):
+            attrib_id = '%04X' % attr_id
             if (attrib_id in ATTRIBUTES['*']):
-                return ATTRIBUTES['*'][attrib_id]
-            elif (ATTRIBUTES.get(self._uuid)):
-                return ATTRIBUTES[self._uuid].get(attrib_id, attrib_id)
+                name = ATTRIBUTES['*'][attrib_id]
+            elif (ATTRIBUTES.get(state['uuid'])):
+                name = ATTRIBUTES[state['uuid']].get(attrib_id, attrib_id)
             else:
-                return attrib_id
-        elif (elem.tag == 'uuid'):
-            self._uuid = \
-                elem.attrib['value'][2:].upper()  # Remove leading '0x'
-            return {'uuid': SERVICES.get(self._uuid, self._uuid)}
-        elif ('value' in elem.attrib):
-            return elem.attrib['value']
+                name = attrib_id
+            record[name] = value
+
+        _parse_record(text, _attribute_ids(attributes), value, list,
+                      attribute)
+        self.__dict__ = record
 
     def __repr__(self):
         return pprint.pformat(self.__dict__)
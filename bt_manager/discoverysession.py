@@ -0,0 +1,263 @@
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import gobject
+
+from adapter import BTAdapter
+from interface import BTInterface
+
+
+class BTDiscoveredDevice(object):
+    """
+    State of a device seen during a :py:class:`BTDiscoverySession`.
+
+    :ivar str address: Device address e.g., '11:22:33:44:55:66'
+    :ivar str name: Device name, `None` until resolved.
+    :ivar int rssi: Last received signal strength.
+    :ivar int cod: Class of device, see :py:class:`.BTCoD`
+    :ivar bool paired: Whether the device is paired.
+    """
+    __slots__ = ('address', 'name', 'rssi', 'cod', 'paired',
+                 '_bucket', '_pending')
+
+    def __init__(self, address):
+        self.address = address
+        self.name = None
+        self.rssi = None
+        self.cod = None
+        self.paired = False
+        self._bucket = None
+        self._pending = 0
+
+    def __repr__(self):
+        return '<device:' + self.address + ' name:' + str(self.name) + \
+            ' rssi:' + str(self.rssi) + ' cod:' + str(self.cod) + '>'
+
+
+class BTDiscoverySession:
+    """
+    Device discovery session which coalesces the adapter's
+    :py:attr:`.BTAdapter.SIGNAL_DEVICE_FOUND`,
+    :py:attr:`.BTAdapter.SIGNAL_DEVICE_DISAPPEARED` and
+    :py:attr:`.BTInterface.SIGNAL_PROPERTY_CHANGED` signals into a
+    table of device states.
+
+    bluez repeats `DeviceFound` for every inquiry result of a device,
+    mostly with the same properties.  Rather than passing each of
+    them on, the session only notifies meaningful changes:
+
+    * :py:attr:`EVENT_DEVICE_NEW` when a device is first seen
+    * :py:attr:`EVENT_DEVICE_NAME` when a device's name is resolved
+      or changes
+    * :py:attr:`EVENT_DEVICE_RSSI` when a device's RSSI moves into
+      a different bucket of `rssi_step` dBm, by more than
+      `rssi_hysteresis` dBm past the edge of its current bucket
+    * :py:attr:`EVENT_DEVICE_LOST` when a device disappears
+
+    Changes are collected and delivered at most once every
+    `interval` seconds, with at most one notification per device
+    and event type.  A device which appears and disappears within
+    the same interval is not notified at all.
+
+    :param adapter: A :py:class:`.BTAdapter` instance.
+    :param func callback: Called as `callback(event, user_arg, device)`
+        with a :py:class:`BTDiscoveredDevice` for each change.
+    :param user_arg: User defined callback argument.
+    :param float interval: Minimum time between deliveries in seconds,
+        or 0 to deliver each change immediately.
+    :param int rssi_step: RSSI bucket size in dBm.
+    :param int rssi_hysteresis: Margin in dBm that the RSSI must
+        pass a bucket edge by before the bucket changes, so that a
+        device hovering at an edge is not reported repeatedly.
+
+    .. note:: The session installs the adapter instance's signal
+        receivers for the above signals, replacing any other
+        receivers installed on that instance.
+    """
+
+    EVENT_DEVICE_NEW = 'DeviceNew'
+    """
+    :event DeviceNew(event, user_arg, device): A device was
+        seen for the first time.
+    """
+    EVENT_DEVICE_NAME = 'DeviceName'
+    """
+    :event DeviceName(event, user_arg, device): A device's
+        name was resolved or has changed.
+    """
+    EVENT_DEVICE_RSSI = 'DeviceRSSI'
+    """
+    :event DeviceRSSI(event, user_arg, device): A device's
+        RSSI moved into a different bucket.
+    """
+    EVENT_DEVICE_LOST = 'DeviceLost'
+    """
+    :event DeviceLost(event, user_arg, device): A device is no
+        longer in range, and was removed from the table.
+    """
+
+    # Pending change flags, in order of delivery
+    _NEW = 1
+    _NAME = 2
+    _RSSI = 4
+    _LOST = 8
+    _EVENTS = ((_NEW, EVENT_DEVICE_NEW),
+               (_NAME, EVENT_DEVICE_NAME),
+               (_RSSI, EVENT_DEVICE_RSSI),
+               (_LOST, EVENT_DEVICE_LOST))
+
+    def __init__(self, adapter, callback, user_arg=None, interval=1.0,
+                 rssi_step=10, rssi_hysteresis=2):
+        self.adapter = adapter
+        self.callback = callback
+        self.user_arg = user_arg
+        self.interval = interval
+        self.rssi_step = rssi_step
+        self.rssi_hysteresis = rssi_hysteresis
+        self.devices = {}
+        self.discovering = False
+        self._pending = OrderedDict()
+        self._lost = {}
+        self._timer = None
+
+    def start(self):
+        """
+        Install the signal receivers and start device discovery.
+
+        :return:
+        :raises dbus.Exception: org.bluez.Error.NotReady
+        :raises dbus.Exception: org.bluez.Error.Failed
+        """
+        self.adapter.add_signal_receiver(self._device_found,
+                                         BTAdapter.SIGNAL_DEVICE_FOUND,
+                                         None)
+        self.adapter.add_signal_receiver(self._device_disappeared,
+                                         BTAdapter.SIGNAL_DEVICE_DISAPPEARED,  # noqa
+                                         None)
+        self.adapter.add_signal_receiver(self._property_changed,
+                                         BTInterface.SIGNAL_PROPERTY_CHANGED,  # noqa
+                                         None)
+        self.adapter.start_discovery()
+
+    def stop(self):
+        """
+        Stop device discovery, remove the signal receivers and
+        deliver any pending changes.
+
+        :return:
+        :raises dbus.Exception: org.bluez.Error.NotReady
+        :raises dbus.Exception: org.bluez.Error.Failed
+        :raises dbus.Exception: org.bluez.Error.NotAuthorized
+        """
+        try:
+            self.adapter.stop_discovery()
+        finally:
+            self.adapter.remove_signal_receiver(BTAdapter.SIGNAL_DEVICE_FOUND)  # noqa
+            self.adapter.remove_signal_receiver(BTAdapter.SIGNAL_DEVICE_DISAPPEARED)  # noqa
+            self.adapter.remove_signal_receiver(BTInterface.SIGNAL_PROPERTY_CHANGED)  # noqa
+            self.flush()
+
+    def flush(self):
+        """
+        Deliver all pending changes now.
+
+        :return: `False`, so that it may be used as a gobject
+            timeout callback that is not repeated.
+        """
+        if (self._timer is not None):
+            gobject.source_remove(self._timer)
+            self._timer = None
+        pending = self._pending
+        self._pending = OrderedDict()
+        self._lost = {}
+        for device in pending.values():
+            flags = device._pending
+            device._pending = 0
+            if (flags & BTDiscoverySession._LOST):
+                # Other changes only matter if the device comes back
+                flags = BTDiscoverySession._LOST
+            for (flag, event) in BTDiscoverySession._EVENTS:
+                if (flags & flag):
+                    self.callback(event, self.user_arg, device)
+        return False
+
+    def _notify(self, device, flag):
+        if (flag == BTDiscoverySession._LOST):
+            if (device._pending & BTDiscoverySession._NEW):
+                # Never notified, so there is nothing to take back
+                device._pending = 0
+                self._pending.pop(device.address, None)
+                return
+            device._pending |= flag
+        elif (device._pending & BTDiscoverySession._NEW):
+            # Changes since are part of the new device's state
+            return
+        else:
+            device._pending |= flag
+        self._pending[device.address] = device
+        if (not self.interval):
+            self.flush()
+        elif (self._timer is None):
+            self._timer = gobject.timeout_add(int(self.interval * 1000),
+                                              self.flush)
+
+    def _device_found(self, signal, user_arg, address, properties):
+        flag = 0
+        device = self.devices.get(address)
+        if (device is None):
+            device = self._lost.pop(address, None)
+            if (device is None):
+                device = BTDiscoveredDevice(address)
+                flag = BTDiscoverySession._NEW
+            else:
+                # Reappeared before its loss was delivered, any
+                # other pending changes still stand
+                device._pending &= ~BTDiscoverySession._LOST
+                if (not device._pending):
+                    self._pending.pop(address, None)
+            self.devices[address] = device
+        name = properties.get('Name')
+        if (name is not None and name != device.name):
+            device.name = name
+            flag |= BTDiscoverySession._NAME
+        rssi = properties.get('RSSI')
+        if (rssi is not None):
+            device.rssi = int(rssi)
+            if (self._rssi_bucket_changed(device)):
+                flag |= BTDiscoverySession._RSSI
+        if ('Class' in properties):
+            device.cod = int(properties['Class'])
+        if ('Paired' in properties):
+            device.paired = bool(properties['Paired'])
+        if (flag & BTDiscoverySession._NEW):
+            self._notify(device, BTDiscoverySession._NEW)
+        else:
+            for f in (BTDiscoverySession._NAME, BTDiscoverySession._RSSI):
+                if (flag & f):
+                    self._notify(device, f)
+
+    def _rssi_bucket_changed(self, device):
+        bucket = device.rssi // self.rssi_step
+        if (bucket == device._bucket):
+            return False
+        if (device._bucket is not None):
+            low = device._bucket * self.rssi_step - self.rssi_hysteresis
+            high = (device._bucket + 1) * self.rssi_step + \
+                self.rssi_hysteresis
+            if (low <= device.rssi < high):
+                return False
+        device._bucket = bucket
+        return True
+
+    def _device_disappeared(self, signal, user_arg, address):
+        device = self.devices.pop(address, None)
+        if (device is not None):
+            self._notify(device, BTDiscoverySession._LOST)
+            if (device._pending):
+                self._lost[address] = device
+
+    def _property_changed(self, signal, user_arg, name, value):
+        if (name == 'Discovering'):
+            self.discovering = bool(value)
+            if (not self.discovering):
+                self.flush()
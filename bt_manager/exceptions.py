@@ -43,9 +43,36 @@ class BTIncompatibleTransportAccessType(dbus.DBusException):
     _dbus_error_name = "org.bluez.Error.InvalidConfiguration"
 
 
+class BTConnectionTimeoutException(dbus.DBusException):
+    """
+    Exception passed to connection failure callbacks when a
+    connection attempt took too long or the device's deadline
+    passed.  The message is `'timeout'` or `'deadline'`
+    respectively.
+    """
+    _dbus_error_name = "org.bluez.Error.ConnectionAttemptFailed"
+
+
+class BTPropertyReadOnlyException(Exception):
+    """
+    Exception raised when attempting to set a property that
+    is read only.
+    """
+    pass
+
+
 class BTUUIDNotSpecifiedException:
     """
     Exception raised when creating a UUID without providing
     a valid UUID number
     """
     pass
+
+
+class BTUnsupportedMediaFormat:
+    """
+    Exception raised when a media file does not contain
+    audio in a format that can be streamed e.g., a WAV
+    file that does not carry linear PCM data.
+    """
+    pass
@@ -1,5 +1,7 @@
 from __future__ import unicode_literals
 
+import dbus
+
 from audio import BTAudio
 from device import BTGenericDevice
 
@@ -11,6 +13,14 @@ class BTHeadset(BTAudio):
     SIGNAL_SPEAKER_GAIN_CHANGED = 'SpeakerGainChanged'
     SIGNAL_MICROPHONE_GAIN_CHANGED = 'MicrophoneGainChanged'
 
+    _PROPERTIES = {
+        'State': (dbus.String, False),
+        'Connected': (dbus.Boolean, False),
+        'Playing': (dbus.Boolean, False),
+        'SpeakerGain': (dbus.UInt16, True),
+        'MicrophoneGain': (dbus.UInt16, True),
+    }
+
     def __init__(self, *args, **kwargs):
         BTGenericDevice.__init__(self, addr='org.bluez.Headset',
                                  *args, **kwargs)
@@ -49,6 +59,10 @@ class BTHeadsetGateway(BTAudio):
     SIGNAL_CALL_STARTED = 'CallStarted'
     SIGNAL_CALL_ENDED = 'CallEnded'
 
+    # The gateway's properties vary between bluez versions, so
+    # writes take their types from the current values instead
+    _PROPERTIES = {}
+
     def __init__(self, *args, **kwargs):
         BTGenericDevice.__init__(self, addr='org.bluez.Headset',
                                  *args, **kwargs)
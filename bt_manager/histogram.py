@@ -0,0 +1,70 @@
+from __future__ import unicode_literals
+
+import bisect
+
+
+class BTLatencyHistogram(object):
+    """
+    Histogram of latencies, in seconds, counted into fixed buckets
+    so that recording is cheap and memory use is constant.
+
+    :param list bounds: Optional.  Ascending upper bounds of the
+        buckets in seconds.  Latencies above the last bound are
+        counted in an extra overflow bucket.
+    """
+
+    BOUNDS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    """:data BOUNDS: Default bucket bounds in seconds"""
+
+    def __init__(self, bounds=None):
+        self.bounds = tuple(bounds or BTLatencyHistogram.BOUNDS)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency):
+        """
+        Record a latency.
+
+        :param float latency: Latency in seconds.
+        :return:
+        """
+        self.counts[bisect.bisect_left(self.bounds, latency)] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    @property
+    def mean(self):
+        """Mean of the recorded latencies, or `None` if none"""
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent):
+        """
+        Return the upper bound of the bucket containing the given
+        percentile.
+
+        :param float percent: Percentile e.g., 50 or 99.
+        :return: Bucket bound in seconds, the maximum latency if
+            it lies in the overflow bucket, or `None` if no latencies
+            were recorded.
+        :rtype: float
+        """
+        if (not self.count):
+            return None
+        rank = percent * self.count / 100.0
+        seen = 0
+        for (i, n) in enumerate(self.counts):
+            seen += n
+            if (n and seen >= rank):
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def __repr__(self):
+        buckets = ['<=%g:%d' % (b, n) for (b, n) in
+                   zip(self.bounds, self.counts) if n]
+        if (self.counts[-1]):
+            buckets.append('>%g:%d' % (self.bounds[-1], self.counts[-1]))
+        return '<latency count:' + str(self.count) + ' ' + \
+            ' '.join(buckets) + '>'
@@ -1,5 +1,7 @@
 from __future__ import unicode_literals
 
+import dbus
+
 from device import BTGenericDevice
 
 
@@ -15,28 +17,53 @@ class BTInput(BTGenericDevice):
 
     See also: :py:class:`.BTGenericDevice` for setup params.
     """
+    _PROPERTIES = {
+        'Connected': (dbus.Boolean, False),
+    }
+
     def __init__(self, *args, **kwargs):
         BTGenericDevice.__init__(self, addr='org.bluez.Input',
                                  *args, **kwargs)
 
-    def connect(self):
+    def connect(self, cb_notify_connect=None, cb_notify_error=None):
         """
         Connect to the input device.
 
+        The call blocks until the device is connected, unless
+        callbacks are given in which case it returns immediately.
+
+        :param func cb_notify_connect: Optional callback on success.
+        :param func cb_notify_error: Optional callback on error.  The
+            callback is called with the error reason.  Must be given
+            together with `cb_notify_connect`.
         :return:
         :raises dbus.Exception: org.bluez.Error.AlreadyConnected
         :raises dbus.Exception: org.bluez.Error.ConnectionAttemptFailed
         """
+        if (cb_notify_connect or cb_notify_error):
+            return self._interface.Connect(reply_handler=cb_notify_connect,
+                                           error_handler=cb_notify_error)
         return self._interface.Connect()
 
-    def disconnect(self):
+    def disconnect(self, cb_notify_disconnect=None, cb_notify_error=None):
         """
         Disconnect from the input device.
 
         To abort a connection attempt in case of errors or
         timeouts in the client it is fine to call this method.
 
+        The call blocks until the device is disconnected, unless
+        callbacks are given in which case it returns immediately.
+
+        :param func cb_notify_disconnect: Optional callback on success.
+        :param func cb_notify_error: Optional callback on error.  The
+            callback is called with the error reason.  Must be given
+            together with `cb_notify_disconnect`.
         :return:
         :raises dbus.Exception: org.bluez.Error.Failed
         """
+        if (cb_notify_disconnect or cb_notify_error):
+            return self._interface.Disconnect(
+                reply_handler=cb_notify_disconnect,
+                error_handler=cb_notify_error)
         return self._interface.Disconnect()
@@ -1,10 +1,15 @@
 from __future__ import unicode_literals
 
+import ast
 import dbus
 import types
 import pprint
 
-from exceptions import BTSignalNameNotRecognisedException
+from exceptions import BTSignalNameNotRecognisedException, \
+    BTPropertyReadOnlyException
+from router import BTSignalRouter
+from metrics import METRICS
+from tracing import TRACER
 
 
 def translate_to_dbus_type(typeof, value):
@@ -12,20 +17,26 @@ def translate_to_dbus_type(typeof, value):
     Helper function to map values from their native Python types
     to Dbus types.
 
+    Strings given for non-string types are parsed as Python
+    literals e.g., 'True' or '[1, 2]', but are never evaluated
+    as expressions.
+
     :param type typeof: Target for type conversion e.g., 'dbus.Dictionary'
     :param value: Value to assign using type 'typeof'
     :return: 'value' converted to type 'typeof'
     :rtype: typeof
+    :raises ValueError: if a string is not a valid literal
     """
     if ((isinstance(value, types.UnicodeType) or
-         isinstance(value, str)) and typeof is not dbus.String):
-        # FIXME: This is potentially dangerous since it evaluates
-        # a string in-situ
-        return typeof(eval(value))
+         isinstance(value, str)) and typeof not in _STRING_TYPES):
+        return typeof(ast.literal_eval(value))
     else:
         return typeof(value)
 
 
+_STRING_TYPES = (dbus.String, dbus.ObjectPath, dbus.Signature)
+
+
 class Signal():
     """
     Encapsulation of user callback wrapper for signals
@@ -42,6 +53,7 @@ class Signal():
         self.signal = signal
         self.user_callback = user_callback
         self.user_arg = user_arg
+        self.subscription = None
 
     def signal_handler(self, *args):
         """
@@ -53,6 +65,30 @@ class Signal():
         self.user_callback(self.signal, self.user_arg, *args)
 
 
+class _PendingCalls(object):
+    """
+    Makes the method calls of a bluez interface asynchronously
+    without a main loop, returning each call's
+    `dbus.lowlevel.PendingCall` so that its reply can be blocked on
+    """
+    def __init__(self, bus, path, addr):
+        self._bus = bus
+        self._path = path
+        self._addr = addr
+
+    def __getattr__(self, method):
+        if (method.startswith('_')):
+            raise AttributeError(method)
+
+        def call(*args, **kwargs):
+            return self._bus.call_async('org.bluez', self._path, self._addr,
+                                        method, kwargs.get('signature'), args,
+                                        kwargs['reply_handler'],
+                                        kwargs['error_handler'],
+                                        require_main_loop=False)
+        return call
+
+
 class BTSimpleInterface:
     """
     Wrapper around dbus to encapsulated a BT simple interface
@@ -71,8 +107,16 @@ class BTSimpleInterface:
         self._dbus_addr = addr
         self._bus = dbus.SystemBus()
         self._object = self._bus.get_object('org.bluez', path)
-        self._interface = dbus.Interface(self._object, addr)
         self._path = path
+        self._interface = self._instrument(dbus.Interface(self._object,
+                                                          addr))
+
+    def _instrument(self, interface):
+        if (METRICS.enabled):
+            interface = METRICS.instrument(interface, self._dbus_addr)
+        if (TRACER.enabled):
+            interface = TRACER.trace(interface, self._dbus_addr, self._path)
+        return interface
 
 
 # This class is not intended to be instantiated directly and should be
@@ -98,6 +142,11 @@ class BTInterface(BTSimpleInterface):
         Signal notifying when a property has changed.
     """
 
+    # Static schema of the interface's properties, mapping each
+    # property name to its (dbus type, writable) pair.  Writes are
+    # checked and marshalled against it without a bus round trip.
+    _PROPERTIES = {}
+
     def __init__(self, path, addr):
         BTSimpleInterface.__init__(self, path, addr)
         self._signals = {}
@@ -119,7 +168,13 @@ class BTInterface(BTSimpleInterface):
 
     def add_signal_receiver(self, callback_fn, signal, user_arg):
         """
-        Add a signal receiver callback with user argument
+        Add a signal receiver callback with user argument.  Any
+        receiver previously added to this instance for the same
+        signal is removed.
+
+        Signals are delivered by the bus's :py:class:`.BTSignalRouter`
+        so that any number of instances may receive the same signal
+        without each installing a bus match rule.
 
         See also :py:meth:`remove_signal_receiver`,
         :py:exc:`.BTSignalNameNotRecognisedException`
@@ -135,12 +190,12 @@ class BTInterface(BTSimpleInterface):
             not registered
         """
         if (signal in self._signal_names):
+            self.remove_signal_receiver(signal)
             s = Signal(signal, callback_fn, user_arg)
+            router = BTSignalRouter.for_bus(self._bus)
+            s.subscription = router.subscribe(self._dbus_addr, self._path,
+                                              signal, s.signal_handler)
             self._signals[signal] = s
-            self._bus.add_signal_receiver(s.signal_handler,
-                                          signal,
-                                          dbus_interface=self._dbus_addr,
-                                          path=self._path)
         else:
             raise BTSignalNameNotRecognisedException
 
@@ -158,34 +213,56 @@ class BTInterface(BTSimpleInterface):
             not registered
         """
         if (signal in self._signal_names):
-            s = self._signals.get(signal)
+            s = self._signals.pop(signal, None)
             if (s):
-                self._bus.remove_signal_receiver(s.signal_handler,
-                                                 signal,
-                                                 dbus_interface=self._dbus_addr)  # noqa
-                self._signals.pop(signal)
+                BTSignalRouter.for_bus(self._bus).unsubscribe(s.subscription)
         else:
             raise BTSignalNameNotRecognisedException
 
-    def get_property(self, name=None):
+    def get_property(self, name=None, cb_notify_done=None,
+                     cb_notify_error=None):
         """
         Helper to get a property value by name or all
         properties as a dictionary.
 
+        With `cb_notify_done` the properties are read without
+        blocking e.g., from within a signal handler: the method
+        returns immediately and the value is passed to
+        `cb_notify_done` once the reply arrives.
+
         See also :py:meth:`set_property`
 
         :param str name: defaults to None which means all properties
             in the object's dictionary are returned as a dict.
             Otherwise, the property name key is used and its value
             is returned.
+        :param func cb_notify_done: Optional callback called with
+            the value instead of returning it.
+        :param func cb_notify_error: Optional callback called with
+            the dbus error or `KeyError` if the read fails.
         :return: Property value by property key, or a dictionary of
-            all properties
+            all properties.  `None` with `cb_notify_done`.
         :raises KeyError: if the property key is not found in the
             object's dictionary
         :raises dbus.Exception: org.bluez.Error.DoesNotExist
         :raises dbus.Exception: org.bluez.Error.InvalidArguments
         """
-        if (name):
+        if (cb_notify_done is not None):
+            def error(e):
+                if (cb_notify_error):
+                    cb_notify_error(e)
+
+            def reply(properties):
+                if (not name):
+                    cb_notify_done(properties)
+                elif (name in properties):
+                    cb_notify_done(properties[name])
+                else:
+                    error(KeyError(name))
+
+            self._interface.GetProperties(reply_handler=reply,
+                                          error_handler=error)
+        elif (name):
             return self._interface.GetProperties()[name]
         else:
             return self._interface.GetProperties()
@@ -203,13 +280,119 @@ class BTInterface(BTSimpleInterface):
         :return:
         :raises KeyError: if the property key is not found in the
             object's dictionary
+        :raises BTPropertyReadOnlyException: if the property is
+            read only
+        :raises ValueError: if the value cannot be converted to the
+            property's type
         :raises dbus.Exception: org.bluez.Error.DoesNotExist
         :raises dbus.Exception: org.bluez.Error.InvalidArguments
         """
-        typeof = type(self.get_property(name))
+        typeof = self._property_type(name)
         self._interface.SetProperty(name,
                                     translate_to_dbus_type(typeof, value))
 
+    def set_properties(self, properties, cb_notify_done=None):
+        """
+        Helper to set several property values at once, translating
+        each to its correct dbus type.
+
+        With `cb_notify_done` all writes are issued at once without
+        waiting for the replies in between, so that the whole batch
+        takes about as long as a single write, and the method
+        returns immediately.  Otherwise the writes are likewise all
+        sent before the method blocks on each reply in turn, without
+        running the main loop.  bluez applies the writes in the order
+        given either way.
+
+        See also :py:meth:`set_property`
+
+        :param properties: Property names and their new values as a
+            dict, or a list of (name, value) pairs to fix the order
+            in which they are written e.g., `Powered` first.
+        :param func cb_notify_done: Optional callback called with
+            the failures once the replies to all writes have arrived.
+        :return: dictionary of the properties that could not be set,
+            mapping their names to the exception raised or the dbus
+            error received e.g., `KeyError` if the property key is
+            not found in the object's dictionary.  Empty if all were
+            set.  Properties rejected by the interface's schema are
+            never written.  With `cb_notify_done`, only the
+            properties rejected before any write.
+        :rtype: dict
+        """
+        if (hasattr(properties, 'items')):
+            properties = properties.items()
+        current = None if self._PROPERTIES else self.get_property()
+        writes = []
+        failures = {}
+        for (name, value) in properties:
+            try:
+                writes.append((name, translate_to_dbus_type(
+                    self._property_type(name, current), value)))
+            except Exception as e:
+                failures[name] = e
+
+        if (cb_notify_done is None):
+            calls = self._instrument(_PendingCalls(self._bus, self._path,
+                                                   self._dbus_addr))
+            pending = []
+
+            def error(e, name):
+                failures[name] = e
+
+            for (name, value) in writes:
+                try:
+                    pending.append(calls.SetProperty(
+                        name, value, signature='sv',
+                        reply_handler=lambda: None,
+                        error_handler=lambda e, name=name: error(e, name)))
+                except dbus.exceptions.DBusException as e:
+                    failures[name] = e
+            for call in pending:
+                call.block()
+            return failures
+
+        # Writes of the same property more than once are each
+        # waited for
+        pending = [len(writes)]
+        done = dict(failures)
+
+        def reply(name, error=None):
+            pending[0] -= 1
+            if (error is not None):
+                done[name] = error
+            if (not pending[0]):
+                cb_notify_done(done)
+
+        for (name, value) in writes:
+            self._interface.SetProperty(
+                name, value,
+                reply_handler=lambda name=name: reply(name),
+                error_handler=lambda error, name=name: reply(name, error))
+        if (not writes):
+            cb_notify_done(done)
+        return failures
+
+    def _property_type(self, name, properties=None):
+        """
+        Return the dbus type to write a property with, taken from
+        the interface's schema.  Interfaces without a schema fall
+        back to the type of the property's current value, from
+        `properties` if given or else a GetProperties call.
+
+        :raises KeyError: if the property is not known
+        :raises BTPropertyReadOnlyException: if the property is
+            read only
+        """
+        if (not self._PROPERTIES):
+            if (properties is None):
+                properties = self.get_property()
+            return type(properties[name])
+        (typeof, writable) = self._PROPERTIES[name]
+        if (not writable):
+            raise BTPropertyReadOnlyException(name)
+        return typeof
+
     def __getattr__(self, name):
         """Override default getattr behaviours to allow DBus object
         properties to be exposed in the class for getting"""
@@ -1,5 +1,7 @@
 from __future__ import unicode_literals
 
+import dbus
+
 from interface import BTInterface
 
 
@@ -15,6 +17,10 @@ class BTManager(BTInterface):
     See also :py:class:`.BTAdapter`
     """
 
+    _PROPERTIES = {
+        'Adapters': (dbus.Array, False),
+    }
+
     SIGNAL_ADAPTER_ADDED = 'AdapterAdded'
     """
     :signal AdapterAdded(signal_name, user_arg, object_path):
@@ -139,6 +139,17 @@ class BTMediaTransport(BTInterface):
     * **Routing(str) [readonly]**: Optional. Indicates where is the
         transport being routed and may be 'HCI' or 'PCM'.
     """
+    _PROPERTIES = {
+        'Device': (dbus.ObjectPath, False),
+        'UUID': (dbus.String, False),
+        'Codec': (dbus.Byte, False),
+        'Configuration': (dbus.Array, False),
+        'Delay': (dbus.UInt16, True),
+        'NREC': (dbus.Boolean, True),
+        'InbandRingtone': (dbus.Boolean, True),
+        'Routing': (dbus.String, False),
+    }
+
     def __init__(self, path, fd=None, adapter_id=None,
                  dev_path=None, dev_id=None):
         if (not path):
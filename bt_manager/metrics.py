@@ -0,0 +1,353 @@
+from __future__ import unicode_literals
+
+import time
+
+from histogram import BTLatencyHistogram
+
+
+class BTMetrics(object):
+    """
+    Registry of counters and latency histograms recorded by the
+    package's hot paths: D-Bus method calls, SBC encoding and
+    decoding on media transports and transport ready callbacks.
+
+    Recording is disabled by default, in which case each hot path
+    costs a single attribute test.  D-Bus calls are only measured
+    on interfaces created while recording is enabled.
+
+    Each metric is identified by a name and a set of labels e.g.,
+    the `bt_dbus_calls_total` counter labelled with the interface
+    and method called.  The recorded metrics may be exported with
+    :py:meth:`snapshot` or :py:meth:`prometheus`.
+
+    :param bool enabled: Optional.  Start recording immediately.
+    """
+
+    DBUS_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 1.0, 5.0, 25.0)
+    """:data DBUS_BOUNDS: Bucket bounds in seconds for D-Bus calls"""
+
+    CODEC_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                    0.01, 0.025, 0.05, 0.1)
+    """:data CODEC_BOUNDS: Bucket bounds in seconds for codec calls"""
+
+    CALLBACK_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                       0.25, 0.5, 1.0)
+    """:data CALLBACK_BOUNDS: Bucket bounds in seconds for callbacks"""
+
+    # Help text of the metrics recorded by the package
+    HELP = {
+        'bt_dbus_calls_total': 'D-Bus method calls made',
+        'bt_dbus_errors_total': 'D-Bus method calls failed',
+        'bt_dbus_call_seconds': 'D-Bus method call latency',
+        'bt_codec_seconds': 'SBC codec call latency on media transports',
+        'bt_transport_bytes_total': 'PCM bytes written to or read from '
+                                    'media transports',
+        'bt_transport_frames_total': 'SBC frames written to or read from '
+                                     'media transports',
+        'bt_transport_packets_total': 'RTP packets written to or read '
+                                      'from media transports',
+        'bt_transport_errors_total': 'RTP packets failed or cut short, '
+                                     'or missing when read',
+        'bt_callback_seconds': 'Time spent in user callbacks',
+        'bt_callback_interval_seconds': 'Time between successive '
+                                        'dispatches of a callback',
+    }
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._counters = {}
+        self._histograms = {}
+        self._dispatched = {}
+
+    def enable(self):
+        """
+        Start recording metrics.  Interfaces created from now on
+        have their D-Bus calls measured.
+
+        :return:
+        """
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stop recording metrics.  Metrics recorded so far are kept.
+
+        :return:
+        """
+        self.enabled = False
+
+    def reset(self):
+        """
+        Discard all recorded metrics.
+
+        :return:
+        """
+        self._counters.clear()
+        self._histograms.clear()
+        self._dispatched.clear()
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted((labels or {}).items())))
+
+    def increment(self, name, labels=None, value=1):
+        """
+        Add to a counter.
+
+        :param str name: Counter name e.g., 'bt_dbus_calls_total'
+        :param dict labels: Optional.  Labels of the counter.
+        :param int value: Optional.  Amount to add.
+        :return:
+        """
+        key = BTMetrics._key(name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, latency, labels=None, bounds=None):
+        """
+        Record a latency in a histogram.
+
+        :param str name: Histogram name e.g., 'bt_dbus_call_seconds'
+        :param float latency: Latency in seconds.
+        :param dict labels: Optional.  Labels of the histogram.
+        :param list bounds: Optional.  Bucket bounds used when the
+            histogram is created.  See :py:class:`.BTLatencyHistogram`
+        :return:
+        """
+        key = BTMetrics._key(name, labels)
+        histogram = self._histograms.get(key)
+        if (histogram is None):
+            histogram = self._histograms[key] = BTLatencyHistogram(bounds)
+        histogram.add(latency)
+
+    def counter(self, name, labels=None):
+        """
+        :param str name: Counter name.
+        :param dict labels: Optional.  Labels of the counter.
+        :return: Value of the counter, 0 if never incremented.
+        :rtype: int
+        """
+        return self._counters.get(BTMetrics._key(name, labels), 0)
+
+    def histogram(self, name, labels=None):
+        """
+        :param str name: Histogram name.
+        :param dict labels: Optional.  Labels of the histogram.
+        :return: The histogram or `None` if nothing was observed.
+        :rtype: :py:class:`.BTLatencyHistogram`
+        """
+        return self._histograms.get(BTMetrics._key(name, labels))
+
+    def record_dbus_call(self, interface, method, latency, failed=False):
+        """
+        Record a D-Bus method call.
+
+        :param str interface: Interface name e.g., 'org.bluez.Adapter'
+        :param str method: Method name e.g., 'GetProperties'
+        :param float latency: Time until the reply in seconds.
+        :param bool failed: Optional.  Whether an error was returned.
+        :return:
+        """
+        labels = {'interface': interface, 'method': method}
+        self.increment('bt_dbus_calls_total', labels)
+        if (failed):
+            self.increment('bt_dbus_errors_total', labels)
+        self.observe('bt_dbus_call_seconds', latency, labels,
+                     BTMetrics.DBUS_BOUNDS)
+
+    def record_transport(self, transport, direction, nbytes, frames,
+                         packets, errors, latency):
+        """
+        Record a read or write of a media transport.
+
+        :param str transport: Media transport object path.
+        :param str direction: 'tx' for writes, 'rx' for reads.
+        :param int nbytes: PCM bytes written or read.
+        :param int frames: SBC frames written or read.
+        :param int packets: RTP packets written or read.
+        :param int errors: Packets that could not be written in
+            full, or were found missing when reading.
+        :param float latency: Time spent in the codec in seconds.
+        :return:
+        """
+        labels = {'transport': transport, 'direction': direction}
+        self.increment('bt_transport_bytes_total', labels, nbytes)
+        self.increment('bt_transport_frames_total', labels, frames)
+        self.increment('bt_transport_packets_total', labels, packets)
+        if (errors):
+            self.increment('bt_transport_errors_total', labels, errors)
+        self.observe('bt_codec_seconds', latency,
+                     {'operation': 'encode' if direction == 'tx'
+                      else 'decode'},
+                     BTMetrics.CODEC_BOUNDS)
+
+    def dispatch(self, callback, source, function, *args):
+        """
+        Call a callback, recording the time spent in it and the
+        time since its previous dispatch from the same source.
+        A growing interval between dispatches of a periodic
+        source e.g., a media transport, shows the main loop
+        lagging behind.
+
+        :param str callback: Callback name e.g., 'transport_ready'
+        :param source: Key identifying the dispatching source.
+        :param func function: Callback function to call.
+        :param args: Arguments passed to `function`.
+        :return: Value returned by `function`.
+        """
+        labels = {'callback': callback}
+        start = time.time()
+        previous = self._dispatched.get((callback, source))
+        self._dispatched[(callback, source)] = start
+        if (previous is not None):
+            self.observe('bt_callback_interval_seconds', start - previous,
+                         labels, BTMetrics.CALLBACK_BOUNDS)
+        try:
+            return function(*args)
+        finally:
+            self.observe('bt_callback_seconds', time.time() - start, labels,
+                         BTMetrics.CALLBACK_BOUNDS)
+
+    def instrument(self, interface, addr):
+        """
+        Wrap a D-Bus interface so that its method calls are
+        recorded.
+
+        :param interface: Interface to wrap.  See `dbus.Interface`
+        :param str addr: Interface name e.g., 'org.bluez.Adapter'
+        :return: Wrapped interface.
+        """
+        def start(method, args, asynchronous):
+            begin = time.time()
+            return lambda failed: self.record_dbus_call(
+                addr, method, time.time() - begin, failed)
+        return _MeasuredInterface(interface, start)
+
+    def snapshot(self):
+        """
+        Return the recorded metrics as a dictionary with a
+        'counters' and a 'histograms' entry.  Each maps metric
+        names to a list of `{'labels': ..., ...}` dictionaries
+        holding a counter's `value`, or a histogram's `count`,
+        `sum`, `max` and per bucket `buckets` counts.
+
+        :return: Recorded metrics.
+        :rtype: dict
+        """
+        counters = {}
+        for ((name, labels), value) in sorted(self._counters.items()):
+            counters.setdefault(name, []).append({'labels': dict(labels),
+                                                  'value': value})
+        histograms = {}
+        for ((name, labels), h) in sorted(self._histograms.items()):
+            buckets = zip([str(b) for b in h.bounds] + ['+Inf'], h.counts)
+            histograms.setdefault(name, []).append({'labels': dict(labels),
+                                                    'count': h.count,
+                                                    'sum': h.total,
+                                                    'max': h.max,
+                                                    'buckets': dict(buckets)})
+        return {'counters': counters, 'histograms': histograms}
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        labels = tuple(labels) + tuple(extra)
+        if (not labels):
+            return ''
+        return '{' + ','.join('%s="%s"' % (k, BTMetrics._escape(v))
+                              for (k, v) in labels) + '}'
+
+    @staticmethod
+    def _escape(value):
+        """
+        Escape a label value for the Prometheus text format
+        """
+        return unicode(value).replace('\\', '\\\\').replace('"', '\\"')
+
+    def prometheus(self):
+        """
+        Return the recorded metrics in the Prometheus text
+        exposition format.
+
+        :return: Metrics, one sample per line.
+        :rtype: str
+        """
+        lines = []
+        last = None
+        for ((name, labels), value) in sorted(self._counters.items()):
+            if (name != last):
+                lines.append('# HELP %s %s' % (name,
+                                               BTMetrics.HELP.get(name, name)))
+                lines.append('# TYPE %s counter' % name)
+                last = name
+            lines.append('%s%s %d' % (name, BTMetrics._labels(labels), value))
+        for ((name, labels), h) in sorted(self._histograms.items()):
+            if (name != last):
+                lines.append('# HELP %s %s' % (name,
+                                               BTMetrics.HELP.get(name, name)))
+                lines.append('# TYPE %s histogram' % name)
+                last = name
+            seen = 0
+            for (bound, n) in zip(list(h.bounds) + ['+Inf'], h.counts):
+                seen += n
+                le = bound if bound == '+Inf' else repr(float(bound))
+                lines.append('%s_bucket%s %d' % (
+                    name, BTMetrics._labels(labels, [('le', le)]), seen))
+            lines.append('%s_sum%s %r' % (name, BTMetrics._labels(labels),
+                                          h.total))
+            lines.append('%s_count%s %d' % (name, BTMetrics._labels(labels),
+                                            h.count))
+        return '\n'.join(lines) + '\n'
+
+
+# dbus.Interface methods not making a method call on the bus
+_LOCAL_METHODS = ('connect_to_signal', 'get_dbus_method')
+
+
+class _MeasuredInterface(object):
+    """
+    Stands in for a `dbus.Interface`, reporting each method call
+    made through it.  `start(method, args, asynchronous)` is
+    called as a call is made and returns a function called with
+    whether the call failed once it completes.  Asynchronous calls
+    complete when their reply or error handler is called.
+    """
+    def __init__(self, interface, start):
+        self._measured = interface
+        self._start = start
+
+    def __getattr__(self, name):
+        method = getattr(self._measured, name)
+        if (name.startswith('_') or name in _LOCAL_METHODS or
+                not callable(method)):
+            return method
+        start = self._start
+
+        def call(*args, **kwargs):
+            reply_handler = kwargs.get('reply_handler')
+            error_handler = kwargs.get('error_handler')
+            if (reply_handler is not None and error_handler is not None):
+                finish = start(name, args, True)
+
+                def on_reply(*reply):
+                    finish(False)
+                    return reply_handler(*reply)
+
+                def on_error(error):
+                    finish(True)
+                    return error_handler(error)
+                kwargs['reply_handler'] = on_reply
+                kwargs['error_handler'] = on_error
+                return method(*args, **kwargs)
+            finish = start(name, args, False)
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                finish(True)
+                raise
+            finish(False)
+            return result
+        return call
+
+
+METRICS = BTMetrics()
+""":data METRICS: Metrics registry used by the package"""
@@ -0,0 +1,278 @@
+from __future__ import unicode_literals
+
+import mmap
+import os
+import struct
+
+from exceptions import BTUnsupportedMediaFormat
+
+
+try:
+    _slice = buffer
+except NameError:
+    def _slice(obj, offset, size):
+        return memoryview(obj)[offset:offset + size]
+
+
+_WAV_HEADER = struct.Struct(str('<4sI4s4sIHHIIHH4sI'))
+_WAV_FORMAT = struct.Struct(str('<HHIIHH'))
+_WAV_FORMAT_PCM = 1
+
+
+def _parse_wav_header(mm):
+    """
+    Walk the RIFF chunks of a memory-mapped WAV file to locate
+    the `fmt ` and `data` chunks.
+
+    :return: tuple of the form (data_offset, data_size, channels,
+        frequency, bits_per_sample)
+    :raises BTUnsupportedMediaFormat: if the file is not a PCM WAV file
+        or its `fmt ` chunk is truncated
+    """
+    if (len(mm) < 12 or mm[0:4] != b'RIFF' or mm[8:12] != b'WAVE'):
+        raise BTUnsupportedMediaFormat
+    fmt = None
+    offset = 12
+    while (offset + 8 <= len(mm)):
+        chunk_id = mm[offset:offset + 4]
+        (chunk_size,) = struct.unpack_from(str('<I'), mm, offset + 4)
+        offset += 8
+        if (chunk_id == b'fmt '):
+            if (chunk_size < _WAV_FORMAT.size or
+                    offset + _WAV_FORMAT.size > len(mm)):
+                raise BTUnsupportedMediaFormat
+            fmt = _WAV_FORMAT.unpack_from(mm, offset)
+        elif (chunk_id == b'data'):
+            if (fmt is None or fmt[0] != _WAV_FORMAT_PCM):
+                raise BTUnsupportedMediaFormat
+            data_size = min(chunk_size, len(mm) - offset)
+            return (offset, data_size, fmt[1], fmt[2], fmt[5])
+        offset += chunk_size + (chunk_size & 1)
+    raise BTUnsupportedMediaFormat
+
+
+class PCMFileReader:
+    """
+    Memory-mapped reader for streaming a WAV or raw PCM file
+    to an :py:class:`.SBCAudioSource` endpoint.
+
+    The file is mapped read-only and each block handed to the
+    endpoint is a zero-copy slice of the mapping, so no
+    intermediate copies or read system calls are made while
+    streaming.  The block is passed straight through
+    :py:meth:`.SBCAudioCodec.write_transport` to the SBC encoder.
+
+    WAV files are detected from their RIFF header and the audio
+    parameters are taken from the `fmt ` chunk.  Any other file
+    is treated as raw PCM using the supplied parameters.
+
+    :param str filename: Path of the WAV or raw PCM file.
+    :param int block_size: Maximum number of bytes to encode on
+        each `transport ready` event.
+    :param int channels: Number of channels for raw PCM files.
+    :param int frequency: Sampling frequency in Hz for raw PCM files.
+    :param int bits_per_sample: Sample width for raw PCM files.
+    :raises BTUnsupportedMediaFormat: if the file is a WAV file
+        that does not carry linear PCM data, or the PCM is not
+        16-bit mono or stereo, which is all the SBC encoder takes.
+    """
+    def __init__(self, filename, block_size=2560, channels=2,
+                 frequency=44100, bits_per_sample=16):
+        self.block_size = block_size
+        self._fd = os.open(filename, os.O_RDONLY)
+        try:
+            self._mm = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        except Exception:
+            os.close(self._fd)
+            raise
+        try:
+            if (self._mm[0:4] == b'RIFF'):
+                (self._offset, self.data_size, self.channels,
+                 self.frequency, self.bits_per_sample) = \
+                    _parse_wav_header(self._mm)
+            else:
+                self._offset = 0
+                self.data_size = len(self._mm)
+                self.channels = channels
+                self.frequency = frequency
+                self.bits_per_sample = bits_per_sample
+            if (self.bits_per_sample != 16 or
+                    self.channels not in (1, 2) or self.frequency <= 0):
+                raise BTUnsupportedMediaFormat
+        except BTUnsupportedMediaFormat:
+            self.close()
+            raise
+        self._pos = 0
+        self.user_cb = None
+        self.user_arg = None
+
+    @property
+    def remaining(self):
+        """Number of PCM bytes not yet consumed"""
+        return self.data_size - self._pos
+
+    def read(self, size=None):
+        """
+        Return the next block of PCM data without consuming it.
+        Call :py:meth:`advance` once the block has been used.
+
+        :param int size: Optional.  Maximum number of bytes to
+            return, defaults to `block_size`.
+        :return: zero-copy view onto the mapped file, or `None`
+            once the end of the data has been reached.
+        """
+        if (size is None):
+            size = self.block_size
+        size = min(size, self.remaining)
+        if (size <= 0):
+            return None
+        return _slice(self._mm, self._offset + self._pos, size)
+
+    def advance(self, size):
+        """
+        Consume `size` bytes of PCM data.
+
+        :param int size: Number of bytes to consume.
+        """
+        self._pos = min(self._pos + size, self.data_size)
+
+    def rewind(self):
+        """Restart reading from the beginning of the PCM data"""
+        self._pos = 0
+
+    def stream_to(self, endpoint, cb_notify_eof=None, user_arg=None):
+        """
+        Register with the endpoint's `transport ready` event so that
+        the file is encoded and sent to the sink block by block.
+
+        :param endpoint: An :py:class:`.SBCAudioSource` instance.
+        :param func cb_notify_eof: Optional callback invoked with
+            `user_arg` once the whole file has been sent.  The
+            `transport ready` event is unregistered beforehand.
+        :param user_arg: User defined callback argument.
+        :return:
+        """
+        self.user_cb = cb_notify_eof
+        self.user_arg = user_arg
+        endpoint.register_transport_ready_event(self._transport_ready,
+                                                endpoint)
+
+    def _transport_ready(self, endpoint):
+        data = self.read()
+        consumed = 0
+        if (data is not None):
+            consumed = endpoint.write_transport(data)
+            self.advance(consumed)
+        if (not consumed):
+            # Any remainder is shorter than one SBC frame's worth
+            # of PCM and can't be encoded
+            endpoint.unregister_transport_ready_event()
+            if (self.user_cb):
+                self.user_cb(self.user_arg)
+
+    def close(self):
+        """Unmap and close the file"""
+        if (self._mm is not None):
+            self._mm.close()
+            os.close(self._fd)
+            self._mm = None
+
+
+class PCMFileWriter:
+    """
+    Memory-mapped writer for recording the decoded output of an
+    :py:class:`.SBCAudioSink` endpoint to a WAV or raw PCM file.
+
+    The file is preallocated and mapped so that each decoded
+    block is copied straight into the page cache without a write
+    system call.  The mapping is grown geometrically when full.
+    On :py:meth:`close` the WAV header is patched with the final
+    data length and the file is truncated to its actual size.
+
+    :param str filename: Path of the file to create.
+    :param int channels: Number of channels.
+    :param int frequency: Sampling frequency in Hz.
+    :param int bits_per_sample: Sample width.
+    :param int prealloc: Initial number of PCM bytes to preallocate.
+    :param bool wav: Write a WAV header if `True`, otherwise raw PCM.
+    """
+    def __init__(self, filename, channels=2, frequency=44100,
+                 bits_per_sample=16, prealloc=1 << 20, wav=True):
+        self.channels = channels
+        self.frequency = frequency
+        self.bits_per_sample = bits_per_sample
+        self._offset = _WAV_HEADER.size if wav else 0
+        self._wav = wav
+        self._pos = 0
+        self._fd = os.open(filename, os.O_RDWR | os.O_CREAT | os.O_TRUNC,
+                           0o644)
+        try:
+            self._capacity = max(prealloc, mmap.PAGESIZE)
+            os.ftruncate(self._fd, self._offset + self._capacity)
+            self._mm = mmap.mmap(self._fd, self._offset + self._capacity)
+        except Exception:
+            os.close(self._fd)
+            raise
+
+    @property
+    def data_size(self):
+        """Number of PCM bytes written so far"""
+        return self._pos
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while (capacity < needed):
+            capacity *= 2
+        os.ftruncate(self._fd, self._offset + capacity)
+        self._mm.resize(self._offset + capacity)
+        self._capacity = capacity
+
+    def write(self, data):
+        """
+        Append PCM data to the file.
+
+        :param data: Any object supporting the buffer protocol e.g.,
+            the buffer returned by :py:meth:`.SBCAudioCodec.read_transport`
+        :return:
+        """
+        size = len(data)
+        if (self._pos + size > self._capacity):
+            self._grow(self._pos + size)
+        start = self._offset + self._pos
+        self._mm[start:start + size] = data[:]
+        self._pos += size
+
+    def record_from(self, endpoint):
+        """
+        Register with the endpoint's `transport ready` event so that
+        all decoded data is appended to the file.
+
+        :param endpoint: An :py:class:`.SBCAudioSink` instance.
+        :return:
+        """
+        endpoint.register_transport_ready_event(self._transport_ready,
+                                                endpoint)
+
+    def _transport_ready(self, endpoint):
+        self.write(endpoint.read_transport())
+
+    def close(self):
+        """
+        Patch the WAV header, truncate the file to the recorded
+        length and close it.
+        """
+        if (self._mm is None):
+            return
+        if (self._wav):
+            block_align = self.channels * self.bits_per_sample // 8
+            _WAV_HEADER.pack_into(self._mm, 0,
+                                  b'RIFF', _WAV_HEADER.size - 8 + self._pos,
+                                  b'WAVE', b'fmt ', 16, _WAV_FORMAT_PCM,
+                                  self.channels, self.frequency,
+                                  self.frequency * block_align, block_align,
+                                  self.bits_per_sample, b'data', self._pos)
+        self._mm.flush()
+        self._mm.close()
+        self._mm = None
+        os.ftruncate(self._fd, self._offset + self._pos)
+        os.close(self._fd)
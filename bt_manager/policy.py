@@ -0,0 +1,225 @@
+from __future__ import unicode_literals
+
+from codecs import SBCCodecConfig, SBCChannelMode, SBCSamplingFrequency, \
+    SBCAllocationMethod, SBCSubbands, SBCBlocks, SBC_FREQUENCY_RATES
+from exceptions import BTInvalidConfiguration
+
+
+def _bitpools(low, mono_44_1, stereo_44_1, mono_48, stereo_48):
+    """
+    Bitpool of each (frequency, channel mode), given those of
+    mono and stereo at 44.1kHz and 48kHz and of all modes at lower
+    frequencies
+    """
+    bitpools = {}
+    for channel_mode in (SBCChannelMode.CHANNEL_MODE_MONO,
+                         SBCChannelMode.CHANNEL_MODE_DUAL,
+                         SBCChannelMode.CHANNEL_MODE_STEREO,
+                         SBCChannelMode.CHANNEL_MODE_JOINT_STEREO):
+        mono = channel_mode in (SBCChannelMode.CHANNEL_MODE_MONO,
+                                SBCChannelMode.CHANNEL_MODE_DUAL)
+        bitpools[(SBCSamplingFrequency.FREQ_16KHZ, channel_mode)] = low
+        bitpools[(SBCSamplingFrequency.FREQ_32KHZ, channel_mode)] = low
+        bitpools[(SBCSamplingFrequency.FREQ_44_1KHZ, channel_mode)] = \
+            mono_44_1 if mono else stereo_44_1
+        bitpools[(SBCSamplingFrequency.FREQ_48KHZ, channel_mode)] = \
+            mono_48 if mono else stereo_48
+    return bitpools
+
+
+HIGH_QUALITY_BITPOOLS = _bitpools(53, 31, 53, 29, 51)
+"""
+:data HIGH_QUALITY_BITPOOLS: Bitpools of the A2DP high quality
+    settings, keyed by (:py:class:`.SBCSamplingFrequency`,
+    :py:class:`.SBCChannelMode`)
+"""
+
+MIDDLE_QUALITY_BITPOOLS = _bitpools(35, 19, 35, 18, 33)
+"""
+:data MIDDLE_QUALITY_BITPOOLS: Bitpools of the A2DP middle quality
+    settings, keyed by (:py:class:`.SBCSamplingFrequency`,
+    :py:class:`.SBCChannelMode`)
+"""
+
+
+def _preference_table(preferences, width):
+    """
+    For each mask of `width` capability bits, the most preferred
+    capability it includes, or `None`
+    """
+    return tuple(next((p for p in preferences if p & mask), None)
+                 for mask in range(1 << width))
+
+
+class SBCConfigPolicy(object):
+    """
+    Policy by which an endpoint chooses the SBC configuration of
+    a media transport from the capabilities it shares with the
+    device, in `SelectConfiguration`.
+
+    Each of the configuration's parameters is chosen from the
+    capabilities both sides support in the given order of
+    preference.  The choices for every combination of capabilities
+    are looked up in tables computed when the policy is created.
+    The sampling frequency of the endpoint's PCM, if given, is
+    preferred over all others so that it need not be resampled.
+    If the device supports none of the preferred frequencies, any
+    other both sides support is chosen.
+
+    The bitpool is capped at the policy's bitpool for the chosen
+    frequency and channel mode, if any, and at the largest the
+    device supports.
+
+    :param tuple channel_modes: :py:class:`.SBCChannelMode` flags
+        in order of preference.
+    :param tuple frequencies: :py:class:`.SBCSamplingFrequency`
+        flags in order of preference.
+    :param tuple block_lengths: :py:class:`.SBCBlocks` flags in
+        order of preference.
+    :param tuple subbands: :py:class:`.SBCSubbands` flags in order
+        of preference.
+    :param tuple allocation_methods: :py:class:`.SBCAllocationMethod`
+        flags in order of preference.
+    :param dict bitpools: Optional.  Largest bitpool keyed by
+        (frequency, channel mode) e.g., :py:data:`HIGH_QUALITY_BITPOOLS`.
+        Defaults to the largest the device supports.
+    """
+    def __init__(self, channel_modes, frequencies, block_lengths,
+                 subbands, allocation_methods, bitpools=None):
+        self.channel_modes = tuple(channel_modes)
+        self.frequencies = tuple(frequencies)
+        self.block_lengths = tuple(block_lengths)
+        self.subbands = tuple(subbands)
+        self.allocation_methods = tuple(allocation_methods)
+        self.bitpools = bitpools
+        self._channel_modes = _preference_table(self.channel_modes, 4)
+        # Frequencies not preferred are still better than none
+        self._frequencies = _preference_table(
+            self.frequencies +
+            tuple(f for f in _FREQUENCIES if f not in self.frequencies), 4)
+        self._block_lengths = _preference_table(self.block_lengths, 4)
+        self._subbands = _preference_table(self.subbands, 2)
+        self._allocation_methods = _preference_table(self.allocation_methods,
+                                                     2)
+
+    def select(self, our_caps, device_caps, pcm_rate=None):
+        """
+        Choose a configuration supported by both the endpoint and
+        the device.
+
+        :param namedtuple our_caps: Capabilities of the endpoint.
+            See :py:class:`.SBCCodecConfig`
+        :param namedtuple device_caps: Capabilities of the device.
+        :param int pcm_rate: Optional.  Sampling frequency in Hz of
+            the endpoint's PCM.
+        :return config: Chosen configuration.
+        :rtype: namedtuple :py:class:`.SBCCodecConfig`
+        :raises BTInvalidConfiguration: if the endpoint and device
+            have no channel mode, sampling frequency, block length,
+            subbands or allocation method in common.
+        """
+        frequencies = our_caps.frequency & device_caps.frequency & 0xF
+        frequency = self._frequencies[frequencies]
+        for (native, rate) in SBC_FREQUENCY_RATES.items():
+            if (rate == pcm_rate and native & frequencies):
+                frequency = native
+        channel_mode = self._channel_modes[
+            our_caps.channel_mode & device_caps.channel_mode & 0xF]
+        block_length = self._block_lengths[
+            our_caps.block_length & device_caps.block_length & 0xF]
+        subbands = self._subbands[
+            our_caps.subbands & device_caps.subbands & 0x3]
+        allocation_method = self._allocation_methods[
+            our_caps.allocation_method & device_caps.allocation_method & 0x3]
+        if (channel_mode is None or frequency is None or
+                block_length is None or subbands is None or
+                allocation_method is None):
+            raise BTInvalidConfiguration
+
+        min_bitpool = max(our_caps.min_bitpool, device_caps.min_bitpool)
+        max_bitpool = device_caps.max_bitpool
+        if (self.bitpools is None):
+            max_bitpool = min(max_bitpool, our_caps.max_bitpool)
+        else:
+            max_bitpool = min(max_bitpool,
+                              self.bitpools[(frequency, channel_mode)])
+        return SBCCodecConfig(channel_mode,
+                              frequency,
+                              allocation_method,
+                              subbands,
+                              block_length,
+                              min_bitpool,
+                              max(min_bitpool, max_bitpool))
+
+
+_FREQUENCIES = (SBCSamplingFrequency.FREQ_44_1KHZ,
+                SBCSamplingFrequency.FREQ_48KHZ,
+                SBCSamplingFrequency.FREQ_32KHZ,
+                SBCSamplingFrequency.FREQ_16KHZ)
+_STEREO = (SBCChannelMode.CHANNEL_MODE_JOINT_STEREO,
+           SBCChannelMode.CHANNEL_MODE_STEREO,
+           SBCChannelMode.CHANNEL_MODE_DUAL,
+           SBCChannelMode.CHANNEL_MODE_MONO)
+_MONO = (SBCChannelMode.CHANNEL_MODE_MONO,
+         SBCChannelMode.CHANNEL_MODE_JOINT_STEREO,
+         SBCChannelMode.CHANNEL_MODE_STEREO,
+         SBCChannelMode.CHANNEL_MODE_DUAL)
+_LONG_BLOCKS = (SBCBlocks.BLOCKS_16,
+                SBCBlocks.BLOCKS_12,
+                SBCBlocks.BLOCKS_8,
+                SBCBlocks.BLOCKS_4)
+_LOUDNESS = (SBCAllocationMethod.LOUDNESS,
+             SBCAllocationMethod.SNR)
+
+SBC_POLICIES = {
+    'default': SBCConfigPolicy(_STEREO,
+                               (SBCSamplingFrequency.FREQ_44_1KHZ,),
+                               _LONG_BLOCKS,
+                               (SBCSubbands.SUBBANDS_8,
+                                SBCSubbands.SUBBANDS_4),
+                               _LOUDNESS,
+                               HIGH_QUALITY_BITPOOLS),
+    'low_latency': SBCConfigPolicy(_STEREO,
+                                   _FREQUENCIES,
+                                   tuple(reversed(_LONG_BLOCKS)),
+                                   (SBCSubbands.SUBBANDS_8,
+                                    SBCSubbands.SUBBANDS_4),
+                                   _LOUDNESS,
+                                   HIGH_QUALITY_BITPOOLS),
+    'max_quality': SBCConfigPolicy(_STEREO,
+                                   _FREQUENCIES,
+                                   _LONG_BLOCKS,
+                                   (SBCSubbands.SUBBANDS_8,
+                                    SBCSubbands.SUBBANDS_4),
+                                   _LOUDNESS),
+    'low_cpu': SBCConfigPolicy(_MONO,
+                               _FREQUENCIES,
+                               _LONG_BLOCKS,
+                               (SBCSubbands.SUBBANDS_4,
+                                SBCSubbands.SUBBANDS_8),
+                               _LOUDNESS,
+                               HIGH_QUALITY_BITPOOLS),
+    'battery': SBCConfigPolicy(_STEREO,
+                               _FREQUENCIES,
+                               _LONG_BLOCKS,
+                               (SBCSubbands.SUBBANDS_4,
+                                SBCSubbands.SUBBANDS_8),
+                               _LOUDNESS,
+                               MIDDLE_QUALITY_BITPOOLS),
+}
+"""
+:data SBC_POLICIES: Configuration policies by name, see
+    :py:class:`SBCConfigPolicy`:
+
+* **default**: 44.1kHz joint stereo, 16 blocks, 8 subbands and
+    loudness allocation, at the A2DP high quality bitpool
+* **low_latency**: As default but with the fewest blocks, for the
+    shortest frames and packets
+* **max_quality**: As default but at the largest bitpool the
+    device supports
+* **low_cpu**: Mono with 4 subbands, to cut the work of the
+    encoder and decoder.  Stereo PCM is downmixed, see the
+    endpoint's `pcm_channels`.
+* **battery**: 4 subbands at the A2DP middle quality bitpool, for
+    less encoding and less time on air
+"""
@@ -0,0 +1,143 @@
+from __future__ import unicode_literals
+
+import gobject
+import time
+from collections import OrderedDict
+
+from codecs import SBCCodec
+from pcmfile import _slice
+from exceptions import BTInvalidConfiguration
+
+
+class SBCPrompt:
+    """
+    Fixed audio clip, such as an announcement or prompt, that is
+    played repeatedly to :py:class:`.SBCAudioSource` endpoints.
+
+    Whenever possible the clip is sent as pre-encoded SBC frames
+    which are RTP encapsulated directly, without running the SBC
+    encoder at all:
+
+    * If `frames` were supplied and match the endpoint's
+      negotiated configuration they are sent as-is.
+    * Otherwise, the `pcm` data is encoded once for the negotiated
+      configuration and the result is cached so that subsequent
+      plays with the same configuration need no encoding.  Up to
+      `cache_size` configurations are cached, evicting the least
+      recently used.
+    * If neither is possible e.g., `cache_size` is 0, the `pcm`
+      data is encoded live as it is streamed.
+
+    :param array{byte} pcm: Optional.  PCM data of the clip.  The
+        sampling frequency and number of channels must match those
+        negotiated by the endpoints it is played to.
+    :param array{byte} frames: Optional.  Pre-encoded SBC frames of
+        the clip e.g., as created by :py:func:`.encode_file`.
+    :param int block_size: Maximum number of PCM bytes worth of
+        audio to send on each `transport ready` event.
+    :param int cache_size: Maximum number of encodings to cache.
+    """
+    def __init__(self, pcm=None, frames=None, block_size=2560,
+                 cache_size=4):
+        self.pcm = pcm
+        self.frames = frames
+        self.block_size = block_size
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._data = None
+        self._block = 0
+        self._live = False
+        self._pos = 0
+        self.user_cb = None
+        self.user_arg = None
+
+    def encoded_for(self, codec):
+        """
+        Return SBC frames of the clip that may be sent unmodified
+        using the given codec, encoding and caching them if needed.
+
+        :param codec: An :py:class:`.SBCCodec` instance configured
+            with the negotiated configuration.
+        :return data: SBC frames, or `None` if the clip must be
+            encoded live.
+        :rtype: array{byte}
+        """
+        if (self.frames is not None and codec.accepts_frames(self.frames)):
+            return self.frames
+        config = codec.codec_config
+        frames = self._cache.pop(config, None)
+        if (frames is None):
+            if (self.pcm is None or self.cache_size <= 0):
+                return None
+            # A separate encoder is used so that the state of the
+            # endpoint's own encoder is left untouched
+            frames = SBCCodec(config).encode_frames(self.pcm)
+            while (len(self._cache) >= self.cache_size):
+                self._cache.popitem(last=False)
+        self._cache[config] = frames
+        return frames
+
+    def stream_to(self, endpoint, cb_notify_eof=None, user_arg=None,
+                  at=None):
+        """
+        Register with the endpoint's `transport ready` event so that
+        the clip is sent to the sink block by block.
+
+        :param endpoint: An :py:class:`.SBCAudioSource` instance.
+        :param func cb_notify_eof: Optional callback invoked with
+            `user_arg` once the whole clip has been sent.  The
+            `transport ready` event is unregistered beforehand.
+        :param user_arg: User defined callback argument.
+        :param float at: Optional.  Time, as returned by
+            `time.time()`, at which the clip should be heard.
+            Sending is held back by the latency the endpoint
+            reports.  See :py:meth:`.SBCAudioSource.presentation_time`
+        :return:
+        :raises BTInvalidConfiguration: if the supplied frames do
+            not match the negotiated configuration and there is no
+            PCM data to fall back on.
+        """
+        codec = endpoint.codec
+        self._data = self.encoded_for(codec)
+        if (self._data is not None):
+            self._live = False
+            self._block = max(1, self.block_size // codec.codesize) * \
+                codec.frame_length
+            self._unit = codec.frame_length
+        elif (self.pcm is not None):
+            self._data = self.pcm
+            self._live = True
+            self._block = self.block_size
+            self._unit = codec.codesize
+        else:
+            raise BTInvalidConfiguration
+        self._pos = 0
+        self.user_cb = cb_notify_eof
+        self.user_arg = user_arg
+        if (at is not None):
+            heard = endpoint.presentation_time()
+            wait = at - (heard if heard is not None else time.time())
+            if (wait > 0):
+                gobject.timeout_add(int(wait * 1000), self._start, endpoint)
+                return
+        self._start(endpoint)
+
+    def _start(self, endpoint):
+        endpoint.register_transport_ready_event(self._transport_ready,
+                                                endpoint)
+        return False
+
+    def _transport_ready(self, endpoint):
+        data = _slice(self._data, self._pos,
+                      min(self._block, len(self._data) - self._pos))
+        if (self._live):
+            consumed = endpoint.write_transport(data)
+        else:
+            consumed = endpoint.write_transport_frames(data)
+        self._pos += consumed
+        # Nothing is sent while the transport would block, so the
+        # clip only ends once less than a frame is left
+        if (len(self._data) - self._pos < self._unit):
+            endpoint.unregister_transport_ready_event()
+            if (self.user_cb):
+                self.user_cb(self.user_arg)
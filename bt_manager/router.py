@@ -0,0 +1,106 @@
+from __future__ import unicode_literals
+
+import weakref
+
+
+class BTSignalRouter(object):
+    """
+    Routes the signals of a bus to any number of subscribers,
+    using a single bus match rule per interface.
+
+    Rather than a match rule for each signal and object path,
+    which dbus-daemon must check every message against, one match
+    is installed for all signals of an interface the first time it
+    is subscribed to.  Signals are then dispatched in-process from
+    a dictionary keyed by object path and signal name.  The match
+    is removed again once the interface's last subscriber has
+    unsubscribed.
+
+    :param bus: The dbus bus connection to route signals of.
+
+    .. note:: Use :py:meth:`for_bus` to obtain the router shared
+        by all users of a bus.  Routers only hold weak references
+        to their buses, and are dropped along with them.
+    """
+    _routers = weakref.WeakKeyDictionary()
+
+    def __init__(self, bus):
+        self._bus = weakref.ref(bus)
+        self._routes = {}
+        self._handlers = {}
+
+    @classmethod
+    def for_bus(cls, bus):
+        """
+        Return the router shared by all users of a bus.
+
+        :param bus: The dbus bus connection e.g., `dbus.SystemBus()`
+        :return: router instance
+        :rtype: :py:class:`BTSignalRouter`
+        """
+        router = cls._routers.get(bus)
+        if (router is None):
+            router = cls._routers[bus] = cls(bus)
+        return router
+
+    def subscribe(self, dbus_interface, path, signal, callback):
+        """
+        Subscribe to a signal.
+
+        :param str dbus_interface: Interface emitting the signal
+            e.g., 'org.bluez.Adapter'
+        :param str path: Object path emitting the signal e.g.,
+            '/org/bluez/985/hci0', or `None` for all object paths.
+        :param str signal: Signal name e.g., 'PropertyChanged'
+        :param func callback: Called with the signal's arguments.
+        :return: Subscription to pass to :py:meth:`unsubscribe`.
+        """
+        routes = self._routes.get(dbus_interface)
+        if (routes is None):
+            routes = self._routes[dbus_interface] = {}
+            handler = self._handlers[dbus_interface] = \
+                self._dispatcher(routes)
+            self._bus().add_signal_receiver(handler,
+                                            dbus_interface=dbus_interface,
+                                            path_keyword='path',
+                                            member_keyword='member')
+        key = (path, signal)
+        # Tuples are replaced rather than modified, so that callbacks
+        # may unsubscribe while a signal is being dispatched
+        routes[key] = routes.get(key, ()) + (callback,)
+        return (dbus_interface, key, callback)
+
+    def unsubscribe(self, subscription):
+        """
+        Remove a subscription made with :py:meth:`subscribe`.
+
+        :param subscription: As returned by :py:meth:`subscribe`.
+        :return:
+        """
+        (dbus_interface, key, callback) = subscription
+        routes = self._routes.get(dbus_interface, {})
+        callbacks = list(routes.get(key, ()))
+        if (callback not in callbacks):
+            return
+        callbacks.remove(callback)
+        if (callbacks):
+            routes[key] = tuple(callbacks)
+            return
+        del routes[key]
+        if (not routes):
+            del self._routes[dbus_interface]
+            handler = self._handlers.pop(dbus_interface)
+            bus = self._bus()
+            if (bus is not None):
+                bus.remove_signal_receiver(handler,
+                                           dbus_interface=dbus_interface)
+
+    @staticmethod
+    def _dispatcher(routes):
+        def dispatch(*args, **kwargs):
+            path = kwargs.get('path')
+            member = kwargs.get('member')
+            for key in ((path, member), (None, member)):
+                for callback in routes.get(key, ()):
+                    callback(*args)
+        return dispatch
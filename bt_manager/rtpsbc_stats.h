@@ -0,0 +1 @@
+../codecs/rtpsbc_stats.h
\ No newline at end of file
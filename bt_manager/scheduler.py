@@ -0,0 +1,296 @@
+from __future__ import unicode_literals
+
+from adapter import BTAdapter
+from discoverysession import BTDiscoverySession
+from interface import BTInterface
+from manager import BTManager
+
+
+class BTAdapterScheduler:
+    """
+    Spreads discovery sessions, connection attempts and A2DP streams
+    across all the adapters known to :py:class:`.BTManager`, rather
+    than running everything on the default adapter.
+
+    Each request is placed on the adapter with the least load, which
+    is the weighted sum of the work scheduled on it
+    (see :py:attr:`WEIGHTS`) plus the weight of a discovery session
+    if the adapter is `Discovering` on behalf of another process.
+    Streams are counted from the media transports acquired by
+    endpoints created with this scheduler, see
+    :py:meth:`transport_acquired`.
+
+    Work for a device that is known to an adapter is always placed
+    on that adapter since the device's object path, pairing and link
+    belong to it.  A device becomes known to an adapter once it has
+    been paired or connected through the scheduler, or on
+    :py:meth:`bind_device`.
+
+    Adapters that are plugged in or removed while the scheduler is
+    running are added to and dropped from the pool automatically.
+
+    :param manager: Optional :py:class:`.BTManager` instance.
+
+    .. note:: The scheduler installs signal receivers on the
+        manager instance and on its own :py:class:`.BTAdapter`
+        instances, replacing any others installed on them.
+    """
+
+    DISCOVERY = 'discovery'
+    """:data DISCOVERY: Work type of a discovery session"""
+    CONNECTION = 'connection'
+    """:data CONNECTION: Work type of a connection attempt"""
+    STREAM = 'stream'
+    """:data STREAM: Work type of an active media transport"""
+
+    WEIGHTS = {DISCOVERY: 4, CONNECTION: 2, STREAM: 1}
+    """
+    :data WEIGHTS: Load contributed by each work type.  An inquiry
+        occupies the radio far more than an established stream.
+    """
+
+    def __init__(self, manager=None):
+        self.manager = manager or BTManager()
+        self.adapters = {}
+        self._load = {}
+        self._discovering = {}
+        self._devices = {}
+        self._streams = {}
+        self._sessions = {}
+        for path in self.manager.list_adapters():
+            self._add_adapter(path, True)
+        self.manager.add_signal_receiver(self._adapter_added,
+                                         BTManager.SIGNAL_ADAPTER_ADDED,
+                                         None)
+        self.manager.add_signal_receiver(self._adapter_removed,
+                                         BTManager.SIGNAL_ADAPTER_REMOVED,
+                                         None)
+
+    def _add_adapter(self, path, blocking):
+        adapter = BTAdapter(adapter_path=path)
+        self.adapters[path] = adapter
+        self._load[path] = dict((k, 0) for k in BTAdapterScheduler.WEIGHTS)
+        self._discovering[path] = False
+        adapter.add_signal_receiver(self._property_changed,
+                                    BTInterface.SIGNAL_PROPERTY_CHANGED,
+                                    path)
+        if (blocking):
+            self._discovering[path] = bool(adapter.Discovering)
+        else:
+            # Replies and signals arrive in the order bluez sent them,
+            # so whichever comes last holds the current state
+            adapter.get_property(
+                'Discovering',
+                lambda value: self._property_changed(
+                    None, path, 'Discovering', value))
+
+    def _adapter_added(self, signal, user_arg, path):
+        if (path not in self.adapters):
+            self._add_adapter(path, False)
+
+    def _adapter_removed(self, signal, user_arg, path):
+        adapter = self.adapters.pop(path, None)
+        if (adapter is not None):
+            adapter.remove_signal_receiver(
+                BTInterface.SIGNAL_PROPERTY_CHANGED)
+        self._load.pop(path, None)
+        self._discovering.pop(path, None)
+        for (address, adapter_path) in list(self._devices.items()):
+            if (adapter_path == path):
+                del self._devices[address]
+        for (transport, adapter_path) in list(self._streams.items()):
+            if (adapter_path == path):
+                del self._streams[transport]
+
+    def _property_changed(self, signal, path, name, value):
+        if (name == 'Discovering' and path in self._discovering):
+            self._discovering[path] = bool(value)
+
+    def load(self, adapter):
+        """
+        Return the current load of an adapter.
+
+        :param adapter: A :py:class:`.BTAdapter` instance or its
+            object path.
+        :return: Weighted sum of the work scheduled on the adapter.
+        :rtype: int
+        """
+        path = self.path_of(adapter)
+        load = self._load[path]
+        total = sum(n * BTAdapterScheduler.WEIGHTS[k]
+                    for (k, n) in load.items())
+        if (self._discovering[path] and not load[BTAdapterScheduler.DISCOVERY]):  # noqa
+            total += BTAdapterScheduler.WEIGHTS[BTAdapterScheduler.DISCOVERY]
+        return total
+
+    def path_of(self, adapter):
+        """
+        Return the object path of an adapter.
+
+        :param adapter: A :py:class:`.BTAdapter` instance returned by
+            :py:meth:`acquire`, or its object path.
+        :return: Adapter object path e.g., '/org/bluez/985/hci0'
+        :rtype: str
+        """
+        for (path, instance) in self.adapters.items():
+            if (instance is adapter):
+                return path
+        return adapter
+
+    def acquire(self, work, address=None, exclude=()):
+        """
+        Choose the adapter to run a piece of work on and account
+        for it until :py:meth:`release` is called.
+
+        :param str work: :py:attr:`DISCOVERY`, :py:attr:`CONNECTION`
+            or :py:attr:`STREAM`
+        :param str address: Optional device address e.g.,
+            '11:22:33:44:55:66'.  If the device is known to an
+            adapter then that adapter is chosen.
+        :param exclude: Optional object paths of adapters not to
+            choose e.g., because they have no room for the work.
+            A device known to an excluded adapter is still placed
+            on it.
+        :return: The chosen adapter
+        :rtype: :py:class:`.BTAdapter`
+        :raises KeyError: if there are no adapters to choose from.
+        """
+        return self.adapters[self._acquire(work, address, exclude)]
+
+    def _acquire(self, work, address=None, exclude=()):
+        path = self._devices.get(address.upper()) if address else None
+        if (path not in self.adapters):
+            paths = [p for p in sorted(self.adapters) if p not in exclude]
+            if (not paths):
+                raise KeyError('no adapters')
+            path = min(paths, key=self.load)
+        self._load[path][work] += 1
+        return path
+
+    def release(self, adapter, work):
+        """
+        Release work previously placed with :py:meth:`acquire`.
+
+        :param adapter: The :py:class:`.BTAdapter` instance returned
+            by :py:meth:`acquire`, or its object path.
+        :param str work: The work type passed to :py:meth:`acquire`.
+        :return:
+        """
+        load = self._load.get(self.path_of(adapter))
+        if (load and load[work]):
+            load[work] -= 1
+
+    def bind_device(self, address, adapter):
+        """
+        Record that a device is known to an adapter e.g., once it
+        has been paired or connected on it, so that all further
+        work for the device is placed on that adapter.
+
+        :param str address: Device address e.g., '11:22:33:44:55:66'
+        :param adapter: A :py:class:`.BTAdapter` instance returned by
+            :py:meth:`acquire`, or its object path.
+        :return:
+        """
+        path = self.path_of(adapter)
+        if (path in self.adapters):
+            self._devices[address.upper()] = path
+
+    def transport_acquired(self, transport_path):
+        """
+        Account for a media transport acquired by an endpoint as
+        a :py:attr:`STREAM` on the adapter it belongs to, until
+        :py:meth:`transport_released` is called.  Endpoints given
+        the scheduler call this themselves.
+
+        :param str transport_path: Media transport object path e.g.,
+            '/org/bluez/985/hci0/dev_00_11_67_D2_AB_EE/fd0'
+        :return:
+        """
+        if (transport_path in self._streams):
+            return
+        for path in self.adapters:
+            if (transport_path.startswith(path + '/')):
+                self._streams[transport_path] = path
+                self._load[path][BTAdapterScheduler.STREAM] += 1
+                break
+
+    def transport_released(self, transport_path):
+        """
+        Release a media transport accounted for by
+        :py:meth:`transport_acquired`.
+
+        :param str transport_path: Media transport object path.
+        :return:
+        """
+        path = self._streams.pop(transport_path, None)
+        if (path is not None):
+            self.release(path, BTAdapterScheduler.STREAM)
+
+    def start_discovery(self, callback, user_arg=None, **kwargs):
+        """
+        Start a :py:class:`.BTDiscoverySession` on the least loaded
+        adapter.  Call this once per adapter to inquire on all of
+        them in parallel.
+
+        :param func callback: Session callback, see
+            :py:class:`.BTDiscoverySession`.
+        :param user_arg: User defined callback argument.
+        :param kwargs: Further :py:class:`.BTDiscoverySession` arguments.
+        :return: The started session
+        :rtype: :py:class:`.BTDiscoverySession`
+        """
+        path = self._acquire(BTAdapterScheduler.DISCOVERY)
+        try:
+            # The session installs its own signal receivers, so gets
+            # its own adapter instance
+            session = BTDiscoverySession(BTAdapter(adapter_path=path),
+                                         callback, user_arg, **kwargs)
+            session.start()
+        except Exception:
+            self.release(path, BTAdapterScheduler.DISCOVERY)
+            raise
+        self._sessions[session] = path
+        return session
+
+    def stop_discovery(self, session):
+        """
+        Stop a session started by :py:meth:`start_discovery`.
+
+        :param session: The :py:class:`.BTDiscoverySession` to stop.
+        :return:
+        """
+        try:
+            session.stop()
+        finally:
+            path = self._sessions.pop(session, None)
+            if (path is not None):
+                self.release(path, BTAdapterScheduler.DISCOVERY)
+
+    def create_paired_device(self, dev_id, agent_path, capability,
+                             cb_notify_device, cb_notify_error):
+        """
+        Pair with a device using the least loaded adapter, or the
+        adapter the device is already known to.  Refer to
+        :py:meth:`.BTAdapter.create_paired_device` for arguments.
+
+        :return: The adapter used
+        :rtype: :py:class:`.BTAdapter`
+        """
+        adapter = self.acquire(BTAdapterScheduler.CONNECTION, dev_id)
+
+        def device_created(path):
+            self.release(adapter, BTAdapterScheduler.CONNECTION)
+            self.bind_device(dev_id, adapter)
+            cb_notify_device(path)
+
+        def error(reason):
+            self.release(adapter, BTAdapterScheduler.CONNECTION)
+            cb_notify_error(reason)
+
+        try:
+            adapter.create_paired_device(dev_id, agent_path, capability,
+                                         device_created, error)
+        except Exception:
+            self.release(adapter, BTAdapterScheduler.CONNECTION)
+            raise
+        return adapter
@@ -0,0 +1,214 @@
+from __future__ import unicode_literals
+
+import binascii
+import json
+import os
+
+from discovery import parse_service_records, BTServiceRecord
+from interface import BTInterface
+from serviceuuids import _service_uuid
+from uuid import BTUUID
+
+
+_FORMAT_VERSION = 2
+
+
+def _encode(value):
+    """
+    Convert an attribute value to JSON, tagging the types JSON
+    lacks.  UUIDs are stored by value only, their names and
+    descriptions are restored from SERVICES when loading.
+    """
+    if (isinstance(value, tuple)):
+        return [_encode(item) for item in value]
+    elif (isinstance(value, BTUUID)):
+        return {'uuid': unicode(value.uuid)}
+    elif (isinstance(value, bytes)):
+        return {'hex': binascii.hexlify(value).decode('ascii')}
+    return value
+
+
+def _decode(value):
+    """Inverse of :py:func:`_encode`"""
+    if (isinstance(value, list)):
+        return tuple(_decode(item) for item in value)
+    elif (isinstance(value, dict)):
+        if ('uuid' in value):
+            return _service_uuid(BTUUID(uuid=value['uuid']))
+        return binascii.unhexlify(value['hex'])
+    return value
+
+
+def _fingerprint(uuids):
+    return tuple(sorted(str(uuid).upper() for uuid in (uuids or [])))
+
+
+class BTServiceRecordCache:
+    """
+    Persistent cache of parsed service records, keyed by device
+    address and record handle, allowing the SDP browse performed
+    by :py:meth:`.BTDevice.discover_services` to be skipped
+    entirely on reconnects and inventory scans.
+
+    Each device's records are stored as :py:class:`.BTServiceRecord`
+    tuples in a JSON file in the cache directory, which unlike a
+    pickle cannot run code when loaded.  UUIDs are stored by value
+    alone.  Cached records are discarded
+    whenever the device's `UUIDs` property no longer matches the
+    one they were stored with, and on :py:meth:`invalidate`.
+
+    :param str path: Optional.  Cache directory, defaults to
+        `bt-manager/sdp` in `$XDG_CACHE_HOME` or `~/.cache`.
+    """
+    def __init__(self, path=None):
+        if (path is None):
+            path = os.path.join(os.environ.get('XDG_CACHE_HOME') or
+                                os.path.expanduser('~/.cache'),
+                                'bt-manager', 'sdp')
+        self.path = path
+        self._records = {}
+
+    def _filename(self, address):
+        return os.path.join(self.path,
+                            address.replace(':', '').upper() + '.sdp')
+
+    def _load(self, address):
+        try:
+            with open(self._filename(address), 'rb') as fh:
+                entry = json.load(fh)
+            if (entry['version'] != _FORMAT_VERSION):
+                return None
+            records = {}
+            for (handle, attributes) in entry['records']:
+                records[handle] = BTServiceRecord(
+                    handle, dict((attr_id, _decode(value))
+                                 for (attr_id, value) in attributes))
+            return (tuple(entry['uuids']), records)
+        except Exception:
+            # Missing, stale or corrupt files are simply a cache miss
+            return None
+
+    def _store(self, address, uuids, records):
+        if (not os.path.isdir(self.path)):
+            os.makedirs(self.path)
+        filename = self._filename(address)
+        entry = {'version': _FORMAT_VERSION,
+                 'uuids': list(uuids),
+                 'records': [[handle,
+                              [[attr_id, _encode(value)] for (attr_id, value)
+                               in sorted(record.attributes.items())]]
+                             for (handle, record) in sorted(records.items())]}
+        with open(filename + '.tmp', 'wb') as fh:
+            json.dump(entry, fh, separators=(',', ':'))
+        os.rename(filename + '.tmp', filename)
+
+    def get(self, address, uuids):
+        """
+        Look up the cached service records of a device.
+
+        :param str address: Device address e.g., '11:22:33:44:55:66'
+        :param list uuids: The device's current `UUIDs` property.
+        :return: dictionary with record handles as keys and
+            :py:class:`.BTServiceRecord` values, or `None` if
+            there are no valid cached records.
+        :rtype: dict
+        """
+        address = address.upper()
+        entry = self._records.get(address)
+        if (entry is None):
+            entry = self._load(address)
+            if (entry is None):
+                return None
+            self._records[address] = entry
+        if (entry[0] != _fingerprint(uuids)):
+            self.invalidate(address)
+            return None
+        return entry[1]
+
+    def put(self, address, uuids, records):
+        """
+        Store the service records of a device.
+
+        :param str address: Device address e.g., '11:22:33:44:55:66'
+        :param list uuids: The device's current `UUIDs` property.
+        :param dict records: Service records as returned by
+            :py:func:`.parse_service_records`.
+        :return:
+        """
+        address = address.upper()
+        entry = (_fingerprint(uuids), records)
+        self._records[address] = entry
+        self._store(address, *entry)
+
+    def get_record(self, address, uuids, handle):
+        """
+        Look up a single cached service record.
+
+        :param str address: Device address e.g., '11:22:33:44:55:66'
+        :param list uuids: The device's current `UUIDs` property.
+        :param int handle: Service record handle.
+        :return: the service record, or `None` if not cached.
+        :rtype: namedtuple :py:class:`.BTServiceRecord`
+        """
+        records = self.get(address, uuids)
+        if (records is None):
+            return None
+        return records.get(handle)
+
+    def invalidate(self, address):
+        """
+        Discard all cached service records of a device.
+
+        :param str address: Device address e.g., '11:22:33:44:55:66'
+        :return:
+        """
+        address = address.upper()
+        self._records.pop(address, None)
+        try:
+            os.remove(self._filename(address))
+        except OSError:
+            pass
+
+    def discover_services(self, device, refresh=False):
+        """
+        Return the parsed service records of a device, only
+        performing service discovery if they are not cached.
+
+        :param device: A :py:class:`.BTDevice` instance.
+        :param bool refresh: Optional.  Force service discovery
+            and update the cache.
+        :return: dictionary with record handles as keys and
+            :py:class:`.BTServiceRecord` values.
+        :rtype: dict
+        :raises dbus.Exception: org.bluez.Error.NotReady
+        :raises dbus.Exception: org.bluez.Error.Failed
+        :raises dbus.Exception: org.bluez.Error.InProgress
+        """
+        address = device.Address
+        uuids = device.UUIDs
+        records = None if refresh else self.get(address, uuids)
+        if (records is None):
+            records = parse_service_records(device.discover_services())
+            self.put(address, uuids, records)
+        return records
+
+    def watch(self, device):
+        """
+        Invalidate the device's cached records as soon as its
+        `UUIDs` or `Paired` properties change e.g., when it is
+        re-paired.
+
+        :param device: A :py:class:`.BTDevice` instance.
+        :return:
+
+        .. note:: This installs the device instance's
+            :py:attr:`.BTInterface.SIGNAL_PROPERTY_CHANGED` receiver,
+            replacing any other receiver installed on that instance.
+        """
+        device.add_signal_receiver(self._property_changed,
+                                   BTInterface.SIGNAL_PROPERTY_CHANGED,
+                                   device.Address)
+
+    def _property_changed(self, signal, address, name, value):
+        if (name == 'UUIDs' or name == 'Paired'):
+            self.invalidate(address)
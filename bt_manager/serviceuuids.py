@@ -1,6 +1,8 @@
 from __future__ import unicode_literals
 
-from uuid import BTUUID16
+from uuid import BTUUID, BTUUID16
+from attributes import ATTRIBUTES
+from exceptions import BTUUIDNotSpecifiedException
 
 __SDP = BTUUID16('0001', 'SDP', 'Bluetooth Core Specification')  # noqa
 __UDP = BTUUID16('0002', 'UDP', '[NO USE BY PROFILES]')  # noqa
@@ -313,4 +315,64 @@ SERVICES = {
         denoting the A2DP audio source profile UUID.
     ``SERVICES['110A']`` shall return the same :py:class:`.BTUUID16`
         denoting the A2DP audio source profile UUID.
+
+    See also :py:func:`resolve_services` to look services up by
+    their 128-bit UUID strings.
 """
+
+# Index of all services by their 128-bit UUID strings in both cases
+# and by their values
+_SERVICE_STRINGS = {}
+_SERVICE_INTS = {}
+for __service in SERVICES.values():
+    _SERVICE_STRINGS[__service.uuid.lower()] = __service
+    _SERVICE_STRINGS[__service.uuid] = __service
+    _SERVICE_INTS[__service.int] = __service
+del __service
+
+
+def _service_uuid(uuid):
+    """The :py:data:`SERVICES` entry equal to `uuid`, if any, otherwise
+    `uuid` itself"""
+    return _SERVICE_INTS.get(uuid.int, uuid)
+
+
+def resolve_services(uuids, default=None, attributes=False):
+    """
+    Resolve many 128-bit UUID strings to :py:data:`SERVICES` entries
+    at once e.g., the `UUIDs` properties of every device known to
+    an adapter when summarizing an inventory.
+
+    The strings are resolved in a single pass of hash lookups
+    with no per-string parsing or case conversion.  Only strings
+    that do not match any service's UUID as-is are parsed, once
+    per distinct string.
+
+    :param iterable uuids: UUID strings of the form
+        `ZZZZYYYY-BBBB-BBBB-BBBB-VVVVVVVVVVVV`, in either case.
+    :param default: Optional.  Value for unknown, invalid or empty
+        UUID strings.
+    :param bool attributes: Optional.  If `True`, return tuples
+        of each service and its :py:data:`.ATTRIBUTES` names.
+    :return: service :py:class:`.BTUUID` per UUID string, or
+        tuples of service and attribute name dictionary.
+    :rtype: list
+    """
+    lookup = _SERVICE_STRINGS.get
+    misses = {}
+    services = []
+    for uuid in uuids:
+        service = lookup(uuid)
+        if (service is None):
+            if (uuid not in misses):
+                try:
+                    service = lookup(BTUUID(uuid=uuid).uuid)
+                except (ValueError, BTUUIDNotSpecifiedException):
+                    service = None
+                misses[uuid] = default if service is None else service
+            service = misses[uuid]
+        services.append(service)
+    if (attributes):
+        return [(s, ATTRIBUTES.get(getattr(s, 'uuid16', None)))
+                for s in services]
+    return services
@@ -0,0 +1,200 @@
+from __future__ import unicode_literals
+
+import collections
+import json
+import os
+import sys
+import thread
+import time
+
+import metrics
+from metrics import _MeasuredInterface
+
+
+BTTraceEvent = collections.namedtuple('BTTraceEvent',
+                                      'interface path method args_size '
+                                      'start duration failed asynchronous '
+                                      'caller')
+"""
+:data BTTraceEvent: A traced D-Bus method call: its interface,
+    object path and method, the approximate size of its arguments
+    in bytes, its start time and duration in seconds, whether it
+    failed or was made asynchronously and a summary of the stack
+    that made it, innermost frame first.
+"""
+
+
+def _args_size(value):
+    """
+    Approximate size in bytes of D-Bus arguments when marshalled
+    """
+    if (isinstance(value, (bytes, unicode))):
+        return len(value)
+    elif (isinstance(value, dict)):
+        return sum(_args_size(k) + _args_size(v) for (k, v) in value.items())
+    elif (isinstance(value, (list, tuple))):
+        return sum(_args_size(v) for v in value)
+    return 8
+
+
+# Modules whose frames are left out of caller summaries
+_WRAPPER_FILES = tuple(os.path.splitext(m.__file__)[0]
+                       for m in (sys.modules[__name__], metrics))
+
+
+class BTTracer(object):
+    """
+    Records the D-Bus method calls made by the package, including
+    the `GetProperties` and `SetProperty` calls behind property
+    access, into a ring buffer of :py:class:`BTTraceEvent`.  The
+    trace may be dumped in the Chrome trace event format, for
+    viewing in `chrome://tracing` or Perfetto, or summarised to
+    find slow or redundant round trips.
+
+    Tracing is disabled by default.  Only calls on interfaces
+    created while it is enabled are traced.
+
+    :param int capacity: Optional.  Number of most recent calls
+        kept.
+    :param int depth: Optional.  Number of stack frames kept in
+        each call's caller summary.
+    """
+    def __init__(self, capacity=10000, depth=4):
+        self.enabled = False
+        self.depth = depth
+        self.events = collections.deque(maxlen=capacity)
+
+    def enable(self):
+        """
+        Start tracing.  Interfaces created from now on have their
+        D-Bus calls traced.
+
+        :return:
+        """
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stop tracing.  Calls traced so far are kept.
+
+        :return:
+        """
+        self.enabled = False
+
+    def clear(self):
+        """
+        Discard all traced calls.
+
+        :return:
+        """
+        self.events.clear()
+
+    def _caller(self):
+        frames = []
+        frame = sys._getframe(2)
+        while (frame and len(frames) < self.depth):
+            code = frame.f_code
+            if (not code.co_filename.startswith(_WRAPPER_FILES)):
+                frames.append('%s:%d %s' % (os.path.basename(code.co_filename),
+                                            frame.f_lineno, code.co_name))
+            frame = frame.f_back
+        return tuple(frames)
+
+    def trace(self, interface, addr, path):
+        """
+        Wrap a D-Bus interface so that its method calls are
+        traced.
+
+        :param interface: Interface to wrap.  See `dbus.Interface`
+        :param str addr: Interface name e.g., 'org.bluez.Adapter'
+        :param str path: Object path of the interface.
+        :return: Wrapped interface.
+        """
+        def start(method, args, asynchronous):
+            caller = self._caller()
+            size = _args_size(args)
+            begin = time.time()
+
+            def finish(failed):
+                self.events.append(BTTraceEvent(addr, path, method, size,
+                                                begin, time.time() - begin,
+                                                failed, asynchronous, caller))
+            return finish
+        return _MeasuredInterface(interface, start)
+
+    def chrome_trace(self):
+        """
+        Return the traced calls in the Chrome trace event format.
+        Blocking calls are shown on the thread making them and
+        asynchronous calls on a separate track, since they may
+        overlap.
+
+        :return: Trace as a JSON serialisable dictionary.
+        :rtype: dict
+        """
+        pid = os.getpid()
+        tid = thread.get_ident()
+        trace = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                  'args': {'name': 'asynchronous D-Bus calls'}}]
+        for event in self.events:
+            trace.append({'name': event.method,
+                          'cat': event.interface,
+                          'ph': 'X',
+                          'ts': event.start * 1e6,
+                          'dur': event.duration * 1e6,
+                          'pid': pid,
+                          'tid': 0 if event.asynchronous else tid,
+                          'args': {'path': event.path,
+                                   'args_size': event.args_size,
+                                   'failed': event.failed,
+                                   'caller': list(event.caller)}})
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def dump(self, path):
+        """
+        Write the traced calls to a file in the Chrome trace event
+        format.  See :py:meth:`chrome_trace`
+
+        :param str path: File to write.
+        :return:
+        """
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def summary(self, top=10):
+        """
+        Summarise the traced calls by interface, method and caller.
+
+        :param int top: Optional.  Number of entries in each list.
+        :return: Dictionary of the `slowest` calls, as
+            :py:class:`BTTraceEvent`, and of the calls made most
+            often and taking the most time in total, as dictionaries
+            of the `interface`, `method`, `caller`, `count`,
+            `total` and `max` duration of all the calls made from
+            the same place.
+        :rtype: dict
+        """
+        groups = {}
+        for event in self.events:
+            key = (event.interface, event.method, event.caller)
+            group = groups.get(key)
+            if (group is None):
+                group = groups[key] = {'interface': event.interface,
+                                       'method': event.method,
+                                       'caller': event.caller,
+                                       'count': 0,
+                                       'total': 0.0,
+                                       'max': 0.0}
+            group['count'] += 1
+            group['total'] += event.duration
+            group['max'] = max(group['max'], event.duration)
+        groups = groups.values()
+        return {
+            'slowest': sorted(self.events, key=lambda e: -e.duration)[:top],
+            'frequent': sorted(groups, key=lambda g: -g['count'])[:top],
+            'total': sorted(groups, key=lambda g: -g['total'])[:top],
+        }
+
+
+TRACER = BTTracer()
+""":data TRACER: D-Bus call tracer used by the package"""
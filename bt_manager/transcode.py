@@ -0,0 +1,274 @@
+from __future__ import unicode_literals
+
+import argparse
+import multiprocessing
+import sys
+
+from codecs import SBCCodecConfig, SBCCodec, SBCChannelMode, \
+    SBCSamplingFrequency, SBCAllocationMethod, SBCSubbands, SBCBlocks, \
+    SBC_SYNCWORD, sbc_frame_config
+from pcmfile import PCMFileReader, PCMFileWriter
+from exceptions import BTUnsupportedMediaFormat
+
+
+_FREQUENCIES = {16000: SBCSamplingFrequency.FREQ_16KHZ,
+                32000: SBCSamplingFrequency.FREQ_32KHZ,
+                44100: SBCSamplingFrequency.FREQ_44_1KHZ,
+                48000: SBCSamplingFrequency.FREQ_48KHZ}
+_CHANNEL_MODES = {'mono': SBCChannelMode.CHANNEL_MODE_MONO,
+                  'dual': SBCChannelMode.CHANNEL_MODE_DUAL,
+                  'stereo': SBCChannelMode.CHANNEL_MODE_STEREO,
+                  'joint': SBCChannelMode.CHANNEL_MODE_JOINT_STEREO}
+_ALLOCATION_METHODS = {'loudness': SBCAllocationMethod.LOUDNESS,
+                       'snr': SBCAllocationMethod.SNR}
+_SUBBANDS = {4: SBCSubbands.SUBBANDS_4,
+             8: SBCSubbands.SUBBANDS_8}
+_BLOCKS = {4: SBCBlocks.BLOCKS_4,
+           8: SBCBlocks.BLOCKS_8,
+           12: SBCBlocks.BLOCKS_12,
+           16: SBCBlocks.BLOCKS_16}
+
+# Number of frames preceding each chunk which are processed and
+# then discarded so that the analysis/synthesis filter history of
+# a worker matches that of a single serial pass over the file.
+# The longest filter spans 10 blocks which is 3 frames of 4 blocks.
+_PRIMING_FRAMES = 3
+
+# Codec instances are cached per process since creating one loads
+# the codec library
+_codecs = {}
+
+
+def _codec(config):
+    codec = _codecs.get(config)
+    if (codec is None):
+        codec = _codecs[config] = SBCCodec(config)
+    else:
+        codec.reset()
+    return codec
+
+
+def _encode_chunk(args):
+    (config, data, priming) = args
+    codec = _codec(config)
+    return codec.encode_frames(data)[priming * codec.frame_length:]
+
+
+def _decode_chunk(args):
+    (config, data, priming) = args
+    codec = _codec(config)
+    return codec.decode_frames(data)[priming * codec.codesize:]
+
+
+def _chunks(reader, codesize, chunk_frames):
+    """
+    Split the reader's data into chunks of `chunk_frames` frames, each
+    prefixed with up to :py:data:`_PRIMING_FRAMES` preceding frames.
+    """
+    tail = b''
+    while (True):
+        data = reader.read(chunk_frames * codesize)
+        if (data is None):
+            break
+        data = data[:]
+        reader.advance(len(data))
+        yield (tail + data, len(tail) // codesize)
+        tail = data[-_PRIMING_FRAMES * codesize:]
+
+
+def _run(func, config, chunks, processes):
+    jobs = ((config, data, priming) for (data, priming) in chunks)
+    if (processes == 1):
+        for job in jobs:
+            yield func(job)
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap(func, jobs):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def default_config(channels, frequency, bitpool=53):
+    """
+    Return an SBC codec configuration suitable for PCM with the
+    given number of channels and sampling frequency, using
+    16 blocks, 8 subbands and loudness allocation.
+
+    :param int channels: 1 for mono, 2 for joint stereo.
+    :param int frequency: Sampling frequency in Hz.
+    :param int bitpool: Bitpool to encode with.
+    :return config: codec configuration
+    :rtype: namedtuple :py:class:`.SBCCodecConfig`
+    :raises BTUnsupportedMediaFormat: if the sampling frequency
+        or number of channels is not supported by SBC.
+    """
+    if (frequency not in _FREQUENCIES or channels not in (1, 2)):
+        raise BTUnsupportedMediaFormat
+    if (channels == 1):
+        channel_mode = SBCChannelMode.CHANNEL_MODE_MONO
+    else:
+        channel_mode = SBCChannelMode.CHANNEL_MODE_JOINT_STEREO
+    return SBCCodecConfig(channel_mode,
+                          _FREQUENCIES[frequency],
+                          SBCAllocationMethod.LOUDNESS,
+                          SBCSubbands.SUBBANDS_8,
+                          SBCBlocks.BLOCKS_16,
+                          bitpool,
+                          bitpool)
+
+
+def encode_file(input_file, output_file, config=None, processes=None,
+                chunk_frames=4096):
+    """
+    Encode a WAV or raw PCM file into a stream of raw SBC frames.
+
+    The input is split into chunks of `chunk_frames` frames which
+    are encoded in parallel across a process pool, each in a single
+    call into the codec.  The output is identical to that of a
+    serial encode.
+
+    :param str input_file: WAV or raw 16-bit PCM file to encode.
+    :param str output_file: Name of the SBC file to create.
+    :param namedtuple config: Optional codec configuration.  Defaults
+        to :py:func:`default_config` for the input file's format.
+    :param int processes: Optional number of worker processes.
+        Defaults to the number of CPUs.
+    :param int chunk_frames: Number of SBC frames per chunk.
+    :return: Number of bytes written.
+    :rtype: int
+    """
+    reader = PCMFileReader(input_file)
+    try:
+        if (config is None):
+            config = default_config(reader.channels, reader.frequency)
+        codec = SBCCodec(config)
+        chunks = _chunks(reader, codec.codesize, chunk_frames)
+        nbytes = 0
+        with open(output_file, 'wb') as fh:
+            for data in _run(_encode_chunk, config, chunks, processes):
+                fh.write(data)
+                nbytes += len(data)
+        return nbytes
+    finally:
+        reader.close()
+
+
+def decode_file(input_file, output_file, processes=None, chunk_frames=4096,
+                wav=True):
+    """
+    Decode a stream of raw SBC frames into a WAV or raw PCM file.
+
+    Streams whose frames all share the same length are split into
+    chunks of `chunk_frames` frames and decoded in parallel across
+    a process pool.  Other streams are decoded serially.
+
+    :param str input_file: SBC file to decode.
+    :param str output_file: Name of the WAV or raw PCM file to create.
+    :param int processes: Optional number of worker processes.
+        Defaults to the number of CPUs.
+    :param int chunk_frames: Number of SBC frames per chunk.
+    :param bool wav: Write a WAV header if `True`, otherwise raw PCM.
+    :return: Number of PCM bytes written.
+    :rtype: int
+    :raises BTUnsupportedMediaFormat: if the file does not contain
+        SBC frames.
+    """
+    reader = PCMFileReader(input_file)
+    try:
+        config = sbc_frame_config(reader.read(3) or b'')
+        if (config is None):
+            raise BTUnsupportedMediaFormat
+        frame_length = SBCCodec(config).frame_length
+        data = reader.read(reader.remaining)
+        if (bytearray(data[::frame_length]) !=
+                bytearray((SBC_SYNCWORD,)) * (len(data) // frame_length) or
+                len(data) % frame_length):
+            # Frames are not all of equal length so can't be split
+            # at fixed offsets
+            processes = 1
+            chunk_frames = len(data) // frame_length + 1
+        if (config.channel_mode == SBCChannelMode.CHANNEL_MODE_MONO):
+            channels = 1
+        else:
+            channels = 2
+        frequency = [k for (k, v) in _FREQUENCIES.items()
+                     if v == config.frequency][0]
+        writer = PCMFileWriter(output_file, channels=channels,
+                               frequency=frequency, wav=wav)
+        try:
+            chunks = _chunks(reader, frame_length, chunk_frames)
+            for data in _run(_decode_chunk, config, chunks, processes):
+                writer.write(data)
+            return writer.data_size
+        finally:
+            writer.close()
+    finally:
+        reader.close()
+
+
+def main(argv=None):
+    """
+    Console entry point for encoding PCM/WAV files into raw SBC
+    frame streams and decoding them back again.
+    """
+    parser = argparse.ArgumentParser(
+        description='Transcode between PCM/WAV and raw SBC frame streams')
+    parser.add_argument('input', help='input file')
+    parser.add_argument('output', help='output file')
+    parser.add_argument('-d', '--decode', action='store_true',
+                        help='decode SBC to PCM (default is to encode)')
+    parser.add_argument('--raw', action='store_true',
+                        help='write raw PCM instead of WAV when decoding')
+    parser.add_argument('--frequency', type=int, choices=sorted(_FREQUENCIES),
+                        help='sampling frequency in Hz')
+    parser.add_argument('--mode', choices=sorted(_CHANNEL_MODES),
+                        help='channel mode')
+    parser.add_argument('--allocation', choices=sorted(_ALLOCATION_METHODS),
+                        default='loudness', help='bit allocation method')
+    parser.add_argument('--subbands', type=int, choices=sorted(_SUBBANDS),
+                        default=8, help='number of subbands')
+    parser.add_argument('--blocks', type=int, choices=sorted(_BLOCKS),
+                        default=16, help='number of blocks')
+    parser.add_argument('--bitpool', type=int, default=53,
+                        help='bitpool')
+    parser.add_argument('-j', '--processes', type=int,
+                        help='number of worker processes')
+    parser.add_argument('--chunk-frames', type=int, default=4096,
+                        help='number of SBC frames per parallel chunk')
+    args = parser.parse_args(argv)
+
+    try:
+        if (args.decode):
+            decode_file(args.input, args.output, args.processes,
+                        args.chunk_frames, not args.raw)
+            return 0
+        reader = PCMFileReader(args.input)
+        defaults = default_config(reader.channels,
+                                  args.frequency or reader.frequency)
+        reader.close()
+        if (args.frequency):
+            defaults = defaults._replace(
+                frequency=_FREQUENCIES[args.frequency])
+        if (args.mode):
+            defaults = defaults._replace(
+                channel_mode=_CHANNEL_MODES[args.mode])
+        config = defaults._replace(
+            allocation_method=_ALLOCATION_METHODS[args.allocation],
+            subbands=_SUBBANDS[args.subbands],
+            block_length=_BLOCKS[args.blocks],
+            min_bitpool=args.bitpool,
+            max_bitpool=args.bitpool)
+        encode_file(args.input, args.output, config, args.processes,
+                    args.chunk_frames)
+    except BTUnsupportedMediaFormat:
+        sys.stderr.write('%s: unsupported media format\n' % args.input)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
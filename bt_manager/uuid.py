@@ -1,11 +1,22 @@
 from __future__ import unicode_literals
+import re
+from weakref import WeakValueDictionary
 from exceptions import BTUUIDNotSpecifiedException
 
 
 _BASE_UUID = '00000000-0000-1000-8000-00805F9B34FB'
+_BASE_INT = int(_BASE_UUID.replace('-', ''), 16)
 
+# Live BTUUID instances keyed by their class and 128-bit value
+_interned = WeakValueDictionary()
 
-class BTUUID:
+_UUID = re.compile(r'[0-9A-F]{8}-?[0-9A-F]{4}-?[0-9A-F]{4}-?[0-9A-F]{4}-?'
+                   r'[0-9A-F]{12}\Z', re.IGNORECASE)
+_UUID16 = re.compile(r'[0-9A-F]{4}\Z', re.IGNORECASE)
+_UUID32 = re.compile(r'[0-9A-F]{8}\Z', re.IGNORECASE)
+
+
+class BTUUID(object):
     """
     This class encapsulates a UUID (universally unique identifier)
     which is a 128-bit value.  It is represented as a hex string of
@@ -30,8 +41,17 @@ class BTUUID:
     description can be provided with the UUID.  It is encouraged
     that this is done as UUIDs are otherwise hard to read.
 
+    UUIDs are held as 128-bit integers and are interned, so that
+    creating a UUID of the same class and value as an existing one
+    returns the existing instance, provided no name or description
+    is given or they match those of the existing instance.
+    Otherwise a new instance is created, and interned in place of
+    an existing one only if that has no name or description.
+    Interned instances are shared, so their value, name and
+    description are read-only.
+
     :param str uuid: Optional full 128-bit UUID string of the
-        form `ZZZZYYYY-BBBB-BBBB-BBBB-VVVVVVVVVVVV`
+        form `ZZZZYYYY-BBBB-BBBB-BBBB-VVVVVVVVVVVV`, in either case.
     :param str uuid16: Optional 16-bit UUID string of the form
         `YYYY`.  Base UUID is used to populate unset bits.
     :param str uuid32: Optional 32-bit UUID string of the form
@@ -43,19 +63,85 @@ class BTUUID:
         of the UUID.
     :raises BTUUIDNotSpecifiedException: if neither a uuid,
         uuid16 nor uuid32 is provided.
+    :raises ValueError: if the UUID string is not of the given
+        form, with or without the dashes of a full UUID.
     """
-    def __init__(self, uuid=None, uuid16=None,
-                 uuid32=None, name=None, desc=None):
-        self.name = name
-        self.desc = desc
+    __slots__ = ('_int', '_name', '_desc', '_uuid', '__weakref__')
+
+    def __new__(cls, uuid=None, uuid16=None,
+                uuid32=None, name=None, desc=None):
         if (uuid):
-            self.uuid = uuid.upper()
+            if (not _UUID.match(uuid)):
+                raise ValueError('Malformed 128-bit UUID %r' % uuid)
+            value = int(uuid.replace('-', ''), 16)
         elif (uuid16):
-            self.uuid = _BASE_UUID[0:4] + uuid16[0:4].upper() + _BASE_UUID[8:]
+            if (not _UUID16.match(uuid16)):
+                raise ValueError('Malformed 16-bit UUID %r' % uuid16)
+            value = (int(uuid16, 16) << 96) | _BASE_INT
         elif (uuid32):
-            self.uuid = uuid32[0:8].upper() + _BASE_UUID[8:]
+            if (not _UUID32.match(uuid32)):
+                raise ValueError('Malformed 32-bit UUID %r' % uuid32)
+            value = (int(uuid32, 16) << 96) | _BASE_INT
         else:
             raise BTUUIDNotSpecifiedException
+        return cls.from_int(value, name, desc)
+
+    @classmethod
+    def from_int(cls, value, name=None, desc=None):
+        """
+        Return the UUID with the given 128-bit value.
+
+        :param int value: 128-bit UUID value.
+        :param str name: Optional name for the UUID.
+        :param str desc: Optional description of the UUID.
+        :return: UUID instance, interned where possible
+        :rtype: :py:class:`BTUUID`
+        :raises ValueError: if the value does not fit in 128 bits.
+        """
+        if (not 0 <= value < 1 << 128):
+            raise ValueError('UUID value out of range')
+        key = (cls, value)
+        interned = _interned.get(key)
+        if (interned is not None and
+                ((name is None and desc is None) or
+                 (interned.name == name and interned.desc == desc))):
+            return interned
+        obj = object.__new__(cls)
+        obj._int = value
+        obj._name = name
+        obj._desc = desc
+        obj._uuid = None
+        if (interned is None or
+                (interned.name is None and interned.desc is None)):
+            _interned[key] = obj
+        return obj
+
+    @property
+    def int(self):
+        """The UUID as a 128-bit integer"""
+        return self._int
+
+    @property
+    def name(self):
+        """Human readable name of the UUID, or `None`"""
+        return self._name
+
+    @property
+    def desc(self):
+        """Description of the UUID, or `None`"""
+        return self._desc
+
+    @property
+    def uuid(self):
+        """
+        Returns the full 128-bit UUID string of the form
+        `ZZZZYYYY-BBBB-BBBB-BBBB-VVVVVVVVVVVV` in upper case
+        """
+        if (self._uuid is None):
+            h = '%032X' % self.int
+            self._uuid = '-'.join((h[0:8], h[8:12], h[12:16], h[16:20],
+                                   h[20:32]))
+        return self._uuid
 
     @property
     def uuid16(self):
@@ -64,7 +150,7 @@ class BTUUID:
         a UUID of the form `ZZZZYYYY-BBBB-BBBB-BBBB-VVVVVVVVVVVV`
         it shall return `YYYY`
         """
-        return self.uuid[4:8]
+        return '%04X' % ((self.int >> 96) & 0xFFFF)
 
     @property
     def uuid32(self):
@@ -73,7 +159,24 @@ class BTUUID:
         a UUID of the form `ZZZZYYYY-BBBB-BBBB-BBBB-VVVVVVVVVVVV`
         it shall return `ZZZZYYYY`
         """
-        return self.uuid[0:8]
+        return '%08X' % (self.int >> 96)
+
+    def __hash__(self):
+        return hash(self.int)
+
+    def __eq__(self, other):
+        if (isinstance(other, BTUUID)):
+            return self.int == other.int
+        return NotImplemented
+
+    def __ne__(self, other):
+        if (isinstance(other, BTUUID)):
+            return self.int != other.int
+        return NotImplemented
+
+    def __reduce__(self):
+        return (_from_int, (self.int, self.name, self.desc,
+                            self.__class__))
 
     def __repr__(self):
         return '<uuid:' + self.uuid + ' name:' + \
@@ -85,8 +188,10 @@ class BTUUID16(BTUUID):
     Shortened-form UUID allowing only 16-bit UUID to be
     created.  Refer to :py:class:`BTUUID` for details.
     """
-    def __init__(self, uuid, name, desc=None):
-        BTUUID.__init__(self, uuid16=uuid, name=name, desc=desc)
+    __slots__ = ()
+
+    def __new__(cls, uuid, name, desc=None):
+        return BTUUID.__new__(cls, uuid16=uuid, name=name, desc=desc)
 
 
 class BTUUID32(BTUUID):
@@ -94,8 +199,14 @@ class BTUUID32(BTUUID):
     Shortened-form UUID allowing only 32-bit UUID to be
     created.  Refer to :py:class:`BTUUID` for details.
     """
-    def __init__(self, uuid, name, desc=None):
-        BTUUID.__init__(self, uuid32=uuid, name=name, desc=desc)
+    __slots__ = ()
+
+    def __new__(cls, uuid, name, desc=None):
+        return BTUUID.__new__(cls, uuid32=uuid, name=name, desc=desc)
+
+
+def _from_int(value, name, desc, cls=BTUUID):
+    return cls.from_int(value, name, desc)
 
 
 BASE_UUID = BTUUID(uuid=_BASE_UUID, name='BASE_UUID',
@@ -0,0 +1,223 @@
+#include <math.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+/* Input frames converted per pass, bounding the working buffer */
+#define RESAMPLE_CHUNK 1024
+
+/* Stopband attenuation of the anti-aliasing filter in dB */
+#define RESAMPLE_ATTENUATION 90.0
+
+/*
+ * Rational polyphase resampler for interleaved 16-bit PCM.
+ *
+ * The input is notionally upsampled by `up`, low-pass filtered and
+ * downsampled by `down`, where up / down is the ratio of the output
+ * and input rates in lowest terms.  Only the `taps` coefficients of
+ * the one filter phase contributing to each output sample are
+ * applied, to the last `taps` input frames.
+ */
+struct pcm_resampler {
+    unsigned int channels;
+    unsigned int up;
+    unsigned int down;
+    unsigned int taps;
+    /* Phases of `taps` coefficients, each in input order */
+    float *filter;
+    /* Planar input of each channel: `taps - 1` frames of history
+     * followed by up to RESAMPLE_CHUNK new frames */
+    float *input;
+    size_t frames;
+    /* Position of the next output sample, in units of 1 / up
+     * input frames from the start of `input` */
+    uint64_t position;
+};
+
+
+static unsigned int gcd(unsigned int a, unsigned int b)
+{
+    while (b) {
+        unsigned int t = a % b;
+        a = b;
+        b = t;
+    }
+    return a;
+}
+
+
+/* Zeroth order modified Bessel function of the first kind */
+static double bessel_i0(double x)
+{
+    double sum = 1.0;
+    double term = 1.0;
+    unsigned int k;
+
+    for (k = 1; k < 50; k++) {
+        term *= (x / (2 * k)) * (x / (2 * k));
+        sum += term;
+        if (term < sum * 1e-12)
+            break;
+    }
+    return sum;
+}
+
+
+/* Kaiser windowed sinc low-pass filter, with its transition band
+ * ending at the lower of the two Nyquist frequencies */
+static void design_filter(struct pcm_resampler *r, unsigned int in_rate,
+                          unsigned int out_rate)
+{
+    const double attenuation = RESAMPLE_ATTENUATION;
+    const double beta = 0.1102 * (attenuation - 8.7);
+    const size_t length = (size_t)r->taps * r->up;
+    const double centre = (length - 1) / 2.0;
+    const double nyquist = (in_rate < out_rate ? in_rate : out_rate) / 2.0;
+    /* Transition width in Hz of a Kaiser window of this length */
+    double width = (attenuation - 7.95) / (14.36 * r->taps) * in_rate;
+    double cutoff;
+    size_t j;
+
+    if (width > nyquist / 2)
+        width = nyquist / 2;
+    /* Cutoff relative to the upsampled rate, as cycles per sample */
+    cutoff = (nyquist - width / 2) / ((double)in_rate * r->up);
+
+    for (j = 0; j < length; j++) {
+        const double t = j - centre;
+        const double ratio = t / (centre + 0.5);
+        const double sinc = t == 0 ? 2 * cutoff :
+            sin(2 * M_PI * cutoff * t) / (M_PI * t);
+        const double window = bessel_i0(beta * sqrt(1 - ratio * ratio)) /
+            bessel_i0(beta);
+        /* Coefficient j of phase p multiplies input frame
+         * `taps - 1 - (j - p) / up` of the window */
+        const size_t phase = j % r->up;
+        const size_t tap = r->taps - 1 - j / r->up;
+
+        r->filter[phase * r->taps + tap] = (float)(sinc * window * r->up);
+    }
+}
+
+
+void pcm_resampler_reset(struct pcm_resampler *r)
+{
+    r->frames = r->taps - 1;
+    memset(r->input, 0, sizeof(float) * r->channels *
+           (r->taps - 1 + RESAMPLE_CHUNK));
+    r->position = (uint64_t)(r->taps - 1) * r->up;
+}
+
+
+void pcm_resampler_free(struct pcm_resampler *r)
+{
+    if (!r)
+        return;
+    free(r->filter);
+    free(r->input);
+    free(r);
+}
+
+
+struct pcm_resampler *pcm_resampler_new(unsigned int in_rate,
+                                        unsigned int out_rate,
+                                        unsigned int channels,
+                                        unsigned int taps)
+{
+    struct pcm_resampler *r;
+    unsigned int divisor;
+
+    if (!in_rate || !out_rate || !channels || taps < 2)
+        return NULL;
+
+    r = calloc(1, sizeof(*r));
+    if (!r)
+        return NULL;
+
+    divisor = gcd(in_rate, out_rate);
+    r->channels = channels;
+    r->up = out_rate / divisor;
+    r->down = in_rate / divisor;
+    r->taps = taps;
+    r->filter = malloc(sizeof(float) * r->up * taps);
+    r->input = malloc(sizeof(float) * channels *
+                      (taps - 1 + RESAMPLE_CHUNK));
+    if (!r->filter || !r->input) {
+        pcm_resampler_free(r);
+        return NULL;
+    }
+
+    design_filter(r, in_rate, out_rate);
+    pcm_resampler_reset(r);
+    return r;
+}
+
+
+static int16_t clip(float sample)
+{
+    if (sample >= 32767.0f)
+        return 32767;
+    if (sample <= -32768.0f)
+        return -32768;
+    return (int16_t)lrintf(sample);
+}
+
+
+size_t pcm_resample(struct pcm_resampler *r, char *ip, size_t ip_size,
+                    char *op, size_t op_size)
+{
+    const unsigned int channels = r->channels;
+    const size_t stride = r->taps - 1 + RESAMPLE_CHUNK;
+    const int16_t *in = (const int16_t *)ip;
+    int16_t *out = (int16_t *)op;
+    size_t in_frames = ip_size / (sizeof(int16_t) * channels);
+    size_t out_frames = op_size / (sizeof(int16_t) * channels);
+    size_t written = 0;
+
+    while (in_frames) {
+        size_t n = stride - r->frames;
+        size_t i;
+        unsigned int c;
+
+        if (n > in_frames)
+            n = in_frames;
+        for (i = 0; i < n; i++)
+            for (c = 0; c < channels; c++)
+                r->input[c * stride + r->frames + i] = in[i * channels + c];
+        in += n * channels;
+        in_frames -= n;
+        r->frames += n;
+
+        /* Output every sample whose window of input is complete */
+        while (r->position / r->up < r->frames && written < out_frames) {
+            const size_t start = r->position / r->up - (r->taps - 1);
+            const float *coef = &r->filter[(r->position % r->up) * r->taps];
+
+            for (c = 0; c < channels; c++) {
+                const float *x = &r->input[c * stride + start];
+                float sum = 0.0f;
+                unsigned int k;
+
+                for (k = 0; k < r->taps; k++)
+                    sum += coef[k] * x[k];
+                out[written * channels + c] = clip(sum);
+            }
+            written++;
+            r->position += r->down;
+        }
+
+        /* Keep the last `taps - 1` frames as history */
+        if (r->frames == stride) {
+            const size_t keep = r->taps - 1;
+            const size_t drop = r->frames - keep;
+
+            for (c = 0; c < channels; c++)
+                memmove(&r->input[c * stride], &r->input[c * stride + drop],
+                        sizeof(float) * keep);
+            r->frames = keep;
+            r->position -= (uint64_t)drop * r->up;
+        }
+    }
+
+    return written * sizeof(int16_t) * channels;
+}
@@ -1,37 +1,145 @@
+#include <errno.h>
 #include <string.h>
 #include <stdio.h>
+#include <time.h>
 #include <unistd.h>
+#include <sys/uio.h>
 #include <arpa/inet.h>
 #include "sbc.h"
 #include "rtp.h"
+#include "rtpsbc_stats.h"
+
+
+static uint64_t now_ns(void)
+{
+    struct timespec now;
+
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return (uint64_t)now.tv_sec * 1000000000 + now.tv_nsec;
+}
+
+
+/* Account for a packet written, or not, to the transport */
+static void count_write(struct rtp_sbc_stats *stats, ssize_t written,
+                        size_t nbytes, size_t nframes, size_t payload)
+{
+    uint64_t now;
+
+    if (!stats)
+        return;
+    if (written < 0) {
+        if (errno == EAGAIN || errno == EWOULDBLOCK)
+            stats->eagain++;
+        else
+            stats->write_errors++;
+        return;
+    }
+    if ((size_t)written < nbytes)
+        stats->short_writes++;
+
+    now = now_ns();
+    if (!stats->packets_sent)
+        stats->first_ns = now;
+    stats->last_ns = now;
+    stats->packets_sent++;
+    stats->frames_sent += nframes;
+    stats->bytes_sent += payload;
+}
+
+
+/* Sampling frequency in Hz, the unit of A2DP RTP timestamps */
+static unsigned int sample_rate(const sbc_t *sbc)
+{
+    static const unsigned int rates[] = { 16000, 32000, 44100, 48000 };
+
+    return rates[sbc->frequency & 0x03];
+}
+
+
+/* Samples per channel in each SBC frame, by which the RTP
+ * timestamp advances */
+static unsigned int frame_samples(const sbc_t *sbc)
+{
+    return (4 + 4 * (sbc->blocks & 0x03)) *
+        (sbc->subbands == SBC_SB_8 ? 8 : 4);
+}
+
+
+/* Account for a packet read from the transport, tracking its
+ * sequence number and the interarrival jitter of RFC 3550, in
+ * timestamp units */
+static void count_read(struct rtp_sbc_stats *stats,
+                       const struct rtp_header *rtp_header,
+                       unsigned int rate, size_t nframes, size_t payload)
+{
+    const uint64_t now = now_ns();
+    const uint16_t seq = ntohs(rtp_header->sequence_number);
+    /* Arrival time in the units of the timestamps, samples */
+    const uint32_t transit = (uint32_t)(now / 1000 * rate / 1000000) -
+        ntohl(rtp_header->timestamp);
+
+    if (!stats->packets_received)
+        stats->first_ns = now;
+    stats->last_ns = now;
+    stats->packets_received++;
+    stats->frames_received += nframes;
+    stats->bytes_received += payload;
+
+    if (stats->synced) {
+        const uint16_t gap = seq - (uint16_t)(stats->last_seq + 1);
+        int32_t d = (int32_t)(transit - stats->transit);
+
+        /* Packets arriving late, after their successors, were
+         * already counted as missing */
+        if (gap >= 0x8000)
+            return;
+        stats->sequence_gaps += gap;
+        if (d < 0)
+            d = -d;
+        stats->jitter += (d - stats->jitter) / 16;
+    }
+    stats->synced = 1;
+    stats->last_seq = seq;
+    stats->transit = transit;
+}
 
 
 size_t rtp_sbc_encode_to_fd(sbc_t *sbc, char *ip, size_t ip_size, size_t mtu,
-                            unsigned int *ts, unsigned int *seq_num, int fd)
+                            unsigned int *ts, unsigned int *seq_num, int fd,
+                            struct rtp_sbc_stats *stats)
 {
-    char buf[512];
-    struct rtp_header *rtp_header = (struct rtp_header *)buf;
-	struct rtp_payload *rtp_payload = (struct rtp_payload *)(buf + sizeof(*rtp_header));
+    const size_t rtp_size = sizeof(struct rtp_header) + sizeof(struct rtp_payload);
     const size_t codesize = sbc_get_codesize(sbc);
-    const size_t rtp_size = sizeof(*rtp_header) + sizeof(*rtp_payload);
     size_t index = 0;
 
+    if (mtu <= rtp_size)
+        return 0;
+
+    /* Sized for the MTU, which may well be larger than any fixed
+     * buffer e.g., 895 bytes */
+    char buf[mtu];
+    struct rtp_header *rtp_header = (struct rtp_header *)buf;
+	struct rtp_payload *rtp_payload = (struct rtp_payload *)(buf + sizeof(*rtp_header));
+
     while (ip_size >= codesize) {
 
         char *op = &buf[rtp_size];
         size_t buf_size = mtu - rtp_size;
         size_t nbytes = rtp_size;
         size_t nframes = 0;
+        uint64_t start = stats ? now_ns() : 0;
+        ssize_t written;
 
         memset(buf, 0, rtp_size);
 
         rtp_header->v = 2;
 		rtp_header->pt = 1;
-		rtp_header->sequence_number = *seq_num;
+		rtp_header->sequence_number = htons(*seq_num);
 		rtp_header->timestamp = htonl(*ts);
 		rtp_header->ssrc = htonl(1);
 
-		while (ip_size >= codesize) {
+		/* The RTP payload header can only count up to 15 frames */
+		while (ip_size >= codesize && nframes < 15) {
 			ssize_t encoded;
 			ssize_t sz = sbc_encode(sbc,
 									(void *)&ip[index],
@@ -50,11 +158,15 @@ size_t rtp_sbc_encode_to_fd(sbc_t *sbc, char *ip, size_t ip_size, size_t mtu,
 			nframes++;
 		}
 
+		if (stats)
+			stats->encode_ns += now_ns() - start;
+
 		rtp_payload->frame_count = nframes;
-		*ts += sbc_get_frame_duration(sbc) * nframes;
+		*ts += frame_samples(sbc) * nframes;
 		(*seq_num)++;
 
-		write(fd, buf, nbytes);
+		written = write(fd, buf, nbytes);
+		count_write(stats, written, nbytes, nframes, nbytes - rtp_size);
     }
 
     return index;
@@ -62,28 +174,41 @@ size_t rtp_sbc_encode_to_fd(sbc_t *sbc, char *ip, size_t ip_size, size_t mtu,
 
 
 size_t rtp_sbc_decode_from_fd(sbc_t *sbc, char *op, size_t op_size, size_t mtu,
-                              int fd)
+                              int fd, struct rtp_sbc_stats *stats)
 {
-    char buf[1024];
-    struct rtp_header *rtp_header = (struct rtp_header *)buf;
-	struct rtp_payload *rtp_payload = (struct rtp_payload *)(buf + sizeof(*rtp_header));
+    const size_t rtp_size = sizeof(struct rtp_header) + sizeof(struct rtp_payload);
     const size_t codesize = sbc_get_codesize(sbc);
     const size_t frame_len = sbc_get_frame_length(sbc);
-    const size_t rtp_size = sizeof(*rtp_header) + sizeof(*rtp_payload);
-    const size_t mtu_round = ((mtu - rtp_size) / frame_len) * frame_len + rtp_size;
+    size_t max_frames;
     size_t index = 0;
 
-    while (op_size >= codesize) {
+    if (mtu <= rtp_size || frame_len == 0)
+        return 0;
+    max_frames = (mtu - rtp_size) / frame_len;
+    if (max_frames == 0)
+        return 0;
+
+    const size_t mtu_round = max_frames * frame_len + rtp_size;
+    char buf[mtu_round];
+    struct rtp_header *rtp_header = (struct rtp_header *)buf;
+	struct rtp_payload *rtp_payload = (struct rtp_payload *)(buf + sizeof(*rtp_header));
+
+    /* Only read a packet if all of its frames can be decoded, since
+     * any that do not fit would be lost */
+    while (op_size >= max_frames * codesize) {
 
         char *ip = &buf[rtp_size];
-        size_t nframes;
+        size_t nframes = 0;
+        size_t payload;
+        uint64_t start;
         ssize_t buf_size = read(fd, buf, mtu_round);
 
 		if (buf_size <= 0)
         	break;
 
-        nframes = rtp_payload->frame_count;
 		buf_size -= rtp_size;
+		payload = buf_size > 0 ? buf_size : 0;
+		start = stats ? now_ns() : 0;
 
 		while (buf_size > 0) {
 			ssize_t decoded;
@@ -100,8 +225,126 @@ size_t rtp_sbc_decode_from_fd(sbc_t *sbc, char *op, size_t op_size, size_t mtu,
 			buf_size -= sz;
 			index += decoded;
 			op_size -= decoded;
+			nframes++;
+		}
+
+		if (stats) {
+			stats->decode_ns += now_ns() - start;
+			count_read(stats, rtp_header, sample_rate(sbc), nframes,
+			           payload);
 		}
     }
 
     return index;
 }
+
+
+size_t sbc_encode_frames(sbc_t *sbc, char *ip, size_t ip_size,
+                         char *op, size_t op_size, size_t *written)
+{
+    const size_t codesize = sbc_get_codesize(sbc);
+    size_t index = 0;
+    size_t nbytes = 0;
+
+    while (ip_size - index >= codesize) {
+        ssize_t encoded;
+        ssize_t sz = sbc_encode(sbc,
+                                (void *)&ip[index],
+                                codesize,
+                                (void *)&op[nbytes],
+                                op_size - nbytes,
+                                &encoded);
+        if (sz <= 0 || encoded <= 0)
+            break;
+
+        index += sz;
+        nbytes += encoded;
+    }
+
+    *written = nbytes;
+    return index;
+}
+
+
+size_t sbc_decode_frames(sbc_t *sbc, char *ip, size_t ip_size,
+                         char *op, size_t op_size, size_t *written)
+{
+    size_t index = 0;
+    size_t nbytes = 0;
+
+    while (index < ip_size && op_size - nbytes >= sbc_get_codesize(sbc)) {
+        size_t decoded;
+        ssize_t sz = sbc_decode(sbc,
+                                (void *)&ip[index],
+                                ip_size - index,
+                                (void *)&op[nbytes],
+                                op_size - nbytes,
+                                &decoded);
+        if (sz <= 0 || decoded == 0)
+            break;
+
+        index += sz;
+        nbytes += decoded;
+    }
+
+    *written = nbytes;
+    return index;
+}
+
+
+size_t rtp_sbc_send_frames_to_fd(sbc_t *sbc, char *ip, size_t ip_size,
+                                 size_t frame_len, size_t mtu,
+                                 unsigned int *ts, unsigned int *seq_num,
+                                 int fd, struct rtp_sbc_stats *stats)
+{
+    char buf[sizeof(struct rtp_header) + sizeof(struct rtp_payload)];
+    struct rtp_header *rtp_header = (struct rtp_header *)buf;
+    struct rtp_payload *rtp_payload = (struct rtp_payload *)(buf + sizeof(*rtp_header));
+    const size_t rtp_size = sizeof(buf);
+    size_t max_frames = (mtu - rtp_size) / frame_len;
+    size_t index = 0;
+
+    /* The RTP payload header can only count up to 15 frames */
+    if (max_frames > 15)
+        max_frames = 15;
+
+    while (max_frames > 0 && ip_size - index >= frame_len) {
+        struct iovec iov[2];
+        size_t nframes = (ip_size - index) / frame_len;
+        ssize_t written;
+
+        if (nframes > max_frames)
+            nframes = max_frames;
+
+        memset(buf, 0, rtp_size);
+
+        rtp_header->v = 2;
+        rtp_header->pt = 1;
+        rtp_header->sequence_number = htons(*seq_num);
+        rtp_header->timestamp = htonl(*ts);
+        rtp_header->ssrc = htonl(1);
+        rtp_payload->frame_count = nframes;
+
+        /* Frames are already encoded so are sent straight from
+         * the caller's buffer */
+        iov[0].iov_base = buf;
+        iov[0].iov_len = rtp_size;
+        iov[1].iov_base = &ip[index];
+        iov[1].iov_len = nframes * frame_len;
+
+        written = writev(fd, iov, 2);
+        count_write(stats, written, rtp_size + iov[1].iov_len, nframes,
+                    iov[1].iov_len);
+        /* Stop while the transport would block, so that the frames
+         * are sent once it drains.  Packets failing otherwise are
+         * dropped, as by rtp_sbc_encode_to_fd */
+        if (written < 0 && (errno == EAGAIN || errno == EWOULDBLOCK))
+            break;
+
+        *ts += frame_samples(sbc) * nframes;
+        (*seq_num)++;
+        index += nframes * frame_len;
+    }
+
+    return index;
+}
@@ -71,7 +71,29 @@ size_t sbc_get_codesize(sbc_t *sbc);
 const char *sbc_get_implementation_info(sbc_t *sbc);
 void sbc_finish(sbc_t *sbc);
 
+/* struct rtp_sbc_stats is declared by rtpsbc_stats.h, included first */
 size_t rtp_sbc_encode_to_fd(sbc_t *sbc, char *ip, size_t ip_size, size_t mtu,
-                            unsigned int *ts, unsigned int *seq_num, int fd);
+                            unsigned int *ts, unsigned int *seq_num, int fd,
+                            struct rtp_sbc_stats *stats);
 size_t rtp_sbc_decode_from_fd(sbc_t *sbc, char *op, size_t op_size, size_t mtu,
-                              int fd);
+                              int fd, struct rtp_sbc_stats *stats);
+size_t rtp_sbc_send_frames_to_fd(sbc_t *sbc, char *ip, size_t ip_size,
+                                 size_t frame_len, size_t mtu,
+                                 unsigned int *ts, unsigned int *seq_num,
+                                 int fd, struct rtp_sbc_stats *stats);
+
+size_t sbc_encode_frames(sbc_t *sbc, char *ip, size_t ip_size,
+                         char *op, size_t op_size, size_t *written);
+size_t sbc_decode_frames(sbc_t *sbc, char *ip, size_t ip_size,
+                         char *op, size_t op_size, size_t *written);
+
+struct pcm_resampler;
+
+struct pcm_resampler *pcm_resampler_new(unsigned int in_rate,
+                                        unsigned int out_rate,
+                                        unsigned int channels,
+                                        unsigned int taps);
+void pcm_resampler_reset(struct pcm_resampler *r);
+void pcm_resampler_free(struct pcm_resampler *r);
+size_t pcm_resample(struct pcm_resampler *r, char *ip, size_t ip_size,
+                    char *op, size_t op_size);
@@ -0,0 +1,25 @@
+/*
+ * Statistics of a media transport, shared by the library and the
+ * declarations of rtpsbc.h.  Also parsed by cffi, so it may only
+ * hold declarations.
+ */
+struct rtp_sbc_stats {
+	uint64_t packets_sent;
+	uint64_t frames_sent;
+	uint64_t bytes_sent;
+	uint64_t packets_received;
+	uint64_t frames_received;
+	uint64_t bytes_received;
+	uint64_t eagain;
+	uint64_t short_writes;
+	uint64_t write_errors;
+	uint64_t sequence_gaps;
+	uint64_t encode_ns;
+	uint64_t decode_ns;
+	uint64_t first_ns;
+	uint64_t last_ns;
+	double jitter;
+	uint32_t transit;
+	uint16_t last_seq;
+	uint8_t synced;
+};
@@ -545,23 +545,16 @@ def media_sbc_sink_start(args):
         print 'Unable to complete:', sys.exc_info()
 
 
-def media_decode_handler(args):
-    ep = args[0]
-    fd = args[1]
-    data = ep.read_transport()
-    fd.write(data)
-
-
-def media_encode_handler(args):
-    ep = args[0]
-    fd = args[1]
-    data = fd.read(2560)
-    ep.write_transport(data)
+def media_encode_complete(args):
+    print '\n========================================================='
+    print 'Media encode complete:', args
+    if (args in readers):
+        readers.pop(args).close()
 
 
 def media_decode(args):
 
-    global services
+    global services, recordings
 
     if (len(args) >= 2):
         path = args.pop(0)
@@ -570,14 +563,15 @@ def media_decode(args):
         print 'Error: Must provide endpoint path e.g., /test/endpoint/sbc0 and audio storage filename'  # noqa
         return
 
-    fd = open(filename, 'wb+')
     ep = services[path]
-    ep.register_transport_ready_event(media_decode_handler, (ep, fd))
+    writer = bt_manager.PCMFileWriter(filename)
+    recordings[path] = writer
+    writer.record_from(ep)
 
 
 def media_encode(args):
 
-    global services
+    global services, readers
 
     if (len(args) >= 2):
         path = args.pop(0)
@@ -586,9 +580,16 @@ def media_encode(args):
         print 'Error: Must provide endpoint path e.g., /test/endpoint/sbc0 and audio storage filename'  # noqa
         return
 
-    fd = open(filename, 'rb')
     ep = services[path]
-    ep.register_transport_ready_event(media_encode_handler, (ep, fd))
+    try:
+        reader = bt_manager.PCMFileReader(filename)
+    except bt_manager.BTUnsupportedMediaFormat:
+        print 'Error: Must provide a 16-bit mono or stereo PCM file'
+        return
+    if (path in readers):
+        readers.pop(path).close()
+    readers[path] = reader
+    reader.stream_to(ep, media_encode_complete, path)
 
 
 def media_sbc_source_start(args):
@@ -618,7 +619,7 @@ def media_sbc_source_start(args):
 
 def media_stop(args):
 
-    global services
+    global services, recordings, readers
 
     if (len(args)):
         path = args.pop(0)
@@ -630,6 +631,10 @@ def media_stop(args):
         ep = services[path]
         ep.unregister_transport_ready_event()
         ep.close_transport()
+        if (path in recordings):
+            recordings.pop(path).close()
+        if (path in readers):
+            readers.pop(path).close()
         ep.remove_from_connection()
         media = bt_manager.BTMedia()
         media.unregister_endpoint(path)
@@ -792,6 +797,8 @@ except dbus.exceptions.DBusException:
     print 'Unable to complete:', sys.exc_info()
 
 services = {}
+recordings = {}
+readers = {}
 
 # Main command processing loop
 while True:
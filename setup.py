@@ -27,6 +27,11 @@ setup(
         'setuptools',
         'cffi >= 0.7',
     ],
+    entry_points={
+        'console_scripts': [
+            'bt-sbc-transcode = bt_manager.transcode:main',
+        ],
+    },
     setup_requires=['cffi >= 0.7'],
     test_suite='nose.collector',
     tests_require=[
@@ -0,0 +1,63 @@
+"""Fixtures shared by the test modules"""
+from __future__ import unicode_literals
+
+import math
+
+import bt_manager
+
+
+def sbc_config(bitpool=35):
+    return bt_manager.SBCCodecConfig(bt_manager.SBCChannelMode.CHANNEL_MODE_JOINT_STEREO,  # noqa
+                                     bt_manager.SBCSamplingFrequency.FREQ_44_1KHZ,  # noqa
+                                     bt_manager.SBCAllocationMethod.LOUDNESS,
+                                     bt_manager.SBCSubbands.SUBBANDS_8,
+                                     bt_manager.SBCBlocks.BLOCKS_16,
+                                     2,
+                                     bitpool)
+
+
+def sine_pcm(samples=4096):
+    """Stereo 16-bit PCM of a sine wave"""
+    pcm = bytearray()
+    for i in range(samples):
+        sample = int(8000 * math.sin(i * 0.05)) & 0xFFFF
+        pcm.extend((sample & 0xFF, sample >> 8) * 2)
+    return bytes(pcm)
+
+
+RECORD = """<?xml version="1.0" encoding="UTF-8" ?>
+<record>
+    <attribute id="0x0000">
+        <uint32 value="0x00010004" />
+    </attribute>
+    <attribute id="0x0001">
+        <sequence>
+            <uuid value="0x110b" />
+        </sequence>
+    </attribute>
+    <attribute id="0x0004">
+        <sequence>
+            <sequence>
+                <uuid value="0x0100" />
+                <uint16 value="0x0019" />
+            </sequence>
+            <sequence>
+                <uuid value="0x0019" />
+                <uint16 value="0x0100" />
+            </sequence>
+        </sequence>
+    </attribute>
+    <attribute id="0x0100">
+        <text value="Audio SNK" />
+    </attribute>
+    <attribute id="0x0102">
+        <text encoding="hex" value="49535343" />
+    </attribute>
+    <attribute id="0x0200">
+        <boolean value="true" />
+    </attribute>
+    <attribute id="0x0201">
+        <int8 value="-3" />
+    </attribute>
+</record>
+"""
@@ -582,8 +582,14 @@ class MockDBusInterface:
     def DefaultAdapter(self, *args):
         return '/org/bluez/985/hci0'
 
-    def SetProperty(self, name, value):
+    def SetProperty(self, name, value, reply_handler=None,
+                    error_handler=None):
+        if (error_handler and name not in self._props):
+            error_handler('org.bluez.Error.DoesNotExist')
+            return
         self._props[name] = value
+        if (reply_handler):
+            reply_handler()
 
     def GetProperties(self):
         return self._props
@@ -679,6 +685,16 @@ class BTDbusTypeTranslation(unittest.TestCase):
         val = 'False'
         self.assertEqual(bt_manager.interface.translate_to_dbus_type(dbus.Boolean, val),  # noqa
                          dbus.Boolean(False))
+        val = '[1, 2]'
+        self.assertEqual(bt_manager.interface.translate_to_dbus_type(dbus.Array, val),  # noqa
+                         dbus.Array([1, 2]))
+        val = '/org/bluez/985/hci0'
+        self.assertEqual(bt_manager.interface.translate_to_dbus_type(dbus.ObjectPath, val),  # noqa
+                         dbus.ObjectPath(val))
+        val = '__import__("os").getcwd()'
+        self.assertRaises(ValueError,
+                          bt_manager.interface.translate_to_dbus_type,
+                          dbus.UInt32, val)
 
 
 class BTManagerTest(unittest.TestCase):
@@ -748,6 +764,122 @@ class BTAdapterTest(unittest.TestCase):
         adapter.Name = new_name
         self.assertEqual(adapter.Name, new_name)
 
+    def _call_async(self, adapter):
+        """
+        Route calls made directly on the bus to the adapter's mock
+        interface once they are blocked on
+        """
+        events = []
+
+        def call_async(bus_name, path, addr, method, signature, args,
+                       reply_handler, error_handler, require_main_loop):
+            self.assertEqual((path, addr, signature),
+                             ('/org/bluez/985/hci0', 'org.bluez.Adapter',
+                              'sv'))
+            self.assertFalse(require_main_loop)
+            events.append(('send', args[0]))
+
+            def block():
+                events.append(('reply', args[0]))
+                try:
+                    getattr(adapter._interface, method)(*args)
+                except dbus.DBusException as e:
+                    error_handler(e)
+                else:
+                    reply_handler()
+            return mock.Mock(block=block)
+        self.mock_system_bus.call_async.side_effect = call_async
+        return events
+
+    def test_set_adapter_properties(self):
+        adapter = bt_manager.BTAdapter()
+        events = self._call_async(adapter)
+        failures = adapter.set_properties([('Powered', True),
+                                           ('Name', 'NewAdapterName-1'),
+                                           ('DiscoverableTimeout', 180),
+                                           ('Alias', 'Box'),
+                                           ('Unknown', 'Value')])
+        self.assertEqual(list(failures), ['Unknown'])
+        # All writes are sent before any reply is waited for
+        names = ['Powered', 'Name', 'DiscoverableTimeout', 'Alias']
+        self.assertEqual(events, [('send', n) for n in names] +
+                         [('reply', n) for n in names])
+        self.assertIsInstance(failures['Unknown'], KeyError)
+        self.assertEqual(adapter.Name, 'NewAdapterName-1')
+        self.assertEqual(adapter.DiscoverableTimeout, 180)
+        self.assertIsInstance(adapter.DiscoverableTimeout, dbus.UInt32)
+
+        user = mock.MagicMock()
+        adapter.set_properties({'Pairable': False}, user.cb_notify_done)
+        user.cb_notify_done.assert_called_once_with({})
+        self.assertFalse(adapter.Pairable)
+
+        error = dbus.DBusException('org.bluez.Error.Failed')
+        with mock.patch.object(adapter._interface, 'SetProperty',
+                               side_effect=[error, None]):
+            failures = adapter.set_properties([('Powered', False),
+                                               ('Pairable', True)])
+        self.assertEqual(failures, {'Powered': error})
+
+    def test_set_adapter_properties_async(self):
+        adapter = bt_manager.BTAdapter()
+        replies = []
+        with mock.patch.object(adapter._interface, 'SetProperty',
+                               lambda *args, **kwargs: replies.append(kwargs)):
+            user = mock.MagicMock()
+            failures = adapter.set_properties([('Powered', False),
+                                               ('Powered', True),
+                                               ('Unknown', 'Value')],
+                                              user.cb_notify_done)
+        self.assertEqual(list(failures), ['Unknown'])
+        self.assertEqual(len(replies), 2)
+        replies[1]['reply_handler']()
+        self.assertFalse(user.cb_notify_done.called)
+        replies[0]['error_handler']('org.bluez.Error.Failed')
+        self.assertEqual(user.cb_notify_done.call_args[0][0],
+                         {'Unknown': failures['Unknown'],
+                          'Powered': 'org.bluez.Error.Failed'})
+
+    def test_get_adapter_property_async(self):
+        adapter = bt_manager.BTAdapter()
+        replies = []
+        user = mock.MagicMock()
+        with mock.patch.object(adapter._interface, 'GetProperties',
+                               lambda **kwargs: replies.append(kwargs)):
+            self.assertIsNone(adapter.get_property('Discovering',
+                                                   user.cb_notify_done))
+            adapter.get_property('Unknown', user.cb_notify_done,
+                                 user.cb_notify_error)
+            adapter.get_property(None, user.cb_notify_done,
+                                 user.cb_notify_error)
+        self.assertFalse(user.cb_notify_done.called)
+        for reply in replies:
+            reply['reply_handler']({'Discovering': dbus.Boolean(True)})
+        self.assertEqual(user.cb_notify_done.call_args_list,
+                         [mock.call(True),
+                          mock.call({'Discovering': True})])
+        self.assertIsInstance(user.cb_notify_error.call_args[0][0],
+                              KeyError)
+        replies[0]['error_handler']('org.bluez.Error.Failed')
+        self.assertEqual(user.cb_notify_error.call_count, 1)
+
+    def test_set_adapter_property_schema(self):
+        adapter = bt_manager.BTAdapter()
+        with mock.patch.object(adapter._interface, 'SetProperty') as set_property:  # noqa
+            self.assertRaises(bt_manager.BTPropertyReadOnlyException,
+                              setattr, adapter, 'Address', '11:22:33:44:55:66')  # noqa
+            self.assertRaises(KeyError, adapter.set_property, 'Unknown', 1)
+            self.assertRaises(ValueError, adapter.set_property,
+                              'PairableTimeout', 'forever')
+            failures = adapter.set_properties({'Class': 0, 'Discovering': True})  # noqa
+            self.assertEqual(sorted(failures), ['Class', 'Discovering'])
+            self.assertIsInstance(failures['Class'],
+                                  bt_manager.BTPropertyReadOnlyException)
+            self.assertFalse(set_property.called)
+        adapter.PairableTimeout = '60'
+        self.assertEqual(adapter.PairableTimeout, 60)
+        self.assertIsInstance(adapter.PairableTimeout, dbus.UInt32)
+
     def test_adapter_list_devices(self):
         adapter = bt_manager.BTAdapter()
         print adapter.list_devices()
@@ -770,7 +902,7 @@ class BTAdapterTest(unittest.TestCase):
         adapter.add_signal_receiver(user.callback_fn, signal, self)
         self.mock_system_bus.add_signal_receiver.assert_called()
         cb = self.mock_system_bus.add_signal_receiver.call_args_list[0][0][0]
-        cb(name, properties)
+        cb(name, properties, path=adapter._path, member=signal)
         user.callback_fn.assert_called_with(signal, self, name, properties)
         adapter.remove_signal_receiver(signal)
         self.mock_system_bus.remove_signal_receiver.assert_called()
@@ -785,7 +917,7 @@ class BTAdapterTest(unittest.TestCase):
         adapter.add_signal_receiver(user.callback_fn, signal, self)
         self.mock_system_bus.add_signal_receiver.assert_called()
         cb = self.mock_system_bus.add_signal_receiver.call_args_list[0][0][0]
-        cb(name, value)
+        cb(name, value, path=adapter._path, member=signal)
         user.callback_fn.assert_called_with(signal, self, name, value)
         adapter.remove_signal_receiver(signal)
         self.mock_system_bus.remove_signal_receiver.assert_called()
@@ -1258,12 +1390,12 @@ class SBCAudioTest(unittest.TestCase):
                                          2,
                                          64)
         expected = bt_manager.SBCCodecConfig(bt_manager.codecs.SBCChannelMode.CHANNEL_MODE_MONO,  # noqa
-                                             bt_manager.codecs.SBCSamplingFrequency.FREQ_44_1KHZ,  # noqa
+                                             bt_manager.codecs.SBCSamplingFrequency.FREQ_48KHZ,  # noqa
                                              bt_manager.codecs.SBCAllocationMethod.SNR,  # noqa
                                              bt_manager.codecs.SBCSubbands.SUBBANDS_4,  # noqa
                                              bt_manager.codecs.SBCBlocks.BLOCKS_12,  # noqa
                                              2,
-                                             31)
+                                             29)
         dbus_caps = media._make_config(caps)
         expected_dbus = media._make_config(expected)
         actual_dbus = media.SelectConfiguration(dbus_caps)
@@ -1296,7 +1428,7 @@ class SBCAudioTest(unittest.TestCase):
                                          2,
                                          64)
         expected = bt_manager.SBCCodecConfig(bt_manager.codecs.SBCChannelMode.CHANNEL_MODE_STEREO,  # noqa
-                                             bt_manager.codecs.SBCSamplingFrequency.FREQ_44_1KHZ,  # noqa
+                                             bt_manager.codecs.SBCSamplingFrequency.FREQ_32KHZ,  # noqa
                                              bt_manager.codecs.SBCAllocationMethod.LOUDNESS,  # noqa
                                              bt_manager.codecs.SBCSubbands.SUBBANDS_8,  # noqa
                                              bt_manager.codecs.SBCBlocks.BLOCKS_4,  # noqa
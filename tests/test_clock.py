@@ -0,0 +1,234 @@
+from __future__ import unicode_literals
+
+import unittest
+
+import bt_manager
+import mock
+
+from fixtures import sbc_config
+
+
+class BTPresentationClockTest(unittest.TestCase):
+
+    def test_presentation_time(self):
+        clock = bt_manager.BTPresentationClock()
+        clock.set_delay(1500)
+        self.assertEqual(clock.delay, 0.15)
+        self.assertEqual(clock.presentation_time(now=100.0), 100.15)
+
+        # 1s of audio written at once is played out until 101s
+        clock.wrote(1.0, 0.016, now=100.0)
+        self.assertEqual(clock.written, 1.0)
+        self.assertEqual(clock.encode_latency, 0.001)
+        self.assertEqual(clock.queued(now=100.25), 0.75)
+        self.assertAlmostEqual(clock.latency(now=100.25), 0.901)
+        self.assertAlmostEqual(clock.presentation_time(0.5, now=100.25),
+                               100.65)
+        self.assertAlmostEqual(clock.presentation_time(now=100.25), 101.15)
+        self.assertAlmostEqual(clock.presentation_time(2.0, now=100.25),
+                               102.15)
+
+        # Once the queue runs dry, writing takes its latency
+        self.assertAlmostEqual(clock.presentation_time(now=105.0), 105.151)
+        clock.wrote(0.5, 0.001, now=105.0)
+        self.assertEqual(clock.queued(now=105.0), 0.5)
+        self.assertAlmostEqual(clock.presentation_time(1.0, now=105.0),
+                               105.15)
+
+
+class SBCAudioSourceDelayTest(unittest.TestCase):
+
+    @mock.patch('bt_manager.audio.BTMediaTransport')
+    @mock.patch('dbus.SystemBus')
+    def test_delay_reporting(self, system_bus, transport_class):
+        transport = transport_class.return_value
+        transport.acquire.return_value = (mock.MagicMock(), 672, 672)
+        transport.Delay = 2000
+        source = bt_manager.SBCAudioSource('/endpoint/test')
+        self.assertIsNone(source.presentation_time())
+        self.assertIsNone(source.get_latency())
+        source.codec = mock.MagicMock()
+        source.codec.codesize = 512
+        source.codec.frame_duration = 2902
+        source.codec.frame_length = 119
+        source.codec.stats.eagain = 0
+        source.codec.encode.return_value = 512 * 10
+        with mock.patch('gobject.io_add_watch'):
+            source._acquire_media_transport('/transport', 'w')
+        self.assertEqual(source.get_latency()['delay'], 0.2)
+        handler = transport.add_signal_receiver.call_args[0][0]
+        handler('PropertyChanged', None, 'Delay', 1000)
+        handler('PropertyChanged', None, 'NREC', True)
+        self.assertEqual(source.get_latency()['delay'], 0.1)
+
+        self.assertEqual(source.write_transport(b'\0' * 512 * 10), 512 * 10)
+        self.assertAlmostEqual(source.clock.written, 0.02902)
+        latency = source.get_latency()
+        self.assertTrue(0 < latency['queue'] <= 0.02902)
+        self.assertAlmostEqual(latency['total'], latency['delay'] +
+                               latency['encode'] + latency['queue'])
+
+        # A packet of 5 frames is dropped as the transport would block
+        def encode(fd, mtu, data):
+            source.codec.stats.eagain += 1
+            return len(data)
+        source.codec.encode.side_effect = encode
+        self.assertEqual(source.write_transport(b'\0' * 512 * 10), 512 * 10)
+        self.assertAlmostEqual(source.clock.written, 0.02902 + 0.01451)
+
+        clock = source.clock
+        with mock.patch('os.close'):
+            source._release_media_transport('/transport', 'w')
+        transport.remove_signal_receiver.assert_called_once_with(
+            transport_class.SIGNAL_PROPERTY_CHANGED)
+        self.assertIsNone(source.clock)
+        self.assertIsNone(source.presentation_time())
+
+        # Each acquisition starts on a new clock
+        with mock.patch('gobject.io_add_watch'):
+            source._acquire_media_transport('/transport', 'w')
+        self.assertIsNot(source.clock, clock)
+        self.assertEqual(source.clock.written, 0.0)
+
+
+class SBCPromptScheduleTest(unittest.TestCase):
+
+    @mock.patch('time.time')
+    @mock.patch('gobject.timeout_add')
+    def test_stream_at(self, timeout_add, time):
+        time.return_value = 100.0
+        endpoint = mock.MagicMock()
+        endpoint.codec = bt_manager.SBCCodec(sbc_config())
+        endpoint.presentation_time.return_value = 100.25
+        prompt = bt_manager.SBCPrompt(pcm=b'\0' * 4096, cache_size=0)
+        prompt.stream_to(endpoint, at=101.0)
+        timeout_add.assert_called_once_with(750, mock.ANY, endpoint)
+        endpoint.register_transport_ready_event.assert_not_called()
+        self.assertFalse(timeout_add.call_args[0][1](endpoint))
+        endpoint.register_transport_ready_event.assert_called_once_with(
+            mock.ANY, endpoint)
+
+        # Too late to be heard on time
+        timeout_add.reset_mock()
+        endpoint.presentation_time.return_value = 101.5
+        prompt.stream_to(endpoint, at=101.0)
+        timeout_add.assert_not_called()
+        self.assertEqual(endpoint.register_transport_ready_event.call_count,
+                         2)
+
+
+class _FakeSource(object):
+    """Source endpoint writing whole SBC frames' worth of PCM"""
+    def __init__(self, delay):
+        self.clock = bt_manager.BTPresentationClock()
+        self.clock.set_delay(delay)
+        self.data = bytearray()
+
+    def write_transport(self, data):
+        nbytes = len(data) // 512 * 512
+        self.data.extend(data[:nbytes])
+        self.clock.wrote(nbytes / 176400.0, 0.0)
+        return nbytes
+
+    def presentation_time(self, position=None):
+        return self.clock.presentation_time(position)
+
+
+class BTPlaybackClockTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('time.time')
+        self.time = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.time.return_value = 100.0
+        self.clock = bt_manager.BTPlaybackClock(latency=0.25, tick=0.01)
+        # One second of PCM
+        self.pcm = b'\x01\x02' * 88200
+
+    def _run(self, seconds):
+        for _ in range(int(round(seconds / self.clock.tick))):
+            self.time.return_value += self.clock.tick
+            self.clock.update()
+
+    def test_sync(self):
+        near = _FakeSource(500)
+        far = _FakeSource(1500)
+        self.clock.add(near)
+        self.clock.add(far)
+        self.assertIsNone(self.clock.get_stats(near)['error'])
+        self.assertEqual(self.clock.write(self.pcm), 100.25)
+        self.assertEqual(self.clock.write(self.pcm), 101.25)
+        self.clock.update()
+        for source in (near, far):
+            self.assertTrue(abs(self.clock.get_stats(source)['error']) <
+                            self.clock.tolerance)
+        # Sinks further away are sent more silence up front
+        self.assertTrue(self.clock.get_stats(far)['inserted'] <
+                        self.clock.get_stats(near)['inserted'])
+        self.assertEqual(bytes(near.data[:4]), b'\0' * 4)
+        self._run(1.0)
+        for source in (near, far):
+            self.assertTrue(abs(self.clock.get_stats(source)['error']) <
+                            self.clock.tolerance)
+        # Audio not yet due is not written
+        self.assertTrue(len(near.data) < 176400 * 1.3)
+
+        # A drift of 2ms is corrected gradually
+        far.clock.set_delay(1520)
+        self._run(0.05)
+        self.assertTrue(self.clock.get_stats(far)['error'] > 0.001)
+        self._run(0.1)
+        stats = self.clock.get_stats(far)
+        self.assertTrue(abs(stats['error']) < self.clock.tolerance)
+        self.assertTrue(stats['dropped'] > 0)
+        self.assertTrue(stats['dropped'] <= 0.002 * 44100)
+
+    def test_join(self):
+        source = _FakeSource(1000)
+        self.clock.write(self.pcm)
+        self.clock.write(self.pcm)
+        self._run(1.0)
+        # Audio that can no longer be heard is discarded
+        self.assertEqual(self.clock._base, 132300)
+        self.clock.add(source)
+        self.clock.update()
+        self.assertTrue(abs(self.clock.get_stats(source)['error']) <
+                        self.clock.tolerance)
+        self.assertEqual(self.clock._base, 132300)
+        self.assertTrue(len(source.data) > 0)
+
+    def test_release(self):
+        source = _FakeSource(1000)
+        self.clock.add(source)
+        self.clock.write(self.pcm)
+        self.clock.write(self.pcm)
+        self._run(0.5)
+        written = len(source.data)
+
+        # Nothing is written while the media transport is released
+        clock = source.clock
+        source.clock = None
+        self._run(0.5)
+        self.assertEqual(len(source.data), written)
+        self.assertIsNone(self.clock.get_stats(source)['error'])
+
+        # Acquired again, the endpoint rejoins the stream in sync
+        source.clock = bt_manager.BTPresentationClock()
+        source.clock.set_delay(1000)
+        self.clock.update()
+        self.assertTrue(abs(self.clock.get_stats(source)['error']) <
+                        self.clock.tolerance)
+        self._run(0.1)
+        self.assertTrue(abs(self.clock.get_stats(source)['error']) <
+                        self.clock.tolerance)
+        self.assertTrue(len(source.data) > written)
+        self.assertIsNot(source.clock, clock)
+
+    @mock.patch('gobject.source_remove')
+    @mock.patch('gobject.timeout_add')
+    def test_start_stop(self, timeout_add, source_remove):
+        self.clock.start()
+        timeout_add.assert_called_once_with(10, mock.ANY)
+        self.assertTrue(timeout_add.call_args[0][1]())
+        self.clock.stop()
+        source_remove.assert_called_once_with(timeout_add.return_value)
@@ -0,0 +1,54 @@
+from __future__ import unicode_literals
+
+import unittest
+
+import bt_manager
+
+
+class BTCoDTest(unittest.TestCase):
+
+    def test_decode(self):
+        cod = bt_manager.BTCoD(0x5A020C)
+        self.assertEqual(cod.major_service_class,
+                         ['Networking (LAN, Ad hoc, ...)',
+                          'Capturing (Scanner, Microphone, ...)',
+                          'Object Transfer (v-Inbox, v-Folder, ...)',
+                          'Telephony (Cordless telephony, Modem, Headset service, ...)'])  # noqa
+        self.assertEqual(cod.major_device_class,
+                         'Phone (cellular, cordless, pay phone, modem, ...)')
+        self.assertEqual(cod.minor_device_class, ['Smartphone'])
+        cod = bt_manager.BTCoD(0x0005E8)
+        self.assertEqual(cod.major_service_class, [])
+        self.assertEqual(cod.minor_device_class,
+                         ['Combo keyboard/pointing device', 'Unknown'])
+        self.assertEqual(bt_manager.BTCoD(0x001E00).major_device_class,
+                         'Unknown')
+        self.assertEqual(len(bt_manager.BTCoD(0xFFE000).major_service_class),
+                         11)
+
+    def test_memoized(self):
+        cod = bt_manager.BTCoD(0x240404)
+        self.assertIs(bt_manager.BTCoD(0x240404), cod)
+        self.assertIs(bt_manager.BTCoD(long(0x240404)), cod)
+        self.assertEqual(str(cod), repr(cod))
+        self.assertTrue(str(cod).startswith('<cod:0x240404 '))
+
+    def test_decode_many(self):
+        cods = [0x240404, 0x5A020C, 0x240404, 0x2C0110]
+        decoded = bt_manager.BTCoD.decode_many(cods)
+        self.assertEqual([c.cod for c in decoded], cods)
+        self.assertIs(decoded[0], decoded[2])
+        self.assertIs(decoded[1], bt_manager.BTCoD(0x5A020C))
+
+    def test_shared_state(self):
+        cod = bt_manager.BTCoD(0x240404)
+        # Bits above the 24-bit class of device share the instance
+        self.assertIs(bt_manager.BTCoD(0x1240404), cod)
+        self.assertIs(bt_manager.BTCoD.decode_many([0x1240404])[0], cod)
+        # Decoded lists are copies of the shared tables
+        cod.major_service_class.append('Modified')
+        self.assertNotIn('Modified', cod.major_service_class)
+        for value in range(2 * bt_manager.BTCoD._CACHE_SIZE):
+            bt_manager.BTCoD(value)
+        self.assertEqual(len(bt_manager.BTCoD._instances),
+                         bt_manager.BTCoD._CACHE_SIZE)
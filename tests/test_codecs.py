@@ -0,0 +1,86 @@
+from __future__ import unicode_literals
+
+import unittest
+import socket
+
+import bt_manager
+import mock
+
+from fixtures import sbc_config, sine_pcm
+
+
+class SBCCodecTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pcm = sine_pcm()
+
+    def test_long_frame_length(self):
+        codec = bt_manager.SBCCodec(sbc_config(bitpool=128))
+        frames = codec.encode_frames(self.pcm)
+        self.assertTrue(codec.frame_length > 255)
+        self.assertEqual(bt_manager.sbc_frame_length(sbc_config(bitpool=128)),
+                         codec.frame_length)
+        self.assertEqual(len(frames),
+                         len(self.pcm) // codec.codesize * codec.frame_length)
+
+    def test_encode_decode_large_mtu(self):
+        (tx, rx) = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.addCleanup(tx.close)
+        self.addCleanup(rx.close)
+        encoder = bt_manager.SBCCodec(sbc_config(bitpool=53))
+        decoder = bt_manager.SBCCodec(sbc_config(bitpool=53))
+        rx.setblocking(False)
+        pcm = self.pcm[:encoder.codesize * 40]
+        self.assertEqual(encoder.encode(tx.fileno(), 895, pcm), len(pcm))
+        # Packets are larger than the default buffer, but must be
+        # decoded in full
+        decoded = b''
+        while (True):
+            data = decoder.decode(rx.fileno(), 895)[:]
+            if (not data):
+                break
+            decoded += data
+        self.assertEqual(len(decoded), len(pcm))
+
+    @mock.patch('dbus.SystemBus')
+    def test_transport_stats(self, system_bus):
+        (tx, rx) = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.addCleanup(tx.close)
+        self.addCleanup(rx.close)
+        rx.setblocking(False)
+        encoder = bt_manager.SBCCodec(sbc_config(bitpool=53))
+        decoder = bt_manager.SBCCodec(sbc_config(bitpool=53))
+        # 3 packets of 7 frames
+        pcm = self.pcm[:encoder.codesize * 21]
+        self.assertEqual(encoder.encode(tx.fileno(), 895, pcm), len(pcm))
+        stats = encoder.get_stats()
+        self.assertEqual(stats['packets_sent'], 3)
+        self.assertEqual(stats['frames_sent'], 21)
+        self.assertEqual(stats['bytes_sent'], 21 * encoder.frame_length)
+        self.assertEqual(stats['eagain'], 0)
+        self.assertTrue(stats['encode_time'] > 0)
+        # Timestamps count samples, 16 blocks of 8 subbands a frame
+        self.assertEqual(encoder.ts[0], 21 * 16 * 8)
+
+        # Lose the second packet
+        decoder.decode(rx.fileno(), 895, encoder.codesize * 7)
+        rx.recv(895)
+        decoder.decode(rx.fileno(), 895)
+        stats = decoder.get_stats()
+        self.assertEqual(stats['packets_received'], 2)
+        self.assertEqual(stats['frames_received'], 14)
+        self.assertEqual(stats['sequence_gaps'], 1)
+        # Both packets are read at once, so their transit differs by
+        # the 14 frames between their timestamps
+        self.assertAlmostEqual(stats['jitter'], 14 * 16 * 8 / 44100.0 / 16,
+                               places=3)
+        self.assertTrue(stats['decode_time'] > 0)
+
+        sink = bt_manager.SBCAudioSink('/endpoint/test')
+        sink.codec = decoder
+        sink.read_mtu = 895
+        sink.write_mtu = 672
+        stats = sink.get_transport_stats()
+        self.assertEqual(stats['read_mtu'], 895)
+        self.assertEqual(stats['write_mtu'], 672)
+        self.assertEqual(stats['packets_received'], 2)
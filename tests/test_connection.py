@@ -0,0 +1,179 @@
+from __future__ import unicode_literals
+
+import unittest
+
+import bt_manager
+import mock
+import dbus
+
+
+class BTConnectionManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.devices = {}
+        self.timers = []
+        patcher = mock.patch('gobject.timeout_add', self._timeout_add)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = mock.MagicMock()
+        self.error = dbus.DBusException('Connection attempt failed')
+        self.manager = bt_manager.BTConnectionManager(
+            factory=self._factory, max_concurrent=2,
+            adapter_path='/org/bluez/985/hci0', retries=2)
+
+    def _timeout_add(self, ms, func, *args):
+        self.timers.append((ms, func, args))
+        return len(self.timers)
+
+    def _factory(self, dev_path):
+        self.assertTrue(dev_path.startswith('/org/bluez/985/hci0/dev_'))
+        device = mock.MagicMock()
+        address = dev_path[len('/org/bluez/985/hci0/dev_'):]
+        self.devices.setdefault(address.replace('_', ':'), []).append(device)
+        return device
+
+    def _reply(self, address, ok=True):
+        connect = self.devices[address][-1].connect
+        if (ok):
+            connect.call_args[0][0]()
+        else:
+            connect.call_args[0][1](self.error)
+
+    def _add(self, address, **kwargs):
+        return self.manager.add(address,
+                                cb_notify_connected=self.user.connected,
+                                cb_notify_failed=self.user.failed,
+                                user_arg=self, **kwargs)
+
+    def test_bounded_priority_queue(self):
+        self._add('11:22:33:44:55:01', priority=5)
+        self._add('11:22:33:44:55:02', priority=5)
+        self._add('11:22:33:44:55:03', priority=1)
+        self.assertFalse(self._add('11:22:33:44:55:03'))
+        self.assertEqual(sorted(self.devices),
+                         ['11:22:33:44:55:01', '11:22:33:44:55:02'])
+        self.assertEqual(self.manager.active(), 2)
+        self.assertEqual(self.manager.pending, 3)
+
+        # The higher priority device takes the freed slot
+        self._reply('11:22:33:44:55:02')
+        self.user.connected.assert_called_once_with('11:22:33:44:55:02',
+                                                    self)
+        self.assertIn('11:22:33:44:55:03', self.devices)
+        self.assertEqual(self.manager.latency.count, 1)
+
+        self.assertTrue(self.manager.cancel('11:22:33:44:55:01'))
+        self.assertEqual(
+            self.devices['11:22:33:44:55:01'][-1].disconnect.call_count, 1)
+        self.assertEqual(self.manager.active(), 1)
+        self.assertFalse(self.manager.cancel('11:22:33:44:55:01'))
+
+    def test_backoff_and_timeout(self):
+        self._add('11:22:33:44:55:01')
+        (ms, timed_out, args) = self.timers[-1]
+        self.assertEqual(ms, 30000)
+        self._reply('11:22:33:44:55:01', ok=False)
+        self.assertEqual(self.manager.active(), 0)
+        self.assertEqual(self.timers[-1][0], 1000)
+        self.assertFalse(timed_out(*args))
+
+        # Retry, which times out
+        self.timers[-1][1](*self.timers[-1][2])
+        self.assertEqual(len(self.devices['11:22:33:44:55:01']), 2)
+        self.timers[-1][1](*self.timers[-1][2])
+        self.assertEqual(self.timers[-1][0], 2000)
+        self.assertEqual(
+            self.devices['11:22:33:44:55:01'][-1].disconnect.call_count, 1)
+
+        # Late reply to the abandoned attempt is ignored
+        self._reply('11:22:33:44:55:01')
+        self.assertFalse(self.user.connected.called)
+
+        self.timers[-1][1](*self.timers[-1][2])
+        self._reply('11:22:33:44:55:01', ok=False)
+        self.user.failed.assert_called_once_with('11:22:33:44:55:01', self,
+                                                 self.error)
+        self.assertEqual(self.manager.failure_latency.count, 3)
+        self.assertEqual(self.manager.pending, 0)
+
+    def test_deadline(self):
+        self._add('11:22:33:44:55:01', deadline=0.5)
+        self.assertAlmostEqual(self.timers[-1][0], 500, delta=10)
+        self._reply('11:22:33:44:55:01', ok=False)
+        reason = self.user.failed.call_args[0][2]
+        self.assertTrue(isinstance(reason,
+                                   bt_manager.BTConnectionTimeoutException))
+        self.assertEqual(reason.args, ('deadline',))
+
+    @mock.patch('bt_manager.scheduler.BTAdapter')
+    def test_scheduler(self, adapter):
+        HCI0 = '/org/bluez/985/hci0'
+        HCI1 = '/org/bluez/985/hci1'
+        adapter.side_effect = lambda adapter_path: mock.MagicMock(
+            Discovering=False)
+        manager = mock.MagicMock()
+        manager.list_adapters.return_value = [HCI0, HCI1]
+        scheduler = bt_manager.BTAdapterScheduler(manager)
+        # hci1 is the more loaded adapter even once hci0 is full
+        scheduler.acquire(bt_manager.BTAdapterScheduler.DISCOVERY, None,
+                          [HCI0])
+        paths = []
+        self.manager = bt_manager.BTConnectionManager(
+            factory=lambda path: paths.append(path) or mock.MagicMock(),
+            max_concurrent=1, scheduler=scheduler)
+        scheduler.bind_device('11:22:33:44:55:03', HCI0)
+        for n in range(1, 5):
+            self._add('11:22:33:44:55:0%d' % n)
+        self.assertEqual(paths, [HCI0 + '/dev_11_22_33_44_55_01',
+                                 HCI1 + '/dev_11_22_33_44_55_02'])
+        self.assertEqual((self.manager.active(HCI0),
+                          self.manager.active(HCI1)), (1, 1))
+        self.assertEqual(scheduler.load(HCI0), 2)
+        self.assertEqual(scheduler.load(HCI1), 6)
+
+        # The device known to hci0 waits for it, the other takes the
+        # first free slot
+        self.manager.cancel('11:22:33:44:55:02')
+        self.assertEqual(paths[2:], [HCI1 + '/dev_11_22_33_44_55_04'])
+        self.manager.cancel('11:22:33:44:55:01')
+        self.assertEqual(paths[3:], [HCI0 + '/dev_11_22_33_44_55_03'])
+
+        # Devices stay queued until there is an adapter to use
+        manager.list_adapters.return_value = []
+        self.manager = bt_manager.BTConnectionManager(
+            factory=self._factory, scheduler=bt_manager.BTAdapterScheduler(
+                manager))
+        self.assertTrue(self._add('11:22:33:44:55:01'))
+        self.assertEqual(self.manager.pending, 1)
+        self.assertEqual(self.devices, {})
+
+    @mock.patch('dbus.Interface')
+    @mock.patch('dbus.SystemBus')
+    def test_device_proxy(self, system_bus, interface):
+        manager = bt_manager.BTConnectionManager('org.bluez.Input',
+                                                 adapter_path='/hci0')
+        manager.add('11:22:33:44:55:01')
+        system_bus.return_value.get_object.assert_called_once_with(
+            'org.bluez', '/hci0/dev_11_22_33_44_55_01', introspect=False)
+        self.assertEqual(interface.call_args[0][1], 'org.bluez.Input')
+        proxy = interface.return_value
+        self.assertEqual(sorted(proxy.Connect.call_args[1]),
+                         ['error_handler', 'reply_handler'])
+        (ms, timed_out, args) = self.timers[-1]
+        timed_out(*args)
+        self.assertEqual(sorted(proxy.Disconnect.call_args[1]),
+                         ['error_handler', 'reply_handler'])
+
+
+class BTLatencyHistogramTest(unittest.TestCase):
+
+    def test_histogram(self):
+        histogram = bt_manager.BTLatencyHistogram((0.1, 1.0))
+        self.assertIsNone(histogram.percentile(50))
+        for latency in (0.05, 0.07, 0.5, 3.0):
+            histogram.add(latency)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.percentile(50), 0.1)
+        self.assertEqual(histogram.percentile(75), 1.0)
+        self.assertEqual(histogram.percentile(99), 3.0)
+        self.assertAlmostEqual(histogram.mean, 0.905)
@@ -0,0 +1,50 @@
+from __future__ import unicode_literals
+
+import unittest
+
+import bt_manager
+
+from fixtures import RECORD
+
+
+class BTDiscoveryInfoTest(unittest.TestCase):
+
+    def test_parse_service_record(self):
+        record = bt_manager.parse_service_record(RECORD)
+        self.assertEqual(record.handle, 0x00010004)
+        attributes = record.attributes
+        self.assertTrue(attributes[0x0001][0] is
+                        bt_manager.SERVICES['AudioSink'])
+        (l2cap, avdtp) = attributes[0x0004]
+        self.assertEqual(l2cap[0].name, 'L2CAP')
+        self.assertEqual(l2cap[1], 0x0019)
+        self.assertEqual(avdtp[0].name, 'AVDTP')
+        self.assertEqual(avdtp[1], 0x0100)
+        self.assertEqual(attributes[0x0100], 'Audio SNK')
+        self.assertEqual(attributes[0x0102], b'ISSC')
+        self.assertEqual(attributes[0x0200], True)
+        self.assertEqual(attributes[0x0201], -3)
+
+    def test_early_stop(self):
+        # Anything beyond the requested attributes is never parsed
+        text = RECORD[:RECORD.index('<attribute id="0x0100">')] + '<broken'
+        record = bt_manager.parse_service_record(text,
+                                                 ['ServiceClassIDList',
+                                                  0x0004])
+        self.assertEqual(sorted(record.attributes.keys()), [0x0001, 0x0004])
+        self.assertEqual(record.handle, None)
+
+        records = bt_manager.parse_service_records({0x00010004: text},
+                                                   ['ServiceClassIDList'])
+        self.assertEqual(records[0x00010004].handle, 0x00010004)
+        self.assertEqual(list(records[0x00010004].attributes.keys()),
+                         [0x0001])
+
+    def test_discovery_info(self):
+        info = bt_manager.BTDiscoveryInfo(RECORD)
+        self.assertEqual(info.ServiceRecordHandle, '0x00010004')
+        self.assertEqual(info.ServiceClassIDList,
+                         [{'uuid': bt_manager.SERVICES['AudioSink']}])
+        self.assertEqual(info.ProtocolDescriptorList[1][1], '0x0100')
+        info = bt_manager.BTDiscoveryInfo(RECORD, ['ServiceClassIDList'])
+        self.assertEqual(list(info.__dict__.keys()), ['ServiceClassIDList'])
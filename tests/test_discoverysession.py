@@ -0,0 +1,126 @@
+from __future__ import unicode_literals
+
+import unittest
+
+import bt_manager
+import mock
+
+
+class BTDiscoverySessionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.adapter = mock.MagicMock()
+        self.user = mock.MagicMock()
+        self.session = bt_manager.BTDiscoverySession(self.adapter,
+                                                     self.user.callback,
+                                                     self, interval=0.5)
+        self.session.start()
+        receivers = dict((c[0][1], c[0][0]) for c in
+                         self.adapter.add_signal_receiver.call_args_list)
+        self.found = receivers[bt_manager.BTAdapter.SIGNAL_DEVICE_FOUND]
+        self.disappeared = \
+            receivers[bt_manager.BTAdapter.SIGNAL_DEVICE_DISAPPEARED]
+        self.adapter.start_discovery.assert_called_once_with()
+
+    def _found(self, address, **properties):
+        self.found(bt_manager.BTAdapter.SIGNAL_DEVICE_FOUND, None,
+                   address, properties)
+
+    def _events(self):
+        events = [(c[0][0], c[0][2].address)
+                  for c in self.user.callback.call_args_list]
+        self.user.callback.reset_mock()
+        return events
+
+    @mock.patch('gobject.timeout_add')
+    def test_coalesce(self, timeout_add):
+        for rssi in (-40, -42, -44, -41):
+            self._found('11:22:33:44:55:66', RSSI=rssi, Class=0x5A020C)
+        self._found('11:22:33:44:55:77', RSSI=-70)
+        timeout_add.assert_called_once_with(500, self.session.flush)
+        self.assertEqual(self._events(), [])
+        self.session.flush()
+        self.assertEqual(self._events(),
+                         [('DeviceNew', '11:22:33:44:55:66'),
+                          ('DeviceNew', '11:22:33:44:55:77')])
+        device = self.session.devices['11:22:33:44:55:66']
+        self.assertEqual((device.rssi, device.cod), (-41, 0x5A020C))
+
+        # Same RSSI bucket and no name, nothing to deliver
+        self._found('11:22:33:44:55:66', RSSI=-48)
+        self.session.flush()
+        self.assertEqual(self._events(), [])
+
+        self._found('11:22:33:44:55:66', RSSI=-55, Name='Phone')
+        self._found('11:22:33:44:55:66', RSSI=-52, Name='Phone')
+        self.session.flush()
+        self.assertEqual(self._events(),
+                         [('DeviceName', '11:22:33:44:55:66'),
+                          ('DeviceRSSI', '11:22:33:44:55:66')])
+        self.assertEqual(device.name, 'Phone')
+
+    @mock.patch('gobject.timeout_add')
+    def test_disappeared(self, timeout_add):
+        self._found('11:22:33:44:55:66', RSSI=-42)
+        self._found('11:22:33:44:55:77', RSSI=-42)
+        self.session.flush()
+        self._events()
+
+        # Lost and found again within an interval is not notified
+        self.disappeared(None, None, '11:22:33:44:55:66')
+        self._found('11:22:33:44:55:66', RSSI=-41)
+        # Seen and lost within an interval is not notified either
+        self._found('11:22:33:44:55:88', RSSI=-41)
+        self.disappeared(None, None, '11:22:33:44:55:88')
+        self.disappeared(None, None, '11:22:33:44:55:77')
+        self.session.flush()
+        self.assertEqual(self._events(),
+                         [('DeviceLost', '11:22:33:44:55:77')])
+        self.assertEqual(sorted(self.session.devices),
+                         ['11:22:33:44:55:66'])
+
+    @mock.patch('gobject.timeout_add')
+    def test_hysteresis(self, timeout_add):
+        self._found('11:22:33:44:55:66', RSSI=-45)
+        self.session.flush()
+        self._events()
+
+        # Hovering around the -40 dBm bucket edge is not notified
+        for rssi in (-40, -39, -42, -50, -51, -52):
+            self._found('11:22:33:44:55:66', RSSI=rssi)
+            self.session.flush()
+            self.assertEqual(self._events(), [])
+        for rssi in (-38, -53):
+            self._found('11:22:33:44:55:66', RSSI=rssi)
+            self.session.flush()
+            self.assertEqual(self._events(),
+                             [('DeviceRSSI', '11:22:33:44:55:66')])
+
+    @mock.patch('gobject.timeout_add')
+    def test_reappeared_keeps_changes(self, timeout_add):
+        self._found('11:22:33:44:55:66', RSSI=-42)
+        self.session.flush()
+        self._events()
+
+        self._found('11:22:33:44:55:66', RSSI=-42, Name='Phone')
+        self.disappeared(None, None, '11:22:33:44:55:66')
+        self._found('11:22:33:44:55:66', RSSI=-42)
+        self.session.flush()
+        self.assertEqual(self._events(),
+                         [('DeviceName', '11:22:33:44:55:66')])
+
+        # Changes of a device which stays lost are not delivered
+        self._found('11:22:33:44:55:66', RSSI=-42, Name='Tablet')
+        self.disappeared(None, None, '11:22:33:44:55:66')
+        self.session.flush()
+        self.assertEqual(self._events(),
+                         [('DeviceLost', '11:22:33:44:55:66')])
+
+    def test_immediate(self):
+        self.session.interval = 0
+        self._found('11:22:33:44:55:66', RSSI=-40, Name='Phone')
+        self.assertEqual(self._events(),
+                         [('DeviceNew', '11:22:33:44:55:66')])
+        self.session.stop()
+        self.adapter.stop_discovery.assert_called_once_with()
+        self.assertEqual(self.adapter.remove_signal_receiver.call_count, 3)
@@ -0,0 +1,39 @@
+from __future__ import unicode_literals
+
+import unittest
+import subprocess
+import sys
+
+
+def _run(statement):
+    return subprocess.check_output([sys.executable, '-c', statement])
+
+
+class LazyImportTest(unittest.TestCase):
+
+    def test_import_is_lazy(self):
+        output = _run('import sys, bt_manager\n'
+                      'print(sorted(m for m in sys.modules'
+                      ' if sys.modules[m] and m.startswith("bt_manager")))\n'
+                      'print("cffi" in sys.modules)')
+        self.assertEqual(output.split(b'\n')[:2],
+                         [b"['bt_manager', 'bt_manager.exceptions']",
+                          b'False'])
+
+    def test_attributes_resolve_on_access(self):
+        output = _run('import sys, bt_manager\n'
+                      'bt_manager.BTAdapter\n'
+                      'print("bt_manager.serviceuuids" in sys.modules)\n'
+                      'print(len(bt_manager.SERVICES) > 0)\n'
+                      'print(bt_manager.ffi.sizeof("sbc_t") > 0)')
+        self.assertEqual(output.split(), [b'False', b'True', b'True'])
+
+    def test_star_import(self):
+        import bt_manager
+        namespace = {}
+        exec('from bt_manager import *', namespace)
+        for name in ('BTAdapter', 'SBCCodec', 'SERVICES', 'VENDORS',
+                     'ATTRIBUTES', 'BTRejectedException', 'ffi'):
+            self.assertIs(namespace[name], getattr(bt_manager, name))
+        self.assertIs(bt_manager.codecs.SBCCodec, bt_manager.SBCCodec)
+        self.assertFalse(hasattr(bt_manager, 'not_a_module'))
@@ -0,0 +1,118 @@
+from __future__ import unicode_literals
+
+import unittest
+import socket
+
+import bt_manager
+import mock
+import dbus
+
+from fixtures import sbc_config
+
+
+class BTMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = bt_manager.BTMetrics(enabled=True)
+
+    def test_counters_and_histograms(self):
+        self.metrics.record_dbus_call('org.bluez.Adapter', 'GetProperties',
+                                      0.02)
+        self.metrics.record_dbus_call('org.bluez.Adapter', 'GetProperties',
+                                      0.2, failed=True)
+        labels = {'interface': 'org.bluez.Adapter', 'method': 'GetProperties'}
+        self.assertEqual(self.metrics.counter('bt_dbus_calls_total', labels),
+                         2)
+        self.assertEqual(self.metrics.counter('bt_dbus_errors_total',
+                                              labels), 1)
+        histogram = self.metrics.histogram('bt_dbus_call_seconds', labels)
+        self.assertEqual(histogram.count, 2)
+        self.assertEqual(histogram.percentile(50), 0.025)
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['counters']['bt_dbus_calls_total'],
+                         [{'labels': labels, 'value': 2}])
+        calls = snapshot['histograms']['bt_dbus_call_seconds'][0]
+        self.assertEqual(calls['count'], 2)
+        self.assertEqual(calls['buckets']['0.025'], 1)
+        self.assertEqual(calls['buckets']['0.25'], 1)
+
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot(),
+                         {'counters': {}, 'histograms': {}})
+
+    def test_prometheus(self):
+        self.metrics.increment('bt_dbus_calls_total',
+                               {'interface': 'org.bluez.Adapter',
+                                'method': 'Say "hi"'})
+        self.metrics.observe('bt_callback_seconds', 0.5, None, (0.1, 1.0))
+        self.assertEqual(self.metrics.prometheus().splitlines(), [
+            '# HELP bt_dbus_calls_total D-Bus method calls made',
+            '# TYPE bt_dbus_calls_total counter',
+            'bt_dbus_calls_total{interface="org.bluez.Adapter",'
+            'method="Say \\"hi\\""} 1',
+            '# HELP bt_callback_seconds Time spent in user callbacks',
+            '# TYPE bt_callback_seconds histogram',
+            'bt_callback_seconds_bucket{le="0.1"} 0',
+            'bt_callback_seconds_bucket{le="1.0"} 1',
+            'bt_callback_seconds_bucket{le="+Inf"} 1',
+            'bt_callback_seconds_sum 0.5',
+            'bt_callback_seconds_count 1'])
+
+    def test_instrument(self):
+        interface = mock.MagicMock()
+        interface.GetProperties.return_value = {'Name': 'hci0'}
+        interface.RemoveDevice.side_effect = dbus.DBusException('failed')
+        measured = self.metrics.instrument(interface, 'org.bluez.Adapter')
+        self.assertEqual(measured.GetProperties(), {'Name': 'hci0'})
+        self.assertRaises(dbus.DBusException, measured.RemoveDevice, '/dev')
+        reply = mock.MagicMock()
+        measured.CreateDevice('00:11', reply_handler=reply,
+                              error_handler=mock.MagicMock())
+        self.assertEqual(self.metrics.counter(
+            'bt_dbus_calls_total', {'interface': 'org.bluez.Adapter',
+                                    'method': 'CreateDevice'}), 0)
+        interface.CreateDevice.call_args[1]['reply_handler']('/dev')
+        reply.assert_called_once_with('/dev')
+        for method in ('GetProperties', 'RemoveDevice', 'CreateDevice'):
+            self.assertEqual(self.metrics.counter(
+                'bt_dbus_calls_total', {'interface': 'org.bluez.Adapter',
+                                        'method': method}), 1)
+        self.assertEqual(self.metrics.counter(
+            'bt_dbus_errors_total', {'interface': 'org.bluez.Adapter',
+                                     'method': 'RemoveDevice'}), 1)
+
+    def test_transport(self):
+        (tx, rx) = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.addCleanup(tx.close)
+        self.addCleanup(rx.close)
+        rx.setblocking(False)
+        source = bt_manager.SBCAudioSource.__new__(bt_manager.SBCAudioSource)
+        source.codec = bt_manager.SBCCodec(sbc_config(bitpool=53))
+        source.fd = tx.fileno()
+        source.write_mtu = 895
+        source.access_type = 'w'
+        source.path = '/transport'
+        source.user_cb = mock.MagicMock()
+        source.user_arg = 'arg'
+        pcm = b'\0' * (source.codec.codesize * 10)
+        with mock.patch('bt_manager.audio.METRICS', self.metrics):
+            self.assertEqual(source.write_transport(pcm), len(pcm))
+            source._transport_ready_handler(tx.fileno(), None)
+            source._transport_ready_handler(tx.fileno(), None)
+        labels = {'transport': '/transport', 'direction': 'tx'}
+        self.assertEqual(self.metrics.counter('bt_transport_bytes_total',
+                                              labels), len(pcm))
+        self.assertEqual(self.metrics.counter('bt_transport_frames_total',
+                                              labels), 10)
+        # 7 frames of 119 bytes fit a packet
+        self.assertEqual(self.metrics.counter('bt_transport_packets_total',
+                                              labels), 2)
+        self.assertEqual(self.metrics.histogram(
+            'bt_codec_seconds', {'operation': 'encode'}).count, 1)
+        self.assertEqual(source.user_cb.call_count, 2)
+        labels = {'callback': 'transport_ready'}
+        self.assertEqual(self.metrics.histogram('bt_callback_seconds',
+                                                labels).count, 2)
+        self.assertEqual(self.metrics.histogram(
+            'bt_callback_interval_seconds', labels).count, 1)
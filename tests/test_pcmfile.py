@@ -0,0 +1,98 @@
+from __future__ import unicode_literals
+
+import unittest
+import tempfile
+import shutil
+import os
+
+import bt_manager
+import mock
+
+
+class PCMFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_wav_round_trip(self):
+        filename = os.path.join(self.tmpdir, 'test.wav')
+        data = b''.join([chr(i & 0xFF) for i in range(5000)])
+        writer = bt_manager.PCMFileWriter(filename, channels=1,
+                                          frequency=16000, prealloc=1024)
+        writer.write(data[0:3000])
+        writer.write(data[3000:])
+        self.assertEqual(writer.data_size, len(data))
+        writer.close()
+        self.assertEqual(os.path.getsize(filename), 44 + len(data))
+
+        reader = bt_manager.PCMFileReader(filename, block_size=4096)
+        self.assertEqual(reader.channels, 1)
+        self.assertEqual(reader.frequency, 16000)
+        self.assertEqual(reader.bits_per_sample, 16)
+        self.assertEqual(reader.data_size, len(data))
+        block = reader.read()
+        self.assertEqual(len(block), 4096)
+        self.assertEqual(block[:], data[0:4096])
+        reader.advance(len(block))
+        self.assertEqual(reader.read()[:], data[4096:])
+        reader.advance(reader.remaining)
+        self.assertEqual(reader.read(), None)
+        reader.close()
+
+    def test_unsupported_format(self):
+        filename = os.path.join(self.tmpdir, 'test.wav')
+        for bits_per_sample in (8, 24):
+            writer = bt_manager.PCMFileWriter(
+                filename, bits_per_sample=bits_per_sample, prealloc=1024)
+            writer.write(b'\0' * 12)
+            writer.close()
+            self.assertRaises(bt_manager.BTUnsupportedMediaFormat,
+                              bt_manager.PCMFileReader, filename)
+        writer = bt_manager.PCMFileWriter(filename, channels=6,
+                                          prealloc=1024)
+        writer.close()
+        self.assertRaises(bt_manager.BTUnsupportedMediaFormat,
+                          bt_manager.PCMFileReader, filename)
+        # A fmt chunk shorter than the PCM format fields
+        with open(filename, 'wb') as fh:
+            fh.write(b'RIFF\x14\0\0\0WAVEfmt \x08\0\0\0\1\0\2\0' +
+                     b'\x44\xac\0\0')
+        self.assertRaises(bt_manager.BTUnsupportedMediaFormat,
+                          bt_manager.PCMFileReader, filename)
+        filename = os.path.join(self.tmpdir, 'test.raw')
+        with open(filename, 'wb') as fh:
+            fh.write(b'\0' * 100)
+        self.assertRaises(bt_manager.BTUnsupportedMediaFormat,
+                          bt_manager.PCMFileReader, filename,
+                          bits_per_sample=8)
+
+    def test_raw_pcm(self):
+        filename = os.path.join(self.tmpdir, 'test.raw')
+        writer = bt_manager.PCMFileWriter(filename, wav=False)
+        writer.write(b'\x01' * 100)
+        writer.close()
+        self.assertEqual(os.path.getsize(filename), 100)
+        reader = bt_manager.PCMFileReader(filename, frequency=48000)
+        self.assertEqual(reader.frequency, 48000)
+        self.assertEqual(reader.data_size, 100)
+        reader.close()
+
+    def test_stream_to_endpoint(self):
+        filename = os.path.join(self.tmpdir, 'test.raw')
+        with open(filename, 'wb') as fh:
+            fh.write(b'\x00' * 1100)
+        user = mock.MagicMock()
+        endpoint = mock.MagicMock()
+        endpoint.write_transport.side_effect = \
+            lambda data: (len(data) // 512) * 512
+        reader = bt_manager.PCMFileReader(filename, block_size=1024)
+        reader.stream_to(endpoint, user.cb_notify_eof, self)
+        cb, arg = endpoint.register_transport_ready_event.call_args[0]
+        cb(arg)
+        self.assertEqual(reader.remaining, 76)
+        user.cb_notify_eof.assert_not_called()
+        cb(arg)
+        endpoint.unregister_transport_ready_event.assert_called_once_with()
+        user.cb_notify_eof.assert_called_once_with(self)
+        reader.close()
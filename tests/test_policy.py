@@ -0,0 +1,181 @@
+from __future__ import unicode_literals
+
+import unittest
+import socket
+
+import bt_manager
+import mock
+
+from fixtures import sine_pcm
+from bt_manager import SBCChannelMode, SBCSamplingFrequency, \
+    SBCAllocationMethod, SBCSubbands, SBCBlocks
+
+
+def _caps(channel_mode=SBCChannelMode.ALL,
+          frequency=SBCSamplingFrequency.ALL,
+          allocation_method=SBCAllocationMethod.ALL,
+          subbands=SBCSubbands.ALL,
+          block_length=SBCBlocks.ALL,
+          min_bitpool=2,
+          max_bitpool=64):
+    return bt_manager.SBCCodecConfig(channel_mode, frequency,
+                                     allocation_method, subbands,
+                                     block_length, min_bitpool, max_bitpool)
+
+
+class SBCConfigPolicyTest(unittest.TestCase):
+
+    def _select(self, name, device_caps, pcm_rate=None):
+        return bt_manager.SBC_POLICIES[name].select(_caps(), device_caps,
+                                                    pcm_rate)
+
+    def test_default(self):
+        self.assertEqual(self._select('default', _caps()),
+                         _caps(SBCChannelMode.CHANNEL_MODE_JOINT_STEREO,
+                               SBCSamplingFrequency.FREQ_44_1KHZ,
+                               SBCAllocationMethod.LOUDNESS,
+                               SBCSubbands.SUBBANDS_8,
+                               SBCBlocks.BLOCKS_16,
+                               2, 53))
+        # Another frequency is chosen if the device lacks 44.1kHz
+        config = self._select('default', _caps(
+            frequency=SBCSamplingFrequency.FREQ_48KHZ))
+        self.assertEqual(config.frequency, SBCSamplingFrequency.FREQ_48KHZ)
+        self.assertEqual(config.max_bitpool, 51)
+        config = self._select('default', _caps(
+            frequency=SBCSamplingFrequency.FREQ_16KHZ |
+            SBCSamplingFrequency.FREQ_32KHZ))
+        self.assertEqual(config.frequency, SBCSamplingFrequency.FREQ_32KHZ)
+        # Or if the PCM is at another rate the device supports
+        config = self._select('default', _caps(), pcm_rate=48000)
+        self.assertEqual(config.frequency, SBCSamplingFrequency.FREQ_48KHZ)
+        self.assertRaises(bt_manager.BTInvalidConfiguration,
+                          bt_manager.SBC_POLICIES['default'].select,
+                          _caps(frequency=SBCSamplingFrequency.FREQ_48KHZ),
+                          _caps(frequency=SBCSamplingFrequency.FREQ_16KHZ))
+
+    def test_profiles(self):
+        config = self._select('low_latency', _caps())
+        self.assertEqual(config.block_length, SBCBlocks.BLOCKS_4)
+        self.assertEqual(config.max_bitpool, 53)
+        config = self._select('max_quality', _caps(max_bitpool=250))
+        self.assertEqual(config.max_bitpool, 64)
+        config = self._select('max_quality', _caps(max_bitpool=40))
+        self.assertEqual(config.max_bitpool, 40)
+        config = self._select('low_cpu', _caps())
+        self.assertEqual(config.channel_mode, SBCChannelMode.CHANNEL_MODE_MONO)
+        self.assertEqual(config.subbands, SBCSubbands.SUBBANDS_4)
+        self.assertEqual(config.max_bitpool, 31)
+        config = self._select('low_cpu', _caps(
+            channel_mode=SBCChannelMode.CHANNEL_MODE_STEREO))
+        self.assertEqual(config.channel_mode,
+                         SBCChannelMode.CHANNEL_MODE_STEREO)
+        config = self._select('battery', _caps(
+            frequency=SBCSamplingFrequency.FREQ_48KHZ))
+        self.assertEqual(config.subbands, SBCSubbands.SUBBANDS_4)
+        self.assertEqual(config.max_bitpool, 33)
+        # The bitpool is not below the smallest the device supports
+        config = self._select('battery', _caps(min_bitpool=40))
+        self.assertEqual((config.min_bitpool, config.max_bitpool), (40, 40))
+
+    def test_preference_tables(self):
+        policy = bt_manager.SBCConfigPolicy(
+            (SBCChannelMode.CHANNEL_MODE_STEREO,
+             SBCChannelMode.CHANNEL_MODE_MONO),
+            (SBCSamplingFrequency.FREQ_48KHZ,),
+            (SBCBlocks.BLOCKS_8, SBCBlocks.BLOCKS_16),
+            (SBCSubbands.SUBBANDS_8,),
+            (SBCAllocationMethod.SNR, SBCAllocationMethod.LOUDNESS))
+        for mask in range(16):
+            device_caps = _caps(channel_mode=mask, block_length=mask)
+            if (mask & (SBCChannelMode.CHANNEL_MODE_STEREO |
+                        SBCChannelMode.CHANNEL_MODE_MONO) == 0 or
+                    mask & (SBCBlocks.BLOCKS_8 | SBCBlocks.BLOCKS_16) == 0):
+                self.assertRaises(bt_manager.BTInvalidConfiguration,
+                                  policy.select, _caps(), device_caps)
+                continue
+            config = policy.select(_caps(), device_caps)
+            if (mask & SBCChannelMode.CHANNEL_MODE_STEREO):
+                self.assertEqual(config.channel_mode,
+                                 SBCChannelMode.CHANNEL_MODE_STEREO)
+            else:
+                self.assertEqual(config.channel_mode,
+                                 SBCChannelMode.CHANNEL_MODE_MONO)
+            if (mask & SBCBlocks.BLOCKS_8):
+                self.assertEqual(config.block_length, SBCBlocks.BLOCKS_8)
+            else:
+                self.assertEqual(config.block_length, SBCBlocks.BLOCKS_16)
+            self.assertEqual(config.allocation_method,
+                             SBCAllocationMethod.SNR)
+        self.assertRaises(bt_manager.BTInvalidConfiguration, policy.select,
+                          _caps(), _caps(subbands=SBCSubbands.SUBBANDS_4))
+
+    @mock.patch('dbus.SystemBus')
+    def test_endpoint_policy(self, system_bus):
+        source = bt_manager.SBCAudioSource('/endpoint/test',
+                                           policy='low_latency')
+        caps = source._make_config(_caps())
+        config = source._parse_config(source.SelectConfiguration(caps))
+        self.assertEqual(config.block_length, SBCBlocks.BLOCKS_4)
+        self.assertEqual(source.codec.codec_config, config)
+        policy = mock.MagicMock()
+        policy.select.return_value = _caps(
+            SBCChannelMode.CHANNEL_MODE_MONO,
+            SBCSamplingFrequency.FREQ_16KHZ,
+            SBCAllocationMethod.SNR,
+            SBCSubbands.SUBBANDS_4,
+            SBCBlocks.BLOCKS_8,
+            2, 20)
+        policy.__class__ = bt_manager.SBCConfigPolicy
+        sink = bt_manager.SBCAudioSink('/endpoint/test', 16000, policy)
+        self.assertEqual(sink._parse_config(sink.SelectConfiguration(caps)),
+                         policy.select.return_value)
+        policy.select.assert_called_once_with(
+            sink._parse_config(sink.properties['Capabilities']),
+            sink._parse_config(caps), 16000)
+        self.assertRaises(KeyError, bt_manager.SBCAudioSource,
+                          '/endpoint/test', policy='unknown')
+
+    @mock.patch('bt_manager.audio.BTMediaTransport')
+    @mock.patch('dbus.SystemBus')
+    def test_low_cpu_remix(self, system_bus, transport_class):
+        (tx, rx) = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.addCleanup(tx.close)
+        self.addCleanup(rx.close)
+        rx.setblocking(False)
+        transport = transport_class.return_value
+        transport.Delay = 0
+        endpoints = []
+        for (cls, sock, access_type) in (
+                (bt_manager.SBCAudioSource, tx, 'w'),
+                (bt_manager.SBCAudioSink, rx, 'r')):
+            endpoint = cls('/endpoint/test', policy='low_cpu',
+                           pcm_channels=2)
+            endpoint.SelectConfiguration(endpoint._make_config(_caps()))
+            fd = mock.MagicMock()
+            fd.take.return_value = sock.fileno()
+            transport.acquire.return_value = (fd, 895, 895)
+            with mock.patch('gobject.io_add_watch'):
+                endpoint._acquire_media_transport('/transport', access_type)
+            endpoints.append(endpoint)
+        (source, sink) = endpoints
+        self.assertEqual(source.codec.codec_config.channel_mode,
+                         SBCChannelMode.CHANNEL_MODE_MONO)
+
+        # Stereo PCM is downmixed to the mono stream, and back.  Each
+        # frame holds 64 samples, and partial samples are not taken
+        pcm = sine_pcm(2048)
+        self.assertEqual(source.write_transport(pcm), len(pcm))
+        self.assertEqual(source.write_transport(pcm[:-2]), 31 * 64 * 4)
+        received = b''
+        while (True):
+            data = sink.read_transport()
+            if (not data):
+                break
+            received += data
+        self.assertEqual(len(received), 63 * 64 * 4)
+        self.assertEqual(received[4000:4002], received[4002:4004])
+        for endpoint in endpoints:
+            with mock.patch('os.close'):
+                endpoint._release_media_transport('/transport',
+                                                  endpoint.access_type)
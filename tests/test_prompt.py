@@ -0,0 +1,130 @@
+from __future__ import unicode_literals
+
+import unittest
+import socket
+
+import bt_manager
+import mock
+
+from fixtures import sbc_config, sine_pcm
+
+
+def _drain(sock):
+    """Read all packets waiting on a socket, returning the number
+    of bytes of SBC frames they carry"""
+    nbytes = 0
+    while (True):
+        try:
+            nbytes += len(sock.recv(1024)) - 13
+        except socket.error:
+            return nbytes
+
+
+class SBCPromptTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pcm = sine_pcm()
+        self.codec = bt_manager.SBCCodec(sbc_config())
+        self.frames = bt_manager.SBCCodec(sbc_config()).encode_frames(self.pcm)
+
+    def test_frame_length(self):
+        self.assertEqual(bt_manager.sbc_frame_length(sbc_config()),
+                         self.codec.frame_length)
+        self.assertEqual(len(self.frames) % self.codec.frame_length, 0)
+
+    def test_accepts_frames(self):
+        self.assertTrue(self.codec.accepts_frames(self.frames))
+        self.assertFalse(self.codec.accepts_frames(self.frames[:-1]))
+        self.assertFalse(self.codec.accepts_frames(self.pcm))
+        codec = bt_manager.SBCCodec(sbc_config(bitpool=30))
+        self.assertFalse(codec.accepts_frames(self.frames))
+
+    def test_send_frames(self):
+        (tx, rx) = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.addCleanup(tx.close)
+        self.addCleanup(rx.close)
+        sent = self.codec.send_frames(tx.fileno(), 672, self.frames)
+        self.assertEqual(sent, len(self.frames))
+        rx.setblocking(False)
+        expected = bt_manager.SBCCodec(sbc_config()).decode_frames(self.frames)
+        decoder = bt_manager.SBCCodec(sbc_config())
+        pcm = decoder.decode(rx.fileno(), 672, len(expected) + 4096)
+        self.assertEqual(pcm[:], expected)
+
+    def test_stream_pre_encoded(self):
+        endpoint = mock.MagicMock()
+        endpoint.codec = self.codec
+        endpoint.write_transport_frames.side_effect = lambda data: len(data)
+        user = mock.MagicMock()
+        prompt = bt_manager.SBCPrompt(pcm=self.pcm, frames=self.frames)
+        prompt.stream_to(endpoint, user.cb_notify_eof, self)
+        cb, arg = endpoint.register_transport_ready_event.call_args[0]
+        while (not user.cb_notify_eof.called):
+            cb(arg)
+        sent = b''.join([c[0][0][:] for c in
+                         endpoint.write_transport_frames.call_args_list])
+        self.assertEqual(sent, self.frames)
+        endpoint.write_transport.assert_not_called()
+        user.cb_notify_eof.assert_called_once_with(self)
+
+    def test_stream_would_block(self):
+        (tx, rx) = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.addCleanup(tx.close)
+        self.addCleanup(rx.close)
+        tx.setblocking(False)
+        rx.setblocking(False)
+        endpoint = mock.MagicMock()
+        endpoint.codec = self.codec
+        endpoint.write_transport_frames.side_effect = \
+            lambda data: self.codec.send_frames(tx.fileno(), 672, data)
+        user = mock.MagicMock()
+        prompt = bt_manager.SBCPrompt(frames=self.frames * 50)
+        prompt.stream_to(endpoint, user.cb_notify_eof, self)
+        cb, arg = endpoint.register_transport_ready_event.call_args[0]
+        # Fill the transport until it would block
+        while (not self.codec.get_stats()['eagain']):
+            cb(arg)
+        cb(arg)
+        self.assertFalse(user.cb_notify_eof.called)
+        received = 0
+        while (not user.cb_notify_eof.called):
+            received += _drain(rx)
+            cb(arg)
+        received += _drain(rx)
+        # The clip only ends once all of it is sent
+        self.assertEqual(received, len(self.frames) * 50)
+        endpoint.unregister_transport_ready_event.assert_called_once_with()
+        user.cb_notify_eof.assert_called_once_with(self)
+
+    def test_mismatch_encodes_and_caches(self):
+        endpoint = mock.MagicMock()
+        endpoint.codec = bt_manager.SBCCodec(sbc_config(bitpool=30))
+        prompt = bt_manager.SBCPrompt(pcm=self.pcm, frames=self.frames,
+                                      cache_size=1)
+        frames = prompt.encoded_for(endpoint.codec)
+        self.assertTrue(endpoint.codec.accepts_frames(frames))
+        self.assertTrue(prompt.encoded_for(endpoint.codec) is frames)
+        self.assertTrue(prompt.encoded_for(self.codec) is self.frames)
+        other = bt_manager.SBCCodec(sbc_config(bitpool=20))
+        prompt.encoded_for(other)
+        self.assertFalse(prompt.encoded_for(endpoint.codec) is frames)
+
+    def test_mismatch_live_fallback(self):
+        endpoint = mock.MagicMock()
+        endpoint.codec = bt_manager.SBCCodec(sbc_config(bitpool=30))
+        endpoint.write_transport.side_effect = lambda data: len(data)
+        prompt = bt_manager.SBCPrompt(pcm=self.pcm, frames=self.frames,
+                                      cache_size=0)
+        prompt.stream_to(endpoint)
+        cb, arg = endpoint.register_transport_ready_event.call_args[0]
+        cb(arg)
+        endpoint.write_transport.assert_called_once_with(mock.ANY)
+        endpoint.write_transport_frames.assert_not_called()
+
+        prompt = bt_manager.SBCPrompt(frames=self.frames)
+        try:
+            exception_caught = False
+            prompt.stream_to(endpoint)
+        except bt_manager.BTInvalidConfiguration:
+            exception_caught = True
+        self.assertTrue(exception_caught)
@@ -0,0 +1,180 @@
+from __future__ import unicode_literals
+
+import unittest
+import socket
+import struct
+import math
+
+import bt_manager
+import mock
+
+from fixtures import sbc_config
+
+
+def _tone(frequency, rate, seconds, channels=2):
+    samples = bytearray()
+    for i in range(int(rate * seconds)):
+        sample = int(10000 * math.sin(2 * math.pi * frequency * i / rate))
+        samples.extend(struct.pack(b'<h', sample) * channels)
+    return bytes(samples)
+
+
+def _samples(data, channels=2):
+    return struct.unpack(b'<%dh' % (len(data) // 2), data)[::channels]
+
+
+class PCMResamplerTest(unittest.TestCase):
+
+    def test_passthrough(self):
+        resampler = bt_manager.PCMResampler(44100, 44100)
+        self.assertEqual(resampler.process(b'\1\2\3'), b'\1\2\3')
+        self.assertEqual(resampler.delay, 0.0)
+
+    def test_conversion(self):
+        for (in_rate, out_rate) in ((48000, 44100), (16000, 44100),
+                                    (44100, 32000), (8000, 16000)):
+            resampler = bt_manager.PCMResampler(in_rate, out_rate)
+            output = resampler.process(_tone(1000, in_rate, 0.25))
+            self.assertEqual(len(output), out_rate // 4 * 4)
+            samples = _samples(output)
+            for i in range(len(samples) // 2, len(samples)):
+                expected = 10000 * math.sin(2 * math.pi * 1000 *
+                                            (float(i) / out_rate -
+                                             resampler.delay))
+                self.assertTrue(abs(samples[i] - expected) < 16)
+
+    def test_streaming(self):
+        pcm = _tone(440, 48000, 0.1, channels=1)
+        whole = bt_manager.PCMResampler(48000, 44100, channels=1)
+        expected = whole.process(pcm)
+        resampler = bt_manager.PCMResampler(48000, 44100, channels=1)
+        # Blocks of odd lengths split samples in two
+        output = b''.join(resampler.process(pcm[i:i + 333])
+                          for i in range(0, len(pcm), 333))
+        self.assertEqual(output, expected)
+        resampler.reset()
+        self.assertEqual(resampler.process(pcm), expected)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, bt_manager.PCMResampler, 0, 44100)
+        self.assertRaises(ValueError, bt_manager.PCMResampler, 48000, -1)
+        self.assertRaises(ValueError, bt_manager.PCMResampler, 48000, 44100,
+                          channels=0)
+        self.assertRaises(ValueError, bt_manager.PCMResampler, 48000, 44100,
+                          taps=1)
+        codec = bt_manager.SBCCodec(sbc_config())
+        resampler = bt_manager.PCMResampler(48000, 44100, taps=2,
+                                            codec=codec)
+        self.assertEqual(len(resampler.process(_tone(1000, 48000, 0.01))),
+                         441 * 4)
+
+    def test_antialiasing(self):
+        # 20kHz is above the Nyquist frequency of 32kHz
+        resampler = bt_manager.PCMResampler(48000, 32000)
+        samples = _samples(resampler.process(_tone(20000, 48000, 0.1)))
+        self.assertTrue(max(abs(s) for s in samples[100:]) < 4)
+
+
+class SBCAudioResampleTest(unittest.TestCase):
+
+    def _caps(self, frequency):
+        return bt_manager.SBCAudioCodec._make_config(
+            bt_manager.SBCCodecConfig(bt_manager.SBCChannelMode.ALL,
+                                      frequency,
+                                      bt_manager.SBCAllocationMethod.ALL,
+                                      bt_manager.SBCSubbands.ALL,
+                                      bt_manager.SBCBlocks.ALL,
+                                      2,
+                                      64))
+
+    @mock.patch('dbus.SystemBus')
+    def test_native_rate(self, system_bus):
+        source = bt_manager.SBCAudioSource('/endpoint/test', pcm_rate=48000)
+        config = source._parse_config(source.SelectConfiguration(
+            self._caps(bt_manager.SBCSamplingFrequency.ALL)))
+        self.assertEqual(config.frequency,
+                         bt_manager.SBCSamplingFrequency.FREQ_48KHZ)
+        self.assertEqual(config.max_bitpool, 51)
+        config = source._parse_config(source.SelectConfiguration(
+            self._caps(bt_manager.SBCSamplingFrequency.FREQ_44_1KHZ)))
+        self.assertEqual(config.frequency,
+                         bt_manager.SBCSamplingFrequency.FREQ_44_1KHZ)
+        source = bt_manager.SBCAudioSource('/endpoint/test')
+        config = source._parse_config(source.SelectConfiguration(
+            self._caps(bt_manager.SBCSamplingFrequency.ALL)))
+        self.assertEqual(config.frequency,
+                         bt_manager.SBCSamplingFrequency.FREQ_44_1KHZ)
+
+    @mock.patch('bt_manager.audio.BTMediaTransport')
+    @mock.patch('dbus.SystemBus')
+    def test_loopback(self, system_bus, transport_class):
+        (tx, rx) = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.addCleanup(tx.close)
+        self.addCleanup(rx.close)
+        rx.setblocking(False)
+        fd = mock.MagicMock()
+        fd.take.return_value = tx.fileno()
+        transport = transport_class.return_value
+        transport.acquire.return_value = (fd, 895, 895)
+        transport.Delay = 0
+        source = bt_manager.SBCAudioSource('/endpoint/test', pcm_rate=48000)
+        source.codec = bt_manager.SBCCodec(sbc_config(bitpool=53))
+        with mock.patch('gobject.io_add_watch'):
+            source._acquire_media_transport('/transport', 'w')
+        self.assertEqual(source.write_resampler.out_rate, 44100)
+        self.assertIsNone(source.read_resampler)
+
+        # All PCM is taken, less than a frame being held back
+        pcm = _tone(1000, 48000, 0.1)
+        self.assertEqual(source.write_transport(pcm), len(pcm))
+        self.assertAlmostEqual(source.clock.written, 0.1)
+        self.assertTrue(len(source._resampled) < source.codec.codesize)
+        self.assertTrue(source.get_latency()['resample'] > 0)
+
+        sink = bt_manager.SBCAudioSink.__new__(bt_manager.SBCAudioSink)
+        sink.codec = bt_manager.SBCCodec(sbc_config(bitpool=53))
+        sink.fd = rx.fileno()
+        sink.read_mtu = 895
+        sink.access_type = 'r'
+        sink.pcm_rate = 16000
+        sink.read_resampler = sink._make_resampler('r')
+        received = b''
+        while (True):
+            data = sink.read_transport()
+            if (not data):
+                break
+            received += data
+        expected = (0.1 * 44100 - len(source._resampled) // 4) // 128 * 128
+        self.assertTrue(abs(len(received) // 4 -
+                            expected * 16000 / 44100) <= 2)
+
+        with mock.patch('os.close'):
+            source._release_media_transport('/transport', 'w')
+
+    @mock.patch('bt_manager.audio.BTMediaTransport')
+    @mock.patch('dbus.SystemBus')
+    def test_read_write(self, system_bus, transport_class):
+        transport = transport_class.return_value
+        transport.acquire.return_value = (mock.MagicMock(), 895, 895)
+        transport.Delay = 0
+        endpoint = bt_manager.SBCAudioSource('/endpoint/test',
+                                             pcm_rate=48000)
+        endpoint.codec = bt_manager.SBCCodec(sbc_config(bitpool=53))
+        with mock.patch('gobject.io_add_watch'):
+            endpoint._acquire_media_transport('/transport', 'rw')
+        self.assertEqual((endpoint.read_resampler.in_rate,
+                          endpoint.read_resampler.out_rate), (44100, 48000))
+        self.assertEqual((endpoint.write_resampler.in_rate,
+                          endpoint.write_resampler.out_rate), (48000, 44100))
+
+        # Nothing more is taken while the encoder is backed up
+        pcm = _tone(1000, 48000, 0.1)
+        with mock.patch.object(endpoint, '_encode', return_value=0):
+            self.assertEqual(endpoint.write_transport(pcm), len(pcm))
+            held = len(endpoint._resampled)
+            self.assertEqual(endpoint.write_transport(pcm), 0)
+            self.assertEqual(len(endpoint._resampled), held)
+        with mock.patch.object(endpoint, '_encode',
+                               side_effect=lambda data: len(data)):
+            self.assertEqual(endpoint.write_transport(pcm), len(pcm))
+            self.assertEqual(len(endpoint._resampled), 0)
@@ -0,0 +1,80 @@
+from __future__ import unicode_literals
+
+import unittest
+import weakref
+import gc
+
+import bt_manager
+import mock
+
+
+class BTSignalRouterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = mock.MagicMock()
+        self.router = bt_manager.BTSignalRouter.for_bus(self.bus)
+
+    def _dispatch(self, *args, **kwargs):
+        handler = self.bus.add_signal_receiver.call_args[0][0]
+        handler(*args, **kwargs)
+
+    def test_single_match(self):
+        user = mock.MagicMock()
+        self.assertIs(bt_manager.BTSignalRouter.for_bus(self.bus),
+                      self.router)
+        subs = [self.router.subscribe('org.bluez.Device', path,
+                                      'PropertyChanged', cb)
+                for (path, cb) in (('/dev_1', user.a), ('/dev_1', user.b),
+                                   ('/dev_2', user.c), (None, user.d))]
+        self.assertEqual(self.bus.add_signal_receiver.call_count, 1)
+        self.assertEqual(self.bus.add_signal_receiver.call_args[1],
+                         {'dbus_interface': 'org.bluez.Device',
+                          'path_keyword': 'path',
+                          'member_keyword': 'member'})
+
+        self._dispatch('Connected', True, path='/dev_1',
+                       member='PropertyChanged')
+        user.a.assert_called_once_with('Connected', True)
+        user.b.assert_called_once_with('Connected', True)
+        user.d.assert_called_once_with('Connected', True)
+        self.assertFalse(user.c.called)
+        self._dispatch('Connected', True, path='/dev_1',
+                       member='DisconnectRequested')
+        self.assertEqual(user.a.call_count, 1)
+
+        for s in subs[:3]:
+            self.router.unsubscribe(s)
+        self.router.unsubscribe(subs[0])
+        self.assertFalse(self.bus.remove_signal_receiver.called)
+        self.router.unsubscribe(subs[3])
+        self.bus.remove_signal_receiver.assert_called_once_with(
+            self.bus.add_signal_receiver.call_args[0][0],
+            dbus_interface='org.bluez.Device')
+
+    def test_unsubscribe_in_callback(self):
+        calls = []
+
+        def once(*args):
+            calls.append(args)
+            self.router.unsubscribe(sub)
+
+        sub = self.router.subscribe('org.bluez.Adapter', '/hci0',
+                                    'DeviceFound', once)
+        other = mock.MagicMock()
+        self.router.subscribe('org.bluez.Adapter', '/hci0',
+                              'DeviceFound', other)
+        for _ in range(2):
+            self._dispatch('11:22:33:44:55:66', {}, path='/hci0',
+                           member='DeviceFound')
+        self.assertEqual(calls, [('11:22:33:44:55:66', {})])
+        self.assertEqual(other.call_count, 2)
+
+    def test_dropped_with_bus(self):
+        bus = mock.MagicMock()
+        router = weakref.ref(bt_manager.BTSignalRouter.for_bus(bus))
+        router().subscribe('org.bluez.Device', None, 'PropertyChanged',
+                           mock.MagicMock())
+        self.assertIn(bus, bt_manager.BTSignalRouter._routers)
+        del bus
+        gc.collect()
+        self.assertIsNone(router())
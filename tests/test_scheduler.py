@@ -0,0 +1,145 @@
+from __future__ import unicode_literals
+
+import unittest
+
+import bt_manager
+import mock
+
+from fixtures import sbc_config
+
+
+HCI0 = '/org/bluez/985/hci0'
+HCI1 = '/org/bluez/985/hci1'
+HCI2 = '/org/bluez/985/hci2'
+
+
+class MockAdapter(mock.MagicMock):
+
+    def __init__(self, adapter_path=None, **kwargs):
+        mock.MagicMock.__init__(self)
+        self._path = adapter_path
+        self.Discovering = adapter_path in MockAdapter.discovering
+
+
+class BTAdapterSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        MockAdapter.discovering = [HCI1]
+        patcher = mock.patch('bt_manager.scheduler.BTAdapter', MockAdapter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = mock.MagicMock()
+        self.manager.list_adapters.return_value = [HCI0, HCI1]
+        self.scheduler = bt_manager.BTAdapterScheduler(self.manager)
+        self.receivers = dict(
+            (c[0][1], c[0][0])
+            for c in self.manager.add_signal_receiver.call_args_list)
+
+    def test_balance(self):
+        CONNECTION = bt_manager.BTAdapterScheduler.CONNECTION
+        STREAM = bt_manager.BTAdapterScheduler.STREAM
+        # hci1 is busy discovering for another process
+        paths = [self.scheduler.acquire(CONNECTION)._path for _ in range(4)]
+        self.assertEqual(paths, [HCI0, HCI0, HCI0, HCI1])
+        self.scheduler.release(HCI0, CONNECTION)
+        self.assertEqual(self.scheduler.load(HCI0), 4)
+        self.assertEqual(self.scheduler.load(HCI1), 6)
+
+        adapter = self.scheduler.adapters[HCI1]
+        cb = adapter.add_signal_receiver.call_args[0][0]
+        cb(bt_manager.BTInterface.SIGNAL_PROPERTY_CHANGED, HCI1,
+           'Discovering', False)
+        self.assertEqual(self.scheduler.load(HCI1), 2)
+
+        # Devices stay with the adapter they are known to, but only
+        # once bound to it
+        self.assertEqual(self.scheduler.acquire(STREAM,
+                                                '11:22:33:44:55:66')._path,
+                         HCI1)
+        self.scheduler.bind_device('11:22:33:44:55:66', HCI0)
+        self.assertEqual(self.scheduler.acquire(STREAM,
+                                                '11:22:33:44:55:66')._path,
+                         HCI0)
+        self.assertEqual(self.scheduler.path_of(self.scheduler.adapters[HCI1]),
+                         HCI1)
+
+    @mock.patch('dbus.SystemBus')
+    def test_transports(self, system_bus):
+        self.scheduler._discovering[HCI1] = False
+        transport = HCI1 + '/dev_11_22_33_44_55_66/fd0'
+        self.scheduler.transport_acquired(transport)
+        self.scheduler.transport_acquired(transport)
+        self.assertEqual(self.scheduler.load(HCI1), 1)
+        self.scheduler.transport_acquired('/org/bluez/985/hci12/dev/fd0')
+        self.assertEqual(self.scheduler.load(HCI0), 0)
+        self.scheduler.transport_released(transport)
+        self.scheduler.transport_released(transport)
+        self.assertEqual(self.scheduler.load(HCI1), 0)
+
+        # Endpoints account for their transports
+        endpoint = bt_manager.SBCAudioSource('/endpoint/test',
+                                             scheduler=self.scheduler)
+        endpoint.codec = bt_manager.SBCCodec(sbc_config())
+        fd = mock.MagicMock()
+        fd.take.return_value = 99
+        with mock.patch('bt_manager.audio.BTMediaTransport') as media, \
+                mock.patch('gobject.io_add_watch'), \
+                mock.patch('gobject.source_remove'), \
+                mock.patch('os.close'):
+            media.return_value.acquire.return_value = (fd, 672, 672)
+            media.return_value.Delay = 0
+            endpoint._acquire_media_transport(transport, 'w')
+            self.assertEqual(self.scheduler.load(HCI1), 1)
+            endpoint._release_media_transport(transport, 'w')
+        self.assertEqual(self.scheduler.load(HCI1), 0)
+
+    def test_hotplug(self):
+        DISCOVERY = bt_manager.BTAdapterScheduler.DISCOVERY
+        self.scheduler._discovering[HCI1] = False
+        self.receivers[bt_manager.BTManager.SIGNAL_ADAPTER_ADDED](
+            None, None, HCI2)
+        # The new adapter's state is read without blocking
+        hci2 = self.scheduler.adapters[HCI2]
+        (name, cb_notify_done) = hci2.get_property.call_args[0]
+        self.assertEqual(name, 'Discovering')
+        cb_notify_done(True)
+        self.assertEqual(self.scheduler.load(HCI2), 4)
+        cb_notify_done(False)
+        sessions = [self.scheduler.start_discovery(None) for _ in range(3)]
+        self.assertEqual(sorted(s.adapter._path for s in sessions),
+                         [HCI0, HCI1, HCI2])
+        for s in sessions:
+            s.adapter.start_discovery.assert_called_once_with()
+        self.receivers[bt_manager.BTManager.SIGNAL_ADAPTER_REMOVED](
+            None, None, HCI2)
+        self.assertEqual(sorted(self.scheduler.adapters), [HCI0, HCI1])
+        hci2.remove_signal_receiver.assert_called_with(
+            bt_manager.BTInterface.SIGNAL_PROPERTY_CHANGED)
+        for s in sessions:
+            self.scheduler.stop_discovery(s)
+        self.assertEqual(self.scheduler.load(HCI0), 0)
+        self.assertEqual(self.scheduler.acquire(DISCOVERY)._path, HCI0)
+
+    def test_create_paired_device(self):
+        user = mock.MagicMock()
+        adapter = self.scheduler.create_paired_device('11:22:33:44:55:66',
+                                                      '/test/agent', '',
+                                                      user.device,
+                                                      user.error)
+        self.assertEqual(self.scheduler.load(adapter), 2)
+        cb = adapter.create_paired_device.call_args[0][3]
+        cb('/org/bluez/985/hci0/dev_11_22_33_44_55_66')
+        user.device.assert_called_once_with(
+            '/org/bluez/985/hci0/dev_11_22_33_44_55_66')
+        self.assertEqual(self.scheduler.load(adapter), 0)
+        self.assertEqual(self.scheduler.acquire(
+            bt_manager.BTAdapterScheduler.CONNECTION,
+            '11:22:33:44:55:66'), adapter)
+
+        # Failed pairing does not bind the device to the adapter
+        adapter = self.scheduler.create_paired_device('11:22:33:44:55:77',
+                                                      '/test/agent', '',
+                                                      user.device,
+                                                      user.error)
+        adapter.create_paired_device.call_args[0][4]('failed')
+        self.assertNotIn('11:22:33:44:55:77', self.scheduler._devices)
@@ -0,0 +1,83 @@
+from __future__ import unicode_literals
+
+import unittest
+import tempfile
+import shutil
+import os
+import json
+import pickle
+
+import bt_manager
+import mock
+
+from fixtures import RECORD
+
+
+class BTServiceRecordCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.device = mock.MagicMock()
+        self.device.Address = '00:11:67:D2:AB:EE'
+        self.device.UUIDs = ['0000110B-0000-1000-8000-00805F9B34FB']
+        self.device.discover_services.return_value = {0x00010004: RECORD}
+
+    def test_discover_services_cached(self):
+        cache = bt_manager.BTServiceRecordCache(self.tmpdir)
+        records = cache.discover_services(self.device)
+        self.assertEqual(list(records.keys()), [0x00010004])
+        self.assertTrue(cache.discover_services(self.device) is records)
+        self.device.discover_services.assert_called_once_with()
+
+        # A new cache instance loads the records from disk
+        cache = bt_manager.BTServiceRecordCache(self.tmpdir)
+        record = cache.get_record('00:11:67:d2:ab:ee', self.device.UUIDs,
+                                  0x00010004)
+        self.assertEqual(record, records[0x00010004])
+        self.assertTrue(record.attributes[0x0001][0] is
+                        bt_manager.SERVICES['AudioSink'])
+        self.device.discover_services.assert_called_once_with()
+
+    def test_invalidation(self):
+        cache = bt_manager.BTServiceRecordCache(self.tmpdir)
+        cache.discover_services(self.device)
+        self.device.UUIDs = []
+        cache.discover_services(self.device)
+        self.assertEqual(self.device.discover_services.call_count, 2)
+
+        cache.watch(self.device)
+        cb, _, address = self.device.add_signal_receiver.call_args[0]
+        cb(bt_manager.BTInterface.SIGNAL_PROPERTY_CHANGED, address,
+           'Connected', True)
+        self.assertTrue(cache.get(address, []) is not None)
+        cb(bt_manager.BTInterface.SIGNAL_PROPERTY_CHANGED, address,
+           'Paired', True)
+        self.assertEqual(cache.get(address, []), None)
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_corrupt_file(self):
+        with open(os.path.join(self.tmpdir, '001167D2ABEE.sdp'), 'wb') as fh:
+            fh.write(b'garbage')
+        cache = bt_manager.BTServiceRecordCache(self.tmpdir)
+        self.assertEqual(cache.get(self.device.Address, []), None)
+
+    def test_no_code_loaded(self):
+        class Payload(object):
+            def __reduce__(self):
+                return (os.mkdir, (os.path.join(self.tmpdir, 'pwned'),))
+        Payload.tmpdir = self.tmpdir
+        with open(os.path.join(self.tmpdir, '001167D2ABEE.sdp'), 'wb') as fh:
+            pickle.dump(Payload(), fh)
+        cache = bt_manager.BTServiceRecordCache(self.tmpdir)
+        self.assertEqual(cache.get(self.device.Address, []), None)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'pwned')))
+
+        # Records are stored as JSON, with UUIDs and binary values tagged
+        cache.discover_services(self.device)
+        with open(os.path.join(self.tmpdir, '001167D2ABEE.sdp'), 'rb') as fh:
+            entry = json.load(fh)
+        attributes = dict(entry['records'][0][1])
+        self.assertEqual(attributes[0x0001],
+                         [{'uuid': '0000110B-0000-1000-8000-00805F9B34FB'}])
+        self.assertEqual(attributes[0x0102], {'hex': '49535343'})
@@ -0,0 +1,83 @@
+from __future__ import unicode_literals
+
+import unittest
+import json
+import os
+import tempfile
+
+import bt_manager
+import mock
+
+from test_bt_bus import MockDBusInterface
+
+
+class BTTracerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tracer = bt_manager.BTTracer(capacity=3)
+        self.tracer.enable()
+        patcher = mock.patch('bt_manager.interface.TRACER', self.tracer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('dbus.Interface', MockDBusInterface)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('dbus.SystemBus')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_property_access(self):
+        adapter = bt_manager.BTAdapter()
+        self.tracer.clear()
+        adapter.Name
+        adapter.Powered
+        adapter.set_property('Alias', 'test')
+        events = list(self.tracer.events)
+        self.assertEqual([e.method for e in events],
+                         ['GetProperties', 'GetProperties', 'SetProperty'])
+        self.assertEqual(events[0].interface, 'org.bluez.Adapter')
+        self.assertEqual(events[0].path, '/org/bluez/985/hci0')
+        self.assertEqual(events[0].args_size, 0)
+        self.assertEqual(events[2].args_size, len('Alias') + len('test'))
+        self.assertFalse(events[0].failed)
+        self.assertFalse(events[0].asynchronous)
+        # The caller summary leaves out the tracing wrapper
+        self.assertTrue(events[0].caller[0].startswith('interface.py:'))
+        self.assertTrue(events[0].caller[0].endswith(' get_property'))
+        self.assertTrue(events[0].caller[2].startswith('test_tracing.py:'))
+
+        summary = self.tracer.summary(top=1)
+        self.assertEqual(summary['slowest'], [max(events,
+                                                  key=lambda e: e.duration)])
+        self.assertEqual(len(summary['frequent']), 1)
+        self.assertEqual(summary['frequent'][0]['method'], 'GetProperties')
+        self.assertEqual(summary['frequent'][0]['count'], 1)
+
+        adapter.Address
+        self.assertEqual(len(self.tracer.events), 3)
+        self.assertEqual(self.tracer.events[0].method, 'GetProperties')
+        self.assertEqual(self.tracer.events[-1].method, 'GetProperties')
+
+    def test_chrome_trace(self):
+        adapter = bt_manager.BTAdapter()
+        adapter.set_properties({'Alias': 'test'}, cb_notify_done=lambda f: 0)
+        path = tempfile.mktemp()
+        self.addCleanup(os.remove, path)
+        self.tracer.dump(path)
+        with open(path) as f:
+            trace = json.load(f)
+        events = trace['traceEvents']
+        self.assertEqual(events[0]['ph'], 'M')
+        self.assertEqual(events[-1]['name'], 'SetProperty')
+        self.assertEqual(events[-1]['tid'], 0)
+        self.assertEqual(events[-1]['cat'], 'org.bluez.Adapter')
+        self.assertEqual(events[-1]['ph'], 'X')
+        self.assertEqual(events[-1]['args']['path'], '/org/bluez/985/hci0')
+        self.assertNotEqual(events[-2]['tid'], 0)
+
+    def test_disabled(self):
+        self.tracer.disable()
+        adapter = bt_manager.BTAdapter()
+        self.assertTrue(isinstance(adapter._interface, MockDBusInterface))
+        adapter.Name
+        self.assertEqual(len(self.tracer.events), 0)
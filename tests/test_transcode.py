@@ -0,0 +1,78 @@
+from __future__ import unicode_literals
+
+import unittest
+import tempfile
+import shutil
+import math
+import os
+
+import bt_manager
+from bt_manager import transcode
+
+
+class SBCTranscodeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.wav = os.path.join(self.tmpdir, 'input.wav')
+        writer = bt_manager.PCMFileWriter(self.wav, channels=2,
+                                          frequency=48000)
+        samples = bytearray()
+        for i in range(20000):
+            sample = int(8000 * math.sin(i * 0.05)) & 0xFFFF
+            samples.extend((sample & 0xFF, sample >> 8) * 2)
+        writer.write(bytes(samples))
+        writer.close()
+
+    def _read(self, name):
+        with open(os.path.join(self.tmpdir, name), 'rb') as fh:
+            return fh.read()
+
+    def test_default_config(self):
+        config = transcode.default_config(1, 16000)
+        self.assertEqual(config.channel_mode,
+                         bt_manager.SBCChannelMode.CHANNEL_MODE_MONO)
+        self.assertEqual(config.frequency,
+                         bt_manager.SBCSamplingFrequency.FREQ_16KHZ)
+        try:
+            exception_caught = False
+            transcode.default_config(2, 22050)
+        except bt_manager.BTUnsupportedMediaFormat:
+            exception_caught = True
+        self.assertTrue(exception_caught)
+
+    def test_parallel_matches_serial(self):
+        config = bt_manager.SBCCodecConfig(bt_manager.SBCChannelMode.CHANNEL_MODE_DUAL,  # noqa
+                                           bt_manager.SBCSamplingFrequency.FREQ_48KHZ,  # noqa
+                                           bt_manager.SBCAllocationMethod.SNR,  # noqa
+                                           bt_manager.SBCSubbands.SUBBANDS_4,
+                                           bt_manager.SBCBlocks.BLOCKS_4,
+                                           29,
+                                           29)
+        serial = os.path.join(self.tmpdir, 'serial.sbc')
+        parallel = os.path.join(self.tmpdir, 'parallel.sbc')
+        transcode.encode_file(self.wav, serial, config, processes=1)
+        transcode.encode_file(self.wav, parallel, config, processes=2,
+                              chunk_frames=50)
+        data = self._read('serial.sbc')
+        self.assertEqual(data, self._read('parallel.sbc'))
+        self.assertEqual(bt_manager.sbc_frame_config(data), config)
+
+        transcode.decode_file(serial, os.path.join(self.tmpdir, 'a.wav'),
+                              processes=1)
+        transcode.decode_file(serial, os.path.join(self.tmpdir, 'b.wav'),
+                              processes=2, chunk_frames=50)
+        self.assertEqual(self._read('a.wav'), self._read('b.wav'))
+
+    def test_main(self):
+        sbc = os.path.join(self.tmpdir, 'output.sbc')
+        wav = os.path.join(self.tmpdir, 'output.wav')
+        self.assertEqual(transcode.main([self.wav, sbc, '--blocks', '8',
+                                         '-j', '1']), 0)
+        self.assertEqual(transcode.main(['-d', sbc, wav, '-j', '1']), 0)
+        reader = bt_manager.PCMFileReader(wav)
+        self.assertEqual(reader.frequency, 48000)
+        self.assertEqual(reader.channels, 2)
+        reader.close()
+        self.assertEqual(transcode.main([self.wav, self.wav, '-d']), 1)
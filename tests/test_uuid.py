@@ -10,7 +10,7 @@ class UUIDTest(unittest.TestCase):
     def test_uuid(self):
         name = 'UUID Name'
         desc = 'UUID Description'
-        uuid = '12345678-xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx'
+        uuid = '12345678-9abc-def0-1234-56789abcdef0'
         obj = bt_manager.BTUUID(uuid=uuid, name=name, desc=desc)
         self.assertEqual(obj.uuid, uuid.upper())
         self.assertEqual(obj.uuid16, uuid[4:8])
@@ -47,3 +47,53 @@ class UUIDTest(unittest.TestCase):
         except bt_manager.BTUUIDNotSpecifiedException:
             caught = True
         self.assertTrue(caught)
+
+    def test_malformed(self):
+        for uuid in ('110B', '12345678-9abc-def0-1234-56789abcdef',
+                     '12345678-9abc-def0-1234-56789abcdef0-1',
+                     '12345678-9abc-def0-1234-56789abcdefg'):
+            self.assertRaises(ValueError, bt_manager.BTUUID, uuid=uuid)
+        self.assertRaises(ValueError, bt_manager.BTUUID16, '110', 'Name')
+        self.assertRaises(ValueError, bt_manager.BTUUID32, '0000110BC',
+                          'Name')
+        self.assertRaises(ValueError, bt_manager.BTUUID.from_int, -1)
+        self.assertRaises(ValueError, bt_manager.BTUUID.from_int, 1 << 128)
+        self.assertEqual(bt_manager.BTUUID(
+            uuid='0000110B00001000800000805F9B34FB'),
+            bt_manager.SERVICES['AudioSink'])
+
+    def test_read_only(self):
+        obj = bt_manager.SERVICES['AudioSink']
+        for attr in ('int', 'name', 'desc'):
+            self.assertRaises(AttributeError, setattr, obj, attr, None)
+        self.assertEqual(obj.name, 'AudioSink')
+
+    def test_interned(self):
+        obj = bt_manager.SERVICES['AudioSink']
+        self.assertTrue(bt_manager.BTUUID16(uuid='110B', name=obj.name,
+                                            desc=obj.desc) is obj)
+        self.assertTrue(bt_manager.BTUUID16.from_int(obj.int) is obj)
+        self.assertEqual(hash(obj), hash(obj.int))
+        # Each class has its own instances
+        uuid = bt_manager.BTUUID(uuid='0000110b-0000-1000-8000-00805f9b34fb')
+        self.assertFalse(uuid is obj)
+        self.assertEqual(uuid, obj)
+        self.assertEqual(uuid.int, 0x0000110B00001000800000805F9B34FB)
+        self.assertTrue(bt_manager.BTUUID.from_int(uuid.int) is uuid)
+
+    def test_interned_names(self):
+        value = 0x12345678000010008000000000000001
+        anonymous = bt_manager.BTUUID.from_int(value)
+        named = bt_manager.BTUUID.from_int(value, 'Name', 'Description')
+        # An interned instance is never renamed
+        self.assertEqual(anonymous.name, None)
+        self.assertEqual(named.name, 'Name')
+        self.assertTrue(bt_manager.BTUUID.from_int(value) is named)
+        self.assertTrue(bt_manager.BTUUID.from_int(value, 'Name',
+                                                   'Description') is named)
+        other = bt_manager.BTUUID.from_int(value, 'Other')
+        self.assertEqual((other.name, named.name), ('Other', 'Name'))
+        self.assertTrue(bt_manager.BTUUID.from_int(value) is named)
+        sink = bt_manager.BTUUID16(uuid='110B', name='Renamed')
+        self.assertEqual(sink.name, 'Renamed')
+        self.assertEqual(bt_manager.SERVICES['AudioSink'].name, 'AudioSink')
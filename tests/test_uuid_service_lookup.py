@@ -18,3 +18,19 @@ class UUIDServiceLookup(unittest.TestCase):
             uuid16 = service.uuid16
             attribs = bt_manager.ATTRIBUTES.get(uuid16, None)
             print service.name, '['+service.uuid16+']', attribs
+
+    def test_resolve_services(self):
+        uuids = ['0000110b-0000-1000-8000-00805f9b34fb',
+                 '0000110B-0000-1000-8000-00805F9B34FB',
+                 '0000110b-0000-1000-8000-00805F9B34FB',
+                 '12345678-9abc-def0-1234-56789abcdef0',
+                 'not a uuid']
+        services = bt_manager.resolve_services(uuids, default=False)
+        sink = bt_manager.SERVICES['AudioSink']
+        self.assertEqual(services, [sink, sink, sink, False, False])
+        services = bt_manager.resolve_services(uuids[0:1], attributes=True)
+        self.assertEqual(services, [(sink, bt_manager.ATTRIBUTES['110B'])])
+        # Any iterable, with empty and missing entries as unknown
+        services = bt_manager.resolve_services(
+            iter(['', None, uuids[0], '']))
+        self.assertEqual(services, [None, None, sink, None])